@@ -25,6 +25,9 @@ def create_app(config_class=Config):
 
     Config.init_app(app)
 
+    from app.services.metrics import init_app as init_metrics
+    init_metrics(app)
+
     @app.after_request
     def set_security_headers(response):
         response.headers['X-Content-Type-Options'] = 'nosniff'
@@ -34,7 +37,7 @@ def create_app(config_class=Config):
         response.headers['Content-Security-Policy'] = "default-src 'self'; script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://unpkg.com https://cdn.plot.ly https://d3js.org; style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://unpkg.com https://fonts.googleapis.com; font-src 'self' https://fonts.gstatic.com https://cdnjs.cloudflare.com; img-src 'self' data: https:;"
         return response
 
-    from app.routes import auth, main, quiz, analyzer, dashboard, privacy, assessment
+    from app.routes import auth, main, quiz, analyzer, dashboard, privacy, assessment, metrics
     app.register_blueprint(auth.bp)
     app.register_blueprint(main.bp)
     app.register_blueprint(quiz.bp)
@@ -42,9 +45,33 @@ def create_app(config_class=Config):
     app.register_blueprint(dashboard.bp)
     app.register_blueprint(privacy.bp)
     app.register_blueprint(assessment.bp)
+    app.register_blueprint(metrics.bp)
 
     with app.app_context():
+        # New tables come from the models; changes to existing tables are migrations
         db.create_all()
+        if app.config.get('AUTO_MIGRATE'):
+            from app.migrations import run_migrations
+            run_migrations(verbose=True)
+
+    from app.services.audit_writer import start_audit_writer
+    start_audit_writer(app)
+
+    if app.config.get('AUDIT_MAINTENANCE_ENABLED'):
+        from app.services.audit_log import start_audit_maintenance
+        start_audit_maintenance(app)
+
+    if app.config.get('RETENTION_WORKER_ENABLED'):
+        from app.services.retention import start_retention_worker
+        start_retention_worker(app)
+
+    if app.config.get('POPULATION_STATS_WORKER_ENABLED'):
+        from app.services.population import start_population_stats_worker
+        start_population_stats_worker(app)
+
+    if app.config.get('FRAME_SWEEPER_ENABLED'):
+        from app.services.purge import start_frame_sweeper
+        start_frame_sweeper(app)
 
     return app
 
@@ -0,0 +1,140 @@
+"""
+Versioned schema migrations.
+
+``db.create_all()`` creates missing tables but never changes existing ones,
+so every column or index added to an existing table is also a migration in
+``versions.py``. Applied versions are recorded in ``schema_migrations``.
+
+Migrations run on an autocommit connection: on PostgreSQL indexes are built
+with CREATE INDEX CONCURRENTLY (no write lock on the table) and an advisory
+lock keeps several workers starting at once from racing. Every step is
+idempotent (IF NOT EXISTS, or an inspector check where the dialect has no
+such clause), so a migration interrupted halfway is simply run again.
+"""
+import time
+from datetime import datetime
+import sqlalchemy as sa
+from app import db
+
+# Arbitrary application-wide key for pg_advisory_lock
+ADVISORY_LOCK_KEY = 7319424001
+
+schema_migrations = sa.Table(
+    'schema_migrations', db.metadata,
+    sa.Column('version', sa.Integer, primary_key=True),
+    sa.Column('name', sa.String(200), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False),
+    sa.Column('duration_ms', sa.Float)
+)
+
+
+class Migration:
+    def __init__(self, version, name, steps):
+        self.version = version
+        self.name = name
+        self.steps = steps  # callables taking a MigrationContext
+
+
+class MigrationContext:
+    """DDL helpers for one autocommit connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.dialect = connection.dialect.name
+
+    @property
+    def postgres(self):
+        return self.dialect == 'postgresql'
+
+    def execute(self, sql, params=None):
+        return self.connection.execute(sa.text(sql), params or {})
+
+    def has_column(self, table, column):
+        return column in {c['name'] for c in sa.inspect(self.connection).get_columns(table)}
+
+    def has_table(self, table):
+        return sa.inspect(self.connection).has_table(table)
+
+    def add_column(self, table, column, default=None):
+        """
+        Add a model column to an existing table. The type comes from the model
+        metadata; ``default`` (SQL literal) also makes the column NOT NULL.
+        """
+        if not self.has_table(table) or self.has_column(table, column):
+            return
+        model_column = db.metadata.tables[table].c[column]
+        ddl = f'{column} {model_column.type.compile(dialect=self.connection.dialect)}'
+        for fk in model_column.foreign_keys:
+            ddl += f' REFERENCES {fk.column.table.name} ({fk.column.name})'
+        if default is not None:
+            ddl += f' NOT NULL DEFAULT {default}'
+        self.execute(f'ALTER TABLE {table} ADD COLUMN {ddl}')
+
+    def create_index(self, name, table, columns, unique=False):
+        """Build an index without blocking writes where the database allows it"""
+        if not self.has_table(table):
+            return
+        unique_sql = 'UNIQUE ' if unique else ''
+        column_sql = ', '.join(columns)
+        if self.postgres:
+            # An interrupted CONCURRENTLY build leaves an invalid index behind; rebuild it
+            invalid = self.execute(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid", {'name': name}
+            ).first()
+            if invalid:
+                self.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            self.execute(f'CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column_sql})')
+        else:
+            self.execute(f'CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column_sql})')
+
+
+def applied_versions(connection):
+    schema_migrations.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(sa.select(schema_migrations.c.version))}
+
+
+def pending_migrations(engine=None):
+    from app.migrations.versions import MIGRATIONS
+    engine = engine or db.engine
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+        connection.commit()
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def run_migrations(engine=None, verbose=False):
+    """Apply every pending migration in version order; returns the versions applied"""
+    from app.migrations.versions import MIGRATIONS
+    engine = engine or db.engine
+    applied_now = []
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        context = MigrationContext(connection)
+        if context.postgres:
+            context.execute('SELECT pg_advisory_lock(:key)', {'key': ADVISORY_LOCK_KEY})
+        try:
+            applied = applied_versions(connection)
+            for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+                if migration.version in applied:
+                    continue
+                started = time.perf_counter()
+                for step in migration.steps:
+                    step(context)
+                duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                try:
+                    connection.execute(schema_migrations.insert().values(
+                        version=migration.version, name=migration.name,
+                        applied_at=datetime.utcnow(), duration_ms=duration_ms
+                    ))
+                except sa.exc.IntegrityError:
+                    # Another worker (SQLite has no advisory lock) recorded it first
+                    continue
+                applied_now.append(migration.version)
+                if verbose:
+                    print(f"Applied migration {migration.version:04d} {migration.name} ({duration_ms} ms)")
+        finally:
+            if context.postgres:
+                context.execute('SELECT pg_advisory_unlock(:key)', {'key': ADVISORY_LOCK_KEY})
+
+    return applied_now
@@ -0,0 +1,205 @@
+"""
+Query-plan regression check.
+
+Builds a scratch database through ``create_app`` (so it has exactly the
+tables, indexes and migrations production gets), seeds it at a realistic
+scale, then runs the hot read paths of AnalyticsService and the assessment
+routes while recording every SELECT they issue. Each recorded statement is
+EXPLAINed with its real parameters; any full scan of a hot table fails the
+check.
+"""
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+import sqlalchemy as sa
+from config import Config
+
+HOT_TABLES = ('screen_sessions', 'frame_analysis', 'periodic_assessments')
+
+APPS = ['Vscode', 'Chrome', 'Slack', 'Youtube', 'Linkedin', 'Terminal', 'Notion', 'Spotify']
+CONTENT_TYPES = ['work', 'educational', 'social_media', 'entertainment', 'communication']
+SENTIMENTS = ['positive', 'negative', 'neutral', 'mixed']
+IMPACTS = ['positive', 'neutral', 'negative']
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def run_plan_check(users=300, sessions_per_user=60, frames_per_session=20, database_url=None):
+    """Returns a list of ``{'statement', 'plan', 'full_scans'}``; the check passes when no entry has full scans"""
+    from app import create_app, db
+
+    scratch_dir = None
+    if database_url is None:
+        scratch_dir = tempfile.mkdtemp(prefix='plan_check_')
+        database_url = f"sqlite:///{os.path.join(scratch_dir, 'plan_check.db')}"
+
+    class ScratchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        RETENTION_WORKER_ENABLED = False
+        POPULATION_STATS_WORKER_ENABLED = False
+        FRAME_SWEEPER_ENABLED = False
+        AUDIT_MAINTENANCE_ENABLED = False
+        RESPONSE_CACHE_ENABLED = False
+        AUTO_MIGRATE = True
+
+    try:
+        app = create_app(ScratchConfig)
+        with app.app_context():
+            user_id = _seed(db, users, sessions_per_user, frames_per_session)
+            with db.engine.connect() as connection:
+                connection.exec_driver_sql('ANALYZE')
+                connection.commit()
+
+            statements = []
+
+            def record(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith('SELECT') and any(t in statement for t in HOT_TABLES):
+                    statements.append((statement, parameters))
+
+            sa.event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                _exercise_hot_paths(app, db, user_id)
+            finally:
+                sa.event.remove(db.engine, 'before_cursor_execute', record)
+
+            results = []
+            seen = set()
+            with db.engine.connect() as connection:
+                for statement, parameters in statements:
+                    if statement in seen:
+                        continue
+                    seen.add(statement)
+                    plan, full_scans = _explain(connection, statement, parameters)
+                    results.append({'statement': ' '.join(statement.split()), 'plan': plan, 'full_scans': full_scans})
+            db.session.remove()
+            db.engine.dispose()
+        return results
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def _seed(db, users, sessions_per_user, frames_per_session):
+    """Bulk-insert users, sessions, frames and assessments; returns a user id with full history"""
+    from app.models import User, ScreenSession, FrameAnalysis, PeriodicAssessment
+    from app.services.app_catalog import AppCatalogService
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    catalog = AppCatalogService()
+    app_ids = {name: catalog.resolve(name) for name in APPS}
+    db.session.commit()
+
+    db.session.execute(sa.insert(User), [
+        {'email': f'plan{i}@example.com', 'password_hash': 'x', 'name': f'User {i}', 'data_version': 0}
+        for i in range(users)
+    ])
+    user_ids = [row.id for row in db.session.query(User.id).all()]
+
+    sessions = []
+    for user_id in user_ids:
+        for s in range(sessions_per_user):
+            sessions.append({
+                'user_id': user_id,
+                'session_name': f'Session {s + 1}',
+                'duration_seconds': rng.randint(600, 7200),
+                'total_frames': frames_per_session,
+                'wellness_score': round(rng.uniform(3, 9), 2),
+                'productivity_score': round(rng.uniform(3, 9), 2),
+                'sentiment_distribution': {s: rng.randint(0, 10) for s in SENTIMENTS},
+                'app_usage': {rng.choice(APPS): frames_per_session},
+                'status': 'completed' if rng.random() < 0.95 else 'processing',
+                'created_at': now - timedelta(hours=rng.randint(0, 24 * 365))
+            })
+    db.session.execute(sa.insert(ScreenSession), sessions)
+    db.session.commit()
+
+    frames = []
+    for session_id, user_id in db.session.query(ScreenSession.id, ScreenSession.user_id).all():
+        for f in range(frames_per_session):
+            app_name = rng.choice(APPS)
+            frames.append({
+                'session_id': session_id, 'user_id': user_id, 'frame_number': f + 1, 'timestamp': f * 2.0,
+                'app_detected': app_name, 'app_id': app_ids[app_name],
+                'content_type': rng.choice(CONTENT_TYPES), 'sentiment': rng.choice(SENTIMENTS),
+                'sentiment_score': round(rng.uniform(-1, 1), 2), 'wellness_impact': rng.choice(IMPACTS),
+                'analysis_mode': 'analyzed'
+            })
+            if len(frames) >= 20000:
+                db.session.execute(sa.insert(FrameAnalysis), frames)
+                frames = []
+    if frames:
+        db.session.execute(sa.insert(FrameAnalysis), frames)
+
+    assessments = []
+    for user_id in user_ids:
+        for week in range(52):
+            day = now - timedelta(weeks=week)
+            assessments.append({'user_id': user_id, 'assessment_type': 'weekly', 'period_key': day.strftime('%Y-W%V'),
+                                'overall_wellness': rng.uniform(40, 90), 'created_at': day})
+        for month in range(12):
+            day = now - timedelta(days=30 * month)
+            assessments.append({'user_id': user_id, 'assessment_type': 'monthly', 'period_key': day.strftime('%Y-%m'),
+                                'overall_wellness': rng.uniform(40, 90), 'created_at': day})
+    db.session.execute(sa.insert(PeriodicAssessment), assessments)
+    db.session.commit()
+    return user_ids[len(user_ids) // 2]
+
+
+def _exercise_hot_paths(app, db, user_id):
+    from flask_login import login_user
+    from app.models import User
+    from app.routes import assessment
+    from app.services.analytics import AnalyticsService
+    from app.services.rollups import RollupService
+
+    RollupService().rebuild_user(user_id)
+    analytics = AnalyticsService()
+    page, cursor = analytics.session_page(user_id)
+    analytics.session_page(user_id, cursor=cursor)
+    analytics.session_page(user_id, status=None)
+    analytics.get_overview(user_id)
+    analytics.get_wellness_trends(user_id, points=100, start=datetime.utcnow() - timedelta(days=90))
+    analytics.get_sentiment_timeline(user_id, bucket='week')
+    analytics.get_app_detailed_analysis(user_id, 'VSCode')
+
+    with app.test_request_context('/assessment/history'):
+        login_user(db.session.get(User, user_id))
+        assessment.weekly()
+        assessment.monthly()
+        assessment.history()
+        assessment.api_progress()
+
+
+def _explain(connection, statement, parameters):
+    """(plan as text lines, [hot tables read by a full scan])"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        raw = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        plan = raw if isinstance(raw, list) else json.loads(raw)
+        lines, scans = [], []
+        _walk_pg(plan[0]['Plan'], lines, scans, 0)
+        return lines, scans
+
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    lines = [row[-1] for row in rows]
+    scans = []
+    for detail in lines:
+        match = _SQLITE_SCAN.match(detail)
+        # 'SCAN t' reads the whole table; 'SCAN t USING INDEX' reads the whole index in order
+        if match and match.group(1) in HOT_TABLES:
+            scans.append(match.group(1))
+    return lines, scans
+
+
+def _walk_pg(node, lines, scans, depth):
+    relation = node.get('Relation Name')
+    lines.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else ''))
+    if node['Node Type'] == 'Seq Scan' and relation in HOT_TABLES:
+        scans.append(relation)
+    for child in node.get('Plans', []):
+        _walk_pg(child, lines, scans, depth + 1)
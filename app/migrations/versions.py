@@ -0,0 +1,124 @@
+"""
+Schema migrations, oldest first. Never edit a released migration; add a new one.
+"""
+from datetime import datetime
+from app import db
+from app.migrations import Migration
+
+
+def _baseline_columns(ctx):
+    """Columns added to tables that existed before migrations were tracked"""
+    ctx.add_column('users', 'data_version', default='0')
+
+    for column in ('wellness_impacts', 'frames_purged_at', 'retention_claim', 'retention_claimed_at'):
+        ctx.add_column('screen_sessions', column)
+
+    for column in ('user_id', 'app_id', 'translated_text', 'sentiment_status', 'engagement_indicators',
+                   'potential_concerns', 'audio_transcript', 'stage_timings', 'frame_hash',
+                   'inferred_from_frame'):
+        ctx.add_column('frame_analysis', column)
+    ctx.add_column('frame_analysis', 'analysis_mode', default="'analyzed'")
+
+
+# (name, table, columns): every index the hot read paths depend on
+HOT_PATH_INDEXES = [
+    ('ix_screen_sessions_created_at', 'screen_sessions', ['created_at']),
+    ('ix_screen_sessions_retention', 'screen_sessions', ['frames_purged_at', 'created_at']),
+    ('ix_screen_sessions_user_created', 'screen_sessions', ['user_id', 'created_at', 'id']),
+    ('ix_screen_sessions_user_status_created', 'screen_sessions', ['user_id', 'status', 'created_at', 'id']),
+    ('ix_frame_analysis_session_frame', 'frame_analysis', ['session_id', 'frame_number']),
+    ('ix_frame_analysis_user_app', 'frame_analysis', ['user_id', 'app_id', 'id']),
+    ('ix_periodic_assessments_user_type_period', 'periodic_assessments', ['user_id', 'assessment_type', 'period_key']),
+    ('ix_periodic_assessments_user_type_created', 'periodic_assessments', ['user_id', 'assessment_type', 'created_at']),
+]
+
+
+def _hot_path_indexes(ctx):
+    for name, table, columns in HOT_PATH_INDEXES:
+        ctx.create_index(name, table, columns)
+
+
+def _partition_audit_logs(ctx):
+    """PostgreSQL: turn audit_logs into a table partitioned by month of timestamp, keeping its rows"""
+    if not ctx.postgres or not ctx.has_table('audit_logs'):
+        return
+    if ctx.execute("SELECT relkind FROM pg_class WHERE relname = 'audit_logs'").scalar() == 'p':
+        return
+    from app.services.audit_log import month_start, add_months, partition_name
+    from config import Config
+
+    indexes = db.metadata.tables['audit_logs'].indexes
+    ctx.execute('BEGIN')
+    try:
+        ctx.execute('LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE')
+        first = ctx.execute('SELECT min("timestamp") FROM audit_logs').scalar()
+        for index in indexes:
+            ctx.execute(f'DROP INDEX IF EXISTS {index.name}')
+        ctx.execute('ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned')
+        ctx.execute('ALTER TABLE audit_logs_unpartitioned DROP CONSTRAINT IF EXISTS audit_logs_pkey')
+        ctx.execute('CREATE TABLE audit_logs (LIKE audit_logs_unpartitioned INCLUDING DEFAULTS) '
+                    'PARTITION BY RANGE ("timestamp")')
+        # The id sequence would otherwise be dropped with the old table
+        ctx.execute('ALTER SEQUENCE IF EXISTS audit_logs_id_seq OWNED BY audit_logs.id')
+        # A partitioned table's primary key must include the partition column
+        ctx.execute('ALTER TABLE audit_logs ADD PRIMARY KEY (id, "timestamp")')
+        ctx.execute('ALTER TABLE audit_logs ADD FOREIGN KEY (user_id) REFERENCES users (id)')
+        ctx.execute('CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT')
+
+        now = month_start(datetime.utcnow())
+        month = month_start(first) if first else now
+        while month <= add_months(now, Config.AUDIT_PARTITIONS_AHEAD):
+            ctx.execute(f"CREATE TABLE {partition_name(month)} PARTITION OF audit_logs "
+                        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')")
+            month = add_months(month, 1)
+
+        ctx.execute('INSERT INTO audit_logs SELECT * FROM audit_logs_unpartitioned')
+        ctx.execute('DROP TABLE audit_logs_unpartitioned')
+        for index in indexes:
+            columns = ', '.join(f'"{column.name}"' for column in index.columns)
+            ctx.execute(f'CREATE INDEX {index.name} ON audit_logs ({columns})')
+        ctx.execute('COMMIT')
+    except Exception:
+        ctx.execute('ROLLBACK')
+        raise
+
+
+def _audit_log_indexes(ctx):
+    """SQLite: the per-user and per-action indexes (PostgreSQL gets them with the partitioning)"""
+    if ctx.postgres:
+        return
+    for index in db.metadata.tables['audit_logs'].indexes:
+        ctx.create_index(index.name, 'audit_logs', [column.name for column in index.columns])
+
+
+
+def _per_user_translation_cache(ctx):
+    """translation_cache was shared by all users; its entries cannot be attributed to anyone, so start over"""
+    if not ctx.has_table('translation_cache') or ctx.has_column('translation_cache', 'user_id'):
+        return
+    ctx.execute('DROP TABLE translation_cache')
+    db.metadata.tables['translation_cache'].create(ctx.connection)
+
+
+def _data_key_legacy_frames(ctx):
+    """Flag the keys created for sessions that already had frames, which are sealed with the master key"""
+    if not ctx.has_table('data_keys') or ctx.has_column('data_keys', 'legacy_frames'):
+        return
+    ctx.add_column('data_keys', 'legacy_frames', default='FALSE')
+    ctx.execute('UPDATE data_keys SET legacy_frames = TRUE WHERE EXISTS ('
+                'SELECT 1 FROM frame_analysis f WHERE f.session_id = data_keys.session_id '
+                'AND f.created_at < data_keys.created_at)')
+
+
+def _session_heatmap_slots(ctx):
+    ctx.add_column('screen_sessions', 'heatmap_slots')
+
+
+MIGRATIONS = [
+    Migration(1, 'baseline_columns', [_baseline_columns]),
+    Migration(2, 'hot_path_indexes', [_hot_path_indexes]),
+    Migration(3, 'audit_log_partitions', [_partition_audit_logs, _audit_log_indexes]),
+    Migration(4, 'per_user_translation_cache', [_per_user_translation_cache]),
+    Migration(5, 'data_key_legacy_frames', [_data_key_legacy_frames]),
+    Migration(6, 'session_heatmap_slots', [_session_heatmap_slots]),
+]
@@ -4,3 +4,11 @@ from .session import ScreenSession, FrameAnalysis
 from .knowledge_graph import KnowledgeGraph
 from .audit_log import AuditLog, UserConsent
 from .assessment import PeriodicAssessment, WEEKLY_QUESTIONS, MONTHLY_QUESTIONS
+from .translation import TranslationCache
+from .rollup import UserDailyRollup, UserDailyAppUsage, UserDailyCategory
+from .response_cache import ResponseCacheEntry
+from .application import Application
+from .population import PopulationHistogramBin, UserPopulationStanding, PopulationRebuildLease
+from .heatmap import UserUsageHeatmap
+from .background_job import BackgroundJob
+from .data_key import DataKey
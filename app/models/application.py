@@ -0,0 +1,23 @@
+from datetime import datetime
+from app import db
+
+
+class Application(db.Model):
+    """
+    One row per distinct app or website seen on screen. ``key`` is the
+    normalized name (lowercase letters and digits only), so spelling variants
+    such as 'VSCode' and 'Vs Code' share a row; known apps are seeded from
+    ScreenAnalyzerService.APP_DATABASE.
+    """
+    __tablename__ = 'apps'
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50))
+    wellness_impact = db.Column(db.String(30))
+    known = db.Column(db.Boolean, default=False, nullable=False)  # Listed in APP_DATABASE
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Application {self.key}>'
@@ -51,6 +51,11 @@ class PeriodicAssessment(db.Model):
     # Relationships
     user = db.relationship('User', backref=db.backref('periodic_assessments', lazy='dynamic'))
 
+    __table_args__ = (
+        db.Index('ix_periodic_assessments_user_type_period', 'user_id', 'assessment_type', 'period_key'),
+        db.Index('ix_periodic_assessments_user_type_created', 'user_id', 'assessment_type', 'created_at'),
+    )
+
     def set_big_five(self, scores):
         """Store Big Five scores as JSON"""
         self.big_five_snapshot = json.dumps(scores)
@@ -14,23 +14,31 @@ class AuditLog(db.Model):
     details = db.Column(db.JSON, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # Partitioned by month of ``timestamp`` (see AuditLogService); every partition carries these indexes
+    __table_args__ = (
+        db.Index('ix_audit_logs_user_time', 'user_id', 'timestamp'),
+        db.Index('ix_audit_logs_action_time', 'action', 'timestamp'),
+        # SQLite: ids continue across the monthly tables instead of restarting
+        {'sqlite_autoincrement': True},
+    )
+
     def __repr__(self):
         return f'<AuditLog {self.action} on {self.resource} by user {self.user_id}>'
 
     @staticmethod
     def log_event(user_id, action, resource, status, ip_address=None, user_agent=None, details=None):
-        log = AuditLog(
-            user_id=user_id,
-            action=action,
-            resource=resource,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            status=status,
-            details=details
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
+        """Queue an audit entry; it is written within AUDIT_FLUSH_INTERVAL_SECONDS, outside the caller's transaction"""
+        from app.services.audit_writer import record_event
+        record_event({
+            'user_id': user_id,
+            'action': action,
+            'resource': resource,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'status': status,
+            'details': details,
+            'timestamp': datetime.utcnow()
+        })
 
 
 class UserConsent(db.Model):
@@ -0,0 +1,43 @@
+from datetime import datetime
+from app import db
+
+
+class BackgroundJob(db.Model):
+    """
+    A long-running task started on behalf of a user (exports, bulk deletes),
+    executed by BackgroundJobService. The random id doubles as the handle the
+    browser polls.
+    """
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, completed, failed
+    params = db.Column(db.JSON)
+    progress = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    result_path = db.Column(db.String(500))  # File produced by the job, if any
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Last progress report; a running job that stops reporting is dead
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_background_jobs_user_kind_created', 'user_id', 'kind', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress or {},
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
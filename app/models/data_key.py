@@ -0,0 +1,18 @@
+from datetime import datetime
+from app import db
+
+
+class DataKey(db.Model):
+    """
+    A session's frame encryption key, wrapped (encrypted) with the master key.
+    Deleting the row crypto-shreds every frame sealed with it, however many
+    files there are; DataKeyService owns the wrapping and the cache.
+    """
+    __tablename__ = 'data_keys'
+
+    session_id = db.Column(db.Integer, db.ForeignKey('screen_sessions.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    wrapped_key = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Created for a session that already had frames sealed with the master key, which outlive the key
+    legacy_frames = db.Column(db.Boolean, default=False, nullable=False)
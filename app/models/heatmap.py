@@ -0,0 +1,17 @@
+from datetime import datetime
+from app import db
+
+
+class UserUsageHeatmap(db.Model):
+    """
+    A user's frame counts per weekday x hour (UTC) and per category, wellness
+    impact and sentiment, as one packed uint32 array maintained by
+    HeatmapService. ``layout`` identifies the channel order the array was
+    written with.
+    """
+    __tablename__ = 'user_usage_heatmaps'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    layout = db.Column(db.Integer, nullable=False)
+    counts = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,46 @@
+from datetime import datetime
+from app import db
+
+
+class PopulationHistogramBin(db.Model):
+    """
+    One bin of a population histogram: how many users have a metric value in
+    the bin, within a segment ('all', 'cluster:<n>' or 'age:<range>').
+    Empty bins have no row.
+    """
+    __tablename__ = 'population_histogram_bins'
+
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(50), nullable=False)
+    segment = db.Column(db.String(50), nullable=False)
+    bin = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('metric', 'segment', 'bin', name='uq_population_histogram_bins_metric_segment_bin'),
+    )
+
+
+class UserPopulationStanding(db.Model):
+    """The bins and segments a user is currently counted in, so an update can move them"""
+    __tablename__ = 'user_population_standings'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    values = db.Column(db.JSON, nullable=False)     # {metric: value}
+    bins = db.Column(db.JSON, nullable=False)       # {metric: bin}
+    segments = db.Column(db.JSON, nullable=False)   # ['all', 'cluster:2', 'age:25-34']
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class PopulationRebuildLease(db.Model):
+    """
+    The one row (id 1) through which workers take turns rebuilding the
+    histograms: ``claim`` and ``claimed_at`` are the running rebuild's lease,
+    ``rebuilt_at`` is when the last complete rebuild started.
+    """
+    __tablename__ = 'population_rebuild_leases'
+
+    id = db.Column(db.Integer, primary_key=True)
+    claim = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    rebuilt_at = db.Column(db.DateTime)
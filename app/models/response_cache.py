@@ -0,0 +1,18 @@
+from datetime import datetime
+from app import db
+
+
+class ResponseCacheEntry(db.Model):
+    """Serialized API response for one user and request, valid for a single data_version"""
+    __tablename__ = 'response_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    cache_key = db.Column(db.String(64), nullable=False)
+    data_version = db.Column(db.Integer, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'cache_key', name='uq_response_cache_user_key'),
+    )
@@ -0,0 +1,64 @@
+from datetime import datetime
+from app import db
+
+
+class UserDailyRollup(db.Model):
+    """Per-user, per-day totals of completed sessions, maintained by RollupService"""
+    __tablename__ = 'user_daily_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    session_count = db.Column(db.Integer, default=0, nullable=False)
+    duration_seconds = db.Column(db.Integer, default=0, nullable=False)
+    total_frames = db.Column(db.Integer, default=0, nullable=False)
+    wellness_score_sum = db.Column(db.Float, default=0.0, nullable=False)
+    productivity_score_sum = db.Column(db.Float, default=0.0, nullable=False)
+    sentiment_positive = db.Column(db.Integer, default=0, nullable=False)
+    sentiment_negative = db.Column(db.Integer, default=0, nullable=False)
+    sentiment_neutral = db.Column(db.Integer, default=0, nullable=False)
+    sentiment_mixed = db.Column(db.Integer, default=0, nullable=False)
+    impact_positive = db.Column(db.Integer, default=0, nullable=False)
+    impact_negative = db.Column(db.Integer, default=0, nullable=False)
+    impact_neutral = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_user_daily_rollups_user_day'),
+    )
+
+    apps = db.relationship('UserDailyAppUsage', backref='rollup', lazy=True, cascade='all, delete-orphan')
+    categories = db.relationship('UserDailyCategory', backref='rollup', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<UserDailyRollup user {self.user_id} on {self.day}>'
+
+
+class UserDailyAppUsage(db.Model):
+    __tablename__ = 'user_daily_app_usage'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rollup_id = db.Column(db.Integer, db.ForeignKey('user_daily_rollups.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    app_name = db.Column(db.String(100), nullable=False)
+    frame_count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('rollup_id', 'app_name', name='uq_user_daily_app_usage_rollup_app'),
+        db.Index('ix_user_daily_app_usage_user_app', 'user_id', 'app_name'),
+    )
+
+
+class UserDailyCategory(db.Model):
+    __tablename__ = 'user_daily_categories'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rollup_id = db.Column(db.Integer, db.ForeignKey('user_daily_rollups.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    frame_count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('rollup_id', 'category', name='uq_user_daily_categories_rollup_category'),
+        db.Index('ix_user_daily_categories_user_category', 'user_id', 'category'),
+    )
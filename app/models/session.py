@@ -14,8 +14,23 @@ class ScreenSession(db.Model):
     sentiment_distribution = db.Column(db.JSON)
     app_usage = db.Column(db.JSON)
     content_categories = db.Column(db.JSON)
+    wellness_impacts = db.Column(db.JSON)
+    # What completing the session added to the user's heatmap: {'layout', 'slots': [[weekday, hour, channel, count], ...]}
+    heatmap_slots = db.Column(db.JSON)
     status = db.Column(db.String(20), default='processing')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Frame retention bookkeeping (see app/services/retention.py)
+    frames_purged_at = db.Column(db.DateTime)
+    retention_claim = db.Column(db.String(32))
+    retention_claimed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_screen_sessions_retention', 'frames_purged_at', 'created_at'),
+        # Keyset pagination of a user's sessions, newest first
+        db.Index('ix_screen_sessions_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_screen_sessions_user_status_created', 'user_id', 'status', 'created_at', 'id'),
+    )
 
     frames = db.relationship('FrameAnalysis', backref='session', lazy=True, cascade='all, delete-orphan')
 
@@ -24,16 +39,33 @@ class FrameAnalysis(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('screen_sessions.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # Copy of the session's owner, so per-user queries skip the join
     frame_number = db.Column(db.Integer, nullable=False)
     timestamp = db.Column(db.Float, nullable=False)
     frame_path = db.Column(db.String(500))
-    app_detected = db.Column(db.String(100))
+    app_detected = db.Column(db.String(100))  # As reported by the model
+    app_id = db.Column(db.Integer, db.ForeignKey('apps.id'))  # Canonical app, resolved when the row is written
     content_type = db.Column(db.String(100))
     extracted_text = db.Column(db.Text)
+    translated_text = db.Column(db.Text)  # English translation of extracted_text, when it is not English
     detected_language = db.Column(db.String(20))
     sentiment = db.Column(db.String(20))
     sentiment_score = db.Column(db.Float)
+    sentiment_status = db.Column(db.String(30))  # 'pending', 'batch:<token>' while claimed, 'scored' or 'inherited'
     objects_detected = db.Column(db.JSON)
     content_description = db.Column(db.Text)
+    engagement_indicators = db.Column(db.JSON)
+    potential_concerns = db.Column(db.JSON)
+    audio_transcript = db.Column(db.Text)  # English audio transcript used for sentiment scoring
     wellness_impact = db.Column(db.String(20))
+    stage_timings = db.Column(db.JSON)  # Per-stage latency (ms) and token usage for this frame
+    frame_hash = db.Column(db.String(16))  # Perceptual hash (hex) used to detect visual changes
+    analysis_mode = db.Column(db.String(20), default='analyzed')  # 'analyzed' or 'inferred' (temporal mode)
+    inferred_from_frame = db.Column(db.Integer)  # Anchor frame_number an inferred row was copied from
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_frame_analysis_session_frame', 'session_id', 'frame_number'),
+        # Per-app drill-down: one index range per (user, app)
+        db.Index('ix_frame_analysis_user_app', 'user_id', 'app_id', 'id'),
+    )
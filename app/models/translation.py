@@ -0,0 +1,22 @@
+from datetime import datetime
+from app import db
+
+
+class TranslationCache(db.Model):
+    """English translations of a user's on-screen text, keyed by a hash of the source text"""
+    __tablename__ = 'translation_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Screen text is personal data: every user has their own entries, deleted with their sessions
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    text_hash = db.Column(db.String(64), nullable=False)
+    source_language = db.Column(db.String(10))
+    translated_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'text_hash', name='uq_translation_cache_user_text'),
+    )
+
+    def __repr__(self):
+        return f'<TranslationCache {self.text_hash[:12]} of user {self.user_id} from {self.source_language}>'
@@ -56,6 +56,9 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
 
+    # Bumped by every write that changes dashboard data; keys the response cache
+    data_version = db.Column(db.Integer, default=0, nullable=False)
+
     quiz_responses = db.relationship('QuizResponse', backref='user', lazy=True, cascade='all, delete-orphan')
     screen_sessions = db.relationship('ScreenSession', backref='user', lazy=True, cascade='all, delete-orphan')
     knowledge_graph = db.relationship('KnowledgeGraph', backref='user', uselist=False, cascade='all, delete-orphan')
@@ -66,6 +69,14 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return bcrypt.check_password_hash(self.password_hash, password)
 
+    @staticmethod
+    def bump_data_version(user_id):
+        """Invalidate the user's cached dashboard responses; call inside the write's transaction"""
+        User.query.filter_by(id=user_id).update(
+            {User.data_version: db.func.coalesce(User.data_version, 0) + 1},
+            synchronize_session=False
+        )
+
     def update_last_login(self):
         self.last_login = datetime.utcnow()
         db.session.commit()
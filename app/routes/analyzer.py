@@ -1,8 +1,19 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, send_file
 from flask_login import login_required, current_user
 from app import db, csrf
-from app.models import ScreenSession
+from app.models import ScreenSession, FrameAnalysis, User
 from app.services.screen_analyzer import ScreenAnalyzerService
+from app.services.frame_storage import FrameStorageService
+from app.services.data_keys import DataKeyService
+from app.services.rollups import RollupService
+from app.services.population import PopulationStatsService
+from app.services.heatmap import HeatmapService
+from app.services.sentiment_batcher import SentimentBatchService
+from app.services.capture_control import capture_controller, ACCEPT, SAMPLE_OUT
+from app.services.analytics import AnalyticsService
+from app.utils.pagination import parse_page_args
+from config import Config
+import io
 import json
 
 bp = Blueprint('analyzer', __name__, url_prefix='/analyzer')
@@ -25,6 +36,9 @@ def start_session():
         status='recording'
     )
     db.session.add(session)
+    if Config.ENCRYPT_FRAMES:
+        db.session.flush()
+        DataKeyService().create_session_key(session)
     db.session.commit()
 
     return jsonify({'success': True, 'session_id': session.id})
@@ -43,16 +57,39 @@ def upload_frame():
     if not session or session.user_id != current_user.id:
         return jsonify({'success': False, 'message': 'Invalid session'}), 403
 
-    analyzer = ScreenAnalyzerService()
-    result = analyzer.analyze_frame(
-        session_id=session_id,
-        frame_number=int(frame_number),
-        timestamp=float(timestamp),
-        frame_data=frame_data,
-        audio_text=audio_data
-    )
+    image_bytes = frame_data.read()
+    frame_data.stream.seek(0)
 
-    return jsonify({'success': True, 'analysis': result})
+    outcome, status_code, directive, similarity = capture_controller.admit(
+        current_user.id, session.id, int(frame_number), image_bytes
+    )
+    if outcome != ACCEPT:
+        response = jsonify({
+            'success': outcome == SAMPLE_OUT,
+            'analyzed': False,
+            'reason': outcome,
+            'similarity': round(similarity, 3),
+            'capture': directive
+        })
+        response.status_code = status_code
+        if status_code in (429, 503):
+            response.headers['Retry-After'] = str(max(1, directive['interval_ms'] // 1000))
+        return response
+
+    try:
+        analyzer = ScreenAnalyzerService()
+        result = analyzer.analyze_frame(
+            session_id=session_id,
+            frame_number=int(frame_number),
+            timestamp=float(timestamp),
+            frame_data=frame_data,
+            audio_text=audio_data,
+            user_id=current_user.id
+        )
+    finally:
+        capture_controller.release(current_user.id)
+
+    return jsonify({'success': True, 'analyzed': True, 'analysis': result, 'capture': directive})
 
 @bp.route('/api/complete-session/<int:session_id>', methods=['POST'])
 @login_required
@@ -63,8 +100,15 @@ def complete_session(session_id):
         return jsonify({'success': False, 'message': 'Invalid session'}), 403
 
     analyzer = ScreenAnalyzerService()
+    SentimentBatchService(analyzer).flush_session(session_id)
     summary = analyzer.generate_session_summary(session_id)
 
+    # Rollups change in the same transaction as the session; a re-completed session replaces its old contribution
+    rollups = RollupService()
+    recompleted = session.status == 'completed'
+    if recompleted:
+        rollups.apply_session(session, sign=-1)
+
     session.status = 'completed'
     session.total_frames = summary['total_frames']
     session.duration_seconds = summary['duration_seconds']
@@ -73,9 +117,16 @@ def complete_session(session_id):
     session.sentiment_distribution = summary['sentiment_distribution']
     session.app_usage = summary['app_usage']
     session.content_categories = summary['content_categories']
+    session.wellness_impacts = summary['wellness_impacts']
+    rollups.apply_session(session)
+    PopulationStatsService(rollups).apply_user(session.user_id)
+    HeatmapService().apply_session(session, recompleted=recompleted)
+    User.bump_data_version(session.user_id)
 
     db.session.commit()
 
+    FrameStorageService().finalize_session(session_id)
+
     from app.services.knowledge_graph import KnowledgeGraphService
     kg_service = KnowledgeGraphService()
     kg_service.update_user_graph(current_user.id)
@@ -85,8 +136,14 @@ def complete_session(session_id):
 @bp.route('/api/sessions')
 @login_required
 def get_sessions():
-    sessions = ScreenSession.query.filter_by(user_id=current_user.id).order_by(ScreenSession.created_at.desc()).all()
-    return jsonify([{
+    """Newest first, paged by ?cursor=&limit=, optionally limited to ?start=&end= (YYYY-MM-DD)"""
+    try:
+        page_args = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    sessions, next_cursor = AnalyticsService().session_page(current_user.id, status=None, **page_args)
+    return jsonify({'items': [{
         'id': s.id,
         'name': s.session_name,
         'created_at': s.created_at.isoformat(),
@@ -94,4 +151,21 @@ def get_sessions():
         'wellness_score': s.wellness_score,
         'productivity_score': s.productivity_score,
         'status': s.status
-    } for s in sessions])
+    } for s in sessions], 'next_cursor': next_cursor})
+
+@bp.route('/api/sessions/<int:session_id>/frames/<int:frame_number>')
+@login_required
+def get_frame_image(session_id, frame_number):
+    """Decrypt and return a stored frame (decoded from its video segment when packed as video)"""
+    session = ScreenSession.query.get(session_id)
+    if not session or session.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'Invalid session'}), 403
+
+    frame = FrameAnalysis.query.filter_by(session_id=session_id, frame_number=frame_number).first()
+    if not frame or not frame.frame_path:
+        return jsonify({'success': False, 'message': 'Frame not available'}), 404
+
+    image_bytes = FrameStorageService().read(frame.frame_path, session_id)
+    response = send_file(io.BytesIO(image_bytes), mimetype='image/jpeg')
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
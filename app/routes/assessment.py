@@ -4,7 +4,7 @@ Periodic Assessment Routes - Weekly/Monthly wellness check-ins
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import PeriodicAssessment, WEEKLY_QUESTIONS, MONTHLY_QUESTIONS
+from app.models import PeriodicAssessment, User, WEEKLY_QUESTIONS, MONTHLY_QUESTIONS
 from datetime import datetime, timedelta
 import json
 
@@ -73,6 +73,7 @@ def weekly():
         assessment.set_insights(insights)
 
         db.session.add(assessment)
+        User.bump_data_version(current_user.id)
         db.session.commit()
 
         flash('Weekly check-in completed! Check your progress below.', 'success')
@@ -146,6 +147,7 @@ def monthly():
             assessment.set_big_five(json.loads(current_user.big_five_normalized))
 
         db.session.add(assessment)
+        User.bump_data_version(current_user.id)
         db.session.commit()
 
         flash('Monthly assessment completed! View your progress trends.', 'success')
@@ -4,6 +4,13 @@ from app.models import ScreenSession, FrameAnalysis
 from app.services.analytics import AnalyticsService
 from app.services.knowledge_graph import KnowledgeGraphService
 from app.services.ai_insights import AIInsightsService
+from app.services.response_cache import cached_response
+from app.services.statistics import StatisticsService, SECTIONS
+from app.services.population import PopulationStatsService, METRICS, SEGMENT_KINDS
+from app.services.heatmap import HeatmapService
+from app.utils.downsample import parse_downsample_args
+from app.utils.pagination import parse_page_args
+from config import Config
 from sqlalchemy import func
 from datetime import datetime, timedelta
 
@@ -26,36 +33,58 @@ def progress():
 
 @bp.route('/api/stats')
 @login_required
+@cached_response
 def get_stats():
     analytics = AnalyticsService()
     return jsonify(analytics.get_user_stats(current_user.id))
 
 @bp.route('/api/app-usage')
 @login_required
+@cached_response
 def get_app_usage():
     analytics = AnalyticsService()
     return jsonify(analytics.get_app_usage_stats(current_user.id))
 
 @bp.route('/api/content-analysis')
 @login_required
+@cached_response
 def get_content_analysis():
     analytics = AnalyticsService()
     return jsonify(analytics.get_content_analysis(current_user.id))
 
 @bp.route('/api/sentiment-timeline')
 @login_required
+@cached_response
 def get_sentiment_timeline():
+    """
+    Paged by ?cursor=&limit=, optionally limited to ?start=&end= (YYYY-MM-DD).
+    ?points=N and/or ?bucket=day|week downsample the whole range instead.
+    """
+    try:
+        page_args = {**parse_page_args(request.args), **parse_downsample_args(request.args)}
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     analytics = AnalyticsService()
-    return jsonify(analytics.get_sentiment_timeline(current_user.id))
+    return jsonify(analytics.get_sentiment_timeline(current_user.id, **page_args))
 
 @bp.route('/api/wellness-trends')
 @login_required
+@cached_response
 def get_wellness_trends():
+    """
+    Paged by ?cursor=&limit=, optionally limited to ?start=&end= (YYYY-MM-DD).
+    ?points=N and/or ?bucket=day|week downsample the whole range instead.
+    """
+    try:
+        page_args = {**parse_page_args(request.args), **parse_downsample_args(request.args)}
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     analytics = AnalyticsService()
-    return jsonify(analytics.get_wellness_trends(current_user.id))
+    return jsonify(analytics.get_wellness_trends(current_user.id, **page_args))
 
 @bp.route('/api/knowledge-graph')
 @login_required
+@cached_response
 def get_knowledge_graph():
     kg_service = KnowledgeGraphService()
     graph_data = kg_service.get_user_graph(current_user.id)
@@ -63,20 +92,24 @@ def get_knowledge_graph():
 
 @bp.route('/api/app-details/<app_name>')
 @login_required
+@cached_response
 def get_app_details(app_name):
     analytics = AnalyticsService()
     return jsonify(analytics.get_app_detailed_analysis(current_user.id, app_name))
 
 @bp.route('/api/ai-insights')
 @login_required
+@cached_response(max_age=3600)
 def get_ai_insights():
     """Get comprehensive AI-powered insights for the user"""
+    # Costs a model call; the recent-days trends it reads hardly move within an hour
     insights_service = AIInsightsService()
     insights = insights_service.get_comprehensive_insights(current_user.id)
     return jsonify(insights)
 
 @bp.route('/api/quick-insights')
 @login_required
+@cached_response(max_age=Config.RESPONSE_CACHE_RELATIVE_TTL_SECONDS)
 def get_quick_insights():
     """Get quick insights for dashboard display"""
     insights_service = AIInsightsService()
@@ -85,6 +118,7 @@ def get_quick_insights():
 
 @bp.route('/api/wellness-alerts')
 @login_required
+@cached_response(max_age=Config.RESPONSE_CACHE_RELATIVE_TTL_SECONDS)
 def get_wellness_alerts():
     """Get wellness alerts for the user"""
     insights_service = AIInsightsService()
@@ -93,19 +127,83 @@ def get_wellness_alerts():
 
 @bp.route('/api/recent-sessions')
 @login_required
+@cached_response(max_age=Config.RESPONSE_CACHE_RELATIVE_TTL_SECONDS)
 def get_recent_sessions():
     """Get recent sessions for the dashboard"""
-    sessions = ScreenSession.query.filter_by(
-        user_id=current_user.id,
-        status='completed'
-    ).order_by(ScreenSession.created_at.desc()).limit(10).all()
-
-    return jsonify([{
-        'id': s.id,
-        'name': s.session_name,
-        'created_at': s.created_at.isoformat(),
-        'duration_seconds': s.duration_seconds,
-        'wellness_score': s.wellness_score,
-        'productivity_score': s.productivity_score,
-        'top_app': max(s.app_usage.items(), key=lambda x: x[1])[0] if s.app_usage else 'Unknown'
-    } for s in sessions])
+    analytics = AnalyticsService()
+    return jsonify(analytics.get_recent_sessions(current_user.id))
+
+@bp.route('/api/overview')
+@login_required
+@cached_response(max_age=Config.RESPONSE_CACHE_RELATIVE_TTL_SECONDS)
+def get_overview():
+    """Every dashboard panel in one response, computed from a single user snapshot"""
+    analytics = AnalyticsService()
+    return jsonify(analytics.get_overview(current_user.id))
+
+@bp.route('/api/statistics')
+@bp.route('/api/statistics/<section>')
+@login_required
+@cached_response(max_age=Config.RESPONSE_CACHE_RELATIVE_TTL_SECONDS)
+def get_statistics(section=None):
+    """
+    Rolling 7/30-day averages, percentiles, streaks, weekday/hour
+    distributions and week-over-week deltas; /api/statistics/<section> for
+    one of them. ?days=N (1-365, default 90) sets the rolling series length.
+    """
+    if section is not None and section not in SECTIONS:
+        return jsonify({'error': f"Unknown section '{section}'"}), 404
+    try:
+        days = int(request.args.get('days', 90))
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+    if not 1 <= days <= 365:
+        return jsonify({'error': 'days must be between 1 and 365'}), 400
+
+    statistics = StatisticsService()
+    sections = [section] if section else SECTIONS
+    return jsonify(statistics.get_statistics(current_user.id, sections=sections, days=days))
+
+@bp.route('/api/percentiles')
+@login_required
+def get_percentiles():
+    """
+    Where the user's average wellness, productivity and social media share
+    rank among all users (?by=all), their personality cluster (?by=cluster)
+    or their age group (?by=age_group). Not response-cached: the
+    histograms change with other users' data, not with the user's.
+    """
+    by = request.args.get('by', 'all')
+    if by not in SEGMENT_KINDS:
+        return jsonify({'error': f"by must be one of {', '.join(SEGMENT_KINDS)}"}), 400
+    population = PopulationStatsService()
+    return jsonify(population.get_user_standing(current_user.id, by=by))
+
+@bp.route('/api/percentiles/<metric>')
+@login_required
+def get_metric_percentile(metric):
+    """Percentile of ?value= for one metric, segmented like /api/percentiles"""
+    if metric not in METRICS:
+        return jsonify({'error': f"Unknown metric '{metric}'"}), 404
+    by = request.args.get('by', 'all')
+    if by not in SEGMENT_KINDS:
+        return jsonify({'error': f"by must be one of {', '.join(SEGMENT_KINDS)}"}), 400
+    try:
+        value = float(request.args['value'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'value must be a number'}), 400
+
+    population = PopulationStatsService()
+    segment = population.segment_for(current_user, by)
+    result = population.percentile(metric, value, segment)
+    return jsonify({'metric': metric, 'value': value, 'segment': segment, **(result or {
+        'percentile': None, 'population': None
+    })})
+
+@bp.route('/api/heatmap')
+@login_required
+@cached_response
+def get_heatmap():
+    """Frames per weekday x hour (UTC) by category, wellness impact and sentiment"""
+    heatmap = HeatmapService()
+    return jsonify(heatmap.get_heatmap(current_user.id))
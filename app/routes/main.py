@@ -41,6 +41,7 @@ def api_profile():
     current_user.occupation = data.get('occupation', current_user.occupation)
     current_user.location = data.get('location', current_user.location)
 
+    User.bump_data_version(current_user.id)
     db.session.commit()
 
     kg_service = KnowledgeGraphService()
@@ -81,6 +82,7 @@ def manage_wellness_goals():
             goals = list(current_user.wellness_goals)
             goals.append(goal)
             current_user.wellness_goals = goals
+            User.bump_data_version(current_user.id)
             db.session.commit()
 
             # Update knowledge graph
@@ -94,6 +96,7 @@ def manage_wellness_goals():
         if current_user.wellness_goals and goal in current_user.wellness_goals:
             goals = [g for g in current_user.wellness_goals if g != goal]
             current_user.wellness_goals = goals
+            User.bump_data_version(current_user.id)
             db.session.commit()
 
             # Update knowledge graph
@@ -0,0 +1,31 @@
+import hmac
+from flask import Blueprint, jsonify, request, abort
+from app import csrf
+from app.services.metrics import metrics
+from config import Config
+
+bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+def _authorized():
+    token = Config.METRICS_TOKEN
+    if not token:
+        # Metrics are disabled unless a scrape token is configured
+        abort(404)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    return hmac.compare_digest(supplied, token)
+
+@bp.route('/')
+@csrf.exempt
+def index():
+    """Per-route and per-stage latency histograms plus OpenAI token usage for this worker"""
+    if not _authorized():
+        return jsonify({'success': False, 'message': 'Invalid metrics token'}), 403
+    return jsonify(metrics.snapshot())
+
+@bp.route('/reset', methods=['POST'])
+@csrf.exempt
+def reset():
+    if not _authorized():
+        return jsonify({'success': False, 'message': 'Invalid metrics token'}), 403
+    metrics.reset()
+    return jsonify({'success': True})
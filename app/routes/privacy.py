@@ -1,11 +1,17 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import (
+    Blueprint, render_template, request, jsonify, flash, redirect, url_for, Response, send_file,
+    stream_with_context
+)
 from flask_login import login_required, current_user
 from app import db
-from app.models import ScreenSession, FrameAnalysis, AuditLog
+from app.models import AuditLog
+from app.services.audit_log import AuditLogService
+from app.services.background_jobs import BackgroundJobService
+from app.services.data_export import DataExportService, FORMATS
+from app.services.purge import PurgeService
+from app.utils.pagination import parse_page_args
+from config import Config
 from pathlib import Path
-import json
-from datetime import datetime
-import shutil
 
 bp = Blueprint('privacy', __name__, url_prefix='/privacy')
 
@@ -25,98 +31,97 @@ def data_settings():
 @bp.route('/export-data', methods=['POST'])
 @login_required
 def export_data():
-    try:
-        user_data = {
-            'user_info': {
-                'name': current_user.name,
-                'email': current_user.email,
-                'created_at': current_user.created_at.isoformat() if current_user.created_at else None,
-                'age': current_user.age,
-                'gender': current_user.gender,
-                'occupation': current_user.occupation,
-                'location': current_user.location
-            },
-            'personality': {
-                'type': current_user.personality_type,
-                'big_five_scores': current_user.big_five_scores
-            },
-            'sessions': []
-        }
-
-        sessions = ScreenSession.query.filter_by(user_id=current_user.id).all()
-        for session in sessions:
-            user_data['sessions'].append({
-                'id': session.id,
-                'created_at': session.created_at.isoformat() if session.created_at else None,
-                'duration': session.duration,
-                'wellness_score': session.wellness_score,
-                'productivity_score': session.productivity_score,
-                'frame_count': session.frame_count
-            })
-
-        AuditLog.log_event(
-            user_id=current_user.id,
-            action='EXPORT',
-            resource='user_data',
-            status='success',
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
-        )
-
-        return jsonify({
-            'success': True,
-            'data': user_data,
-            'exported_at': datetime.utcnow().isoformat()
-        })
-
-    except Exception as e:
-        AuditLog.log_event(
-            user_id=current_user.id,
-            action='EXPORT',
-            resource='user_data',
-            status='failure',
-            ip_address=request.remote_addr,
-            details={'error': str(e)}
-        )
-        return jsonify({'success': False, 'error': str(e)}), 500
+    """
+    Start a data export. Small exports without images are streamed straight
+    away from ``download_url``; anything larger runs as a background job the
+    page polls at ``status_url``.
+    """
+    payload = request.get_json(silent=True) or {}
+    fmt = payload.get('format', 'zip')
+    include_frames = bool(payload.get('include_frames', False))
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'error': f"format must be one of {', '.join(FORMATS)}"}), 400
+
+    service = DataExportService(current_user.id, include_frames=include_frames)
+    if not include_frames and service.frame_count() <= Config.PRIVACY_EXPORT_INLINE_MAX_FRAMES:
+        return jsonify({'success': True, 'status': 'ready',
+                        'download_url': url_for('privacy.stream_export', format=fmt)})
+
+    jobs = BackgroundJobService()
+    job = jobs.active(current_user.id, 'privacy_export') or jobs.submit(
+        'privacy_export', user_id=current_user.id, params={'format': fmt, 'include_frames': include_frames})
+    return jsonify({'success': True, 'status': job.status, 'job_id': job.id,
+                    'status_url': url_for('privacy.export_job_status', job_id=job.id)}), 202
+
+@bp.route('/export-data/stream')
+@login_required
+def stream_export():
+    fmt = request.args.get('format', 'zip')
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'error': f"format must be one of {', '.join(FORMATS)}"}), 400
+
+    AuditLog.log_event(
+        user_id=current_user.id,
+        action='EXPORT',
+        resource='user_data',
+        status='success',
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent'),
+        details={'format': fmt}
+    )
+
+    mimetype, suffix = FORMATS[fmt]
+    service = DataExportService(current_user.id)
+    response = Response(stream_with_context(service.stream(fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="mindfulscreen_data{suffix}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/export-jobs/<job_id>')
+@login_required
+def export_job_status(job_id):
+    job = BackgroundJobService().get(job_id, user_id=current_user.id)
+    if job is None or job.kind != 'privacy_export':
+        return jsonify({'success': False, 'error': 'Export not found'}), 404
+    data = job.to_dict()
+    if job.status == 'completed':
+        data['download_url'] = url_for('privacy.download_export', job_id=job.id)
+    return jsonify({'success': True, 'job': data})
+
+@bp.route('/export-jobs/<job_id>/download')
+@login_required
+def download_export(job_id):
+    job = BackgroundJobService().get(job_id, user_id=current_user.id)
+    if job is None or job.kind != 'privacy_export' or job.status != 'completed' or not job.result_path \
+            or not Path(job.result_path).exists():
+        return jsonify({'success': False, 'error': 'Export not found'}), 404
+    fmt = (job.result or {}).get('format', 'zip')
+    mimetype, suffix = FORMATS.get(fmt, FORMATS['zip'])
+    response = send_file(job.result_path, mimetype=mimetype, as_attachment=True,
+                         download_name=f'mindfulscreen_data{suffix}')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 @bp.route('/delete-account', methods=['POST'])
 @login_required
 def delete_account():
     try:
+        from flask_login import logout_user
         user_id = current_user.id
 
-        FrameAnalysis.query.filter_by(session_id=ScreenSession.id).filter(
-            ScreenSession.user_id == user_id
-        ).delete(synchronize_session=False)
-
-        ScreenSession.query.filter_by(user_id=user_id).delete()
-
-        from app.models import QuizResponse
-        QuizResponse.query.filter_by(user_id=user_id).delete()
-
-        from app.models import KnowledgeGraph
-        KnowledgeGraph.query.filter_by(user_id=user_id).delete()
-
-        from app.models import UserConsent
-        UserConsent.query.filter_by(user_id=user_id).delete()
-
-        from flask_login import logout_user
-        from app.models import User
-        user = User.query.get(user_id)
+        report = PurgeService().purge_account(user_id)
 
+        # The account is gone, so the entry keeps the former id in its details only
         AuditLog.log_event(
-            user_id=user_id,
+            user_id=None,
             action='DELETE',
             resource='account',
             status='success',
             ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
+            user_agent=request.headers.get('User-Agent'),
+            details={'user_id': user_id, 'sessions': report['sessions'], 'frames': report['frames']}
         )
 
-        db.session.delete(user)
-        db.session.commit()
-
         logout_user()
 
         flash('Your account and all associated data have been permanently deleted.', 'success')
@@ -131,24 +136,45 @@ def delete_account():
 @login_required
 def delete_sessions():
     try:
-        sessions = ScreenSession.query.filter_by(user_id=current_user.id).all()
-
-        for session in sessions:
-            FrameAnalysis.query.filter_by(session_id=session.id).delete()
-
-        ScreenSession.query.filter_by(user_id=current_user.id).delete()
-        db.session.commit()
+        report = PurgeService().purge_sessions(current_user.id)
 
         AuditLog.log_event(
             user_id=current_user.id,
             action='DELETE',
             resource='all_sessions',
             status='success',
-            ip_address=request.remote_addr
+            ip_address=request.remote_addr,
+            details={'sessions': report['sessions'], 'frames': report['frames']}
         )
 
-        return jsonify({'success': True, 'message': 'All session data deleted'})
+        response = {'success': True, 'message': 'All session data deleted',
+                    'sessions': report['sessions'], 'frames': report['frames']}
+        if report['job'] is not None:
+            response['status_url'] = url_for('privacy.purge_job_status', job_id=report['job'].id)
+        return jsonify(response)
 
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/purge-jobs/<job_id>')
+@login_required
+def purge_job_status(job_id):
+    """Progress of removing deleted sessions' frame files"""
+    job = BackgroundJobService().get(job_id, user_id=current_user.id)
+    if job is None or job.kind != 'purge_frames':
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@bp.route('/audit-log')
+@login_required
+def audit_log():
+    """The user's audit trail, newest first, paged by ?cursor=&limit=, optionally ?action= and ?start=&end="""
+    try:
+        page_args = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    entries, next_cursor = AuditLogService().user_history(current_user.id, action=request.args.get('action'),
+                                                          **page_args)
+    return jsonify({'success': True, 'items': entries, 'next_cursor': next_cursor})
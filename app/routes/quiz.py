@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for
 from flask_login import login_required, current_user
 from app import db, csrf
-from app.models import QuizResponse
+from app.models import QuizResponse, User
 from app.services.quiz_service import QuizService
 from app.services.knowledge_graph import KnowledgeGraphService
 from datetime import datetime
@@ -93,6 +93,7 @@ def submit_quiz():
         history.append(history_entry)
         current_user.wellness_history = history
 
+        User.bump_data_version(current_user.id)
         db.session.commit()
 
         # Create knowledge graph
@@ -133,6 +134,7 @@ def retake_quiz():
         # Reset quiz status but keep history
         current_user.quiz_completed = False
 
+        User.bump_data_version(current_user.id)
         db.session.commit()
 
         return jsonify({'success': True, 'message': 'You can now retake the quiz'})
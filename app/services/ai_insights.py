@@ -2,6 +2,7 @@ import json
 from datetime import datetime, timedelta
 from openai import OpenAI
 from app.models import User, ScreenSession, FrameAnalysis
+from app.services.rollups import RollupService
 from config import Config
 
 class AIInsightsService:
@@ -10,8 +11,9 @@ class AIInsightsService:
     for digital and physical/mental wellbeing based on user's screen time data.
     """
 
-    def __init__(self):
+    def __init__(self, rollups=None):
         self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.rollups = rollups or RollupService()
 
     def get_comprehensive_insights(self, user_id):
         """Generate comprehensive AI insights for a user"""
@@ -32,44 +34,30 @@ class AIInsightsService:
 
     def _gather_user_data(self, user_id):
         """Gather comprehensive user data for analysis"""
-        sessions = ScreenSession.query.filter_by(
-            user_id=user_id,
-            status='completed'
-        ).order_by(ScreenSession.created_at.desc()).all()
+        rollups = self.rollups
+        totals = rollups.totals(user_id)
+        session_count = totals['session_count']
 
-        if not sessions:
+        if not session_count:
             return {'has_data': False}
 
         # Calculate metrics
-        total_duration = sum(s.duration_seconds or 0 for s in sessions)
-        avg_wellness = sum(s.wellness_score or 0 for s in sessions) / len(sessions) if sessions else 0
-        avg_productivity = sum(s.productivity_score or 0 for s in sessions) / len(sessions) if sessions else 0
-
-        # App usage aggregation
-        app_usage = {}
-        content_categories = {}
-        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0, 'mixed': 0}
-        wellness_impacts = {'positive': 0, 'negative': 0, 'neutral': 0}
-
-        for session in sessions:
-            if session.app_usage:
-                for app, count in session.app_usage.items():
-                    app_usage[app] = app_usage.get(app, 0) + count
-
-            if session.content_categories:
-                for cat, count in session.content_categories.items():
-                    content_categories[cat] = content_categories.get(cat, 0) + count
+        total_duration = totals['duration_seconds']
+        avg_wellness = totals['wellness_score_sum'] / session_count
+        avg_productivity = totals['productivity_score_sum'] / session_count
 
-            if session.sentiment_distribution:
-                for sent, count in session.sentiment_distribution.items():
-                    sentiment_counts[sent] = sentiment_counts.get(sent, 0) + count
+        sentiment_counts = {s: totals[f'sentiment_{s}'] for s in ('positive', 'negative', 'neutral', 'mixed')}
 
-        # Calculate frame-level wellness impacts
-        for session in sessions[:10]:  # Last 10 sessions
-            frames = FrameAnalysis.query.filter_by(session_id=session.id).all()
-            for frame in frames:
-                if frame.wellness_impact:
-                    wellness_impacts[frame.wellness_impact] = wellness_impacts.get(frame.wellness_impact, 0) + 1
+        # Frame-level wellness impacts and the trend look at recent activity, a day at a time
+        recent_days = rollups.recent_days(user_id)
+        wellness_impacts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        sessions_seen = 0
+        for day in recent_days:
+            if sessions_seen >= 10:  # About the last 10 sessions
+                break
+            for impact in wellness_impacts:
+                wellness_impacts[impact] += getattr(day, f'impact_{impact}')
+            sessions_seen += day.session_count
 
         # Calculate percentages
         total_frames = sum(wellness_impacts.values())
@@ -77,17 +65,23 @@ class AIInsightsService:
         productive_percentage = (wellness_impacts.get('positive', 0) / total_frames * 100) if total_frames > 0 else 0
 
         # Sort apps by usage
-        top_apps = sorted(app_usage.items(), key=lambda x: x[1], reverse=True)[:10]
-        top_categories = sorted(content_categories.items(), key=lambda x: x[1], reverse=True)
-
-        # Recent trend analysis
-        recent_sessions = sessions[:5]
-        older_sessions = sessions[5:10] if len(sessions) > 5 else []
+        top_apps = rollups.app_totals(user_id, limit=10)
+        top_categories = rollups.category_totals(user_id)
+
+        # Recent trend analysis: the days holding the latest ~5 sessions against the ~5 before them
+        recent = [0, 0.0]
+        older = [0, 0.0]
+        for day in recent_days:
+            bucket = recent if recent[0] < 5 else older
+            if bucket is older and older[0] >= 5:
+                break
+            bucket[0] += day.session_count
+            bucket[1] += day.wellness_score_sum
 
         wellness_trend = 'stable'
-        if recent_sessions and older_sessions:
-            recent_avg = sum(s.wellness_score or 0 for s in recent_sessions) / len(recent_sessions)
-            older_avg = sum(s.wellness_score or 0 for s in older_sessions) / len(older_sessions)
+        if recent[0] and older[0]:
+            recent_avg = recent[1] / recent[0]
+            older_avg = older[1] / older[0]
             if recent_avg > older_avg + 0.5:
                 wellness_trend = 'improving'
             elif recent_avg < older_avg - 0.5:
@@ -95,7 +89,7 @@ class AIInsightsService:
 
         return {
             'has_data': True,
-            'total_sessions': len(sessions),
+            'total_sessions': session_count,
             'total_duration_hours': round(total_duration / 3600, 1),
             'avg_wellness': round(avg_wellness, 1),
             'avg_productivity': round(avg_productivity, 1),
@@ -1,12 +1,68 @@
+from app import db
 from app.models import ScreenSession, FrameAnalysis, User
+from app.services.app_catalog import AppCatalogService
+from app.services.heatmap import HeatmapService
+from app.services.rollups import RollupService
+from app.utils.downsample import downsample, bucket as bucket_series
+from app.utils.pagination import keyset_page, DEFAULT_PAGE_SIZE
 from sqlalchemy import func
 from datetime import datetime, timedelta
+import numpy as np
 
 class AnalyticsService:
+    def __init__(self, rollups=None):
+        self.rollups = rollups or RollupService()
+
+    def session_page(self, user_id, status='completed', cursor=None, limit=DEFAULT_PAGE_SIZE, start=None, end=None):
+        """One keyset page of a user's sessions, newest first: (sessions, next_cursor)"""
+        query = ScreenSession.query.filter(ScreenSession.user_id == user_id)
+        if status:
+            query = query.filter(ScreenSession.status == status)
+        return keyset_page(query, ScreenSession.created_at, ScreenSession.id,
+                           cursor=cursor, limit=limit, start=start, end=end)
+
+    def session_series(self, user_id, *columns, start=None, end=None):
+        """Rows of (created_at, *columns) for every completed session in the range, oldest first"""
+        query = db.session.query(ScreenSession.created_at, *columns).filter(
+            ScreenSession.user_id == user_id,
+            ScreenSession.status == 'completed',
+            ScreenSession.created_at.isnot(None)
+        )
+        if start is not None:
+            query = query.filter(ScreenSession.created_at >= start)
+        if end is not None:
+            query = query.filter(ScreenSession.created_at < end)
+        return query.order_by(ScreenSession.created_at, ScreenSession.id).all()
+
+    def get_overview(self, user_id):
+        """
+        Every dashboard panel from one snapshot: rollup aggregates are
+        queried once and shared with the insights service, and the newest page
+        of completed sessions is loaded once for the trends, timeline and
+        recent list.
+        """
+        from app.services.ai_insights import AIInsightsService
+        insights = AIInsightsService(rollups=self.rollups)
+        page = self.session_page(user_id)
+
+        return {
+            'stats': self.get_user_stats(user_id),
+            'app_usage': self.get_app_usage_stats(user_id),
+            'content_analysis': self.get_content_analysis(user_id),
+            'sentiment_timeline': self.get_sentiment_timeline(user_id, page=page),
+            'wellness_trends': self.get_wellness_trends(user_id, page=page),
+            'recent_sessions': self.get_recent_sessions(user_id, sessions=page[0]),
+            'heatmap': HeatmapService().get_heatmap(user_id),
+            'quick_insights': insights.get_quick_insights(user_id),
+            'wellness_alerts': insights.get_wellness_alerts(user_id),
+            'generated_at': datetime.utcnow().isoformat()
+        }
+
     def get_user_stats(self, user_id):
-        sessions = ScreenSession.query.filter_by(user_id=user_id, status='completed').all()
+        totals = self.rollups.totals(user_id)
+        session_count = totals['session_count']
 
-        if not sessions:
+        if not session_count:
             return {
                 'total_sessions': 0,
                 'total_duration': 0,
@@ -16,29 +72,21 @@ class AnalyticsService:
                 'no_data': True
             }
 
-        total_duration = sum(s.duration_seconds or 0 for s in sessions)
-        total_frames = sum(s.total_frames or 0 for s in sessions)
-        avg_wellness = sum(s.wellness_score or 0 for s in sessions) / len(sessions)
-        avg_productivity = sum(s.productivity_score or 0 for s in sessions) / len(sessions)
+        avg_wellness = totals['wellness_score_sum'] / session_count
+        avg_productivity = totals['productivity_score_sum'] / session_count
 
         return {
-            'total_sessions': len(sessions),
-            'total_duration': total_duration,
+            'total_sessions': session_count,
+            'total_duration': totals['duration_seconds'],
             'avg_wellness': round(avg_wellness, 2),
             'avg_productivity': round(avg_productivity, 2),
-            'total_frames': total_frames
+            'total_frames': totals['total_frames']
         }
 
     def get_app_usage_stats(self, user_id):
-        sessions = ScreenSession.query.filter_by(user_id=user_id, status='completed').all()
-
-        app_usage = {}
-        for session in sessions:
-            if session.app_usage:
-                for app, count in session.app_usage.items():
-                    app_usage[app] = app_usage.get(app, 0) + count
+        app_usage = self.rollups.app_totals(user_id)
 
-        total = sum(app_usage.values())
+        total = sum(count for _, count in app_usage)
         return {
             'apps': [
                 {
@@ -46,38 +94,32 @@ class AnalyticsService:
                     'count': count,
                     'percentage': round((count / total * 100), 1) if total > 0 else 0
                 }
-                for app, count in sorted(app_usage.items(), key=lambda x: x[1], reverse=True)
+                for app, count in app_usage
             ]
         }
 
     def get_content_analysis(self, user_id):
-        sessions = ScreenSession.query.filter_by(user_id=user_id, status='completed').all()
-
-        content_types = {}
-        sentiment_data = {'positive': 0, 'negative': 0, 'neutral': 0, 'mixed': 0}
-
-        for session in sessions:
-            if session.content_categories:
-                for cat, count in session.content_categories.items():
-                    content_types[cat] = content_types.get(cat, 0) + count
-
-            if session.sentiment_distribution:
-                for sent, count in session.sentiment_distribution.items():
-                    sentiment_data[sent] = sentiment_data.get(sent, 0) + count
+        content_types = dict(self.rollups.category_totals(user_id))
+        totals = self.rollups.totals(user_id)
+        sentiment_data = {s: totals[f'sentiment_{s}'] for s in ('positive', 'negative', 'neutral', 'mixed')}
 
         return {
             'content_types': content_types,
             'sentiment_distribution': sentiment_data
         }
 
-    def get_sentiment_timeline(self, user_id):
-        sessions = ScreenSession.query.filter_by(
-            user_id=user_id,
-            status='completed'
-        ).order_by(ScreenSession.created_at).all()
+    def get_sentiment_timeline(self, user_id, page=None, points=None, bucket=None, **page_args):
+        """
+        One page of the timeline in date order; ``next_cursor`` fetches older
+        sessions. With ``points`` or ``bucket`` the whole start/end range is
+        downsampled into a single bounded response instead.
+        """
+        if points or bucket:
+            return self._downsampled_sentiment(user_id, points, bucket, page_args.get('start'), page_args.get('end'))
+        sessions, next_cursor = page or self.session_page(user_id, **page_args)
 
         timeline = []
-        for session in sessions:
+        for session in reversed(sessions):
             if session.sentiment_distribution:
                 total = sum(session.sentiment_distribution.values())
                 timeline.append({
@@ -87,51 +129,137 @@ class AnalyticsService:
                     'neutral': session.sentiment_distribution.get('neutral', 0) / total * 100 if total > 0 else 0
                 })
 
-        return timeline
+        return {'items': timeline, 'next_cursor': next_cursor}
 
-    def get_wellness_trends(self, user_id):
-        sessions = ScreenSession.query.filter_by(
-            user_id=user_id,
-            status='completed'
-        ).order_by(ScreenSession.created_at).all()
+    def get_wellness_trends(self, user_id, page=None, points=None, bucket=None, **page_args):
+        """
+        One page of trend points in date order; ``next_cursor`` fetches older
+        sessions. With ``points`` or ``bucket`` the whole start/end range is
+        downsampled into a single bounded response instead.
+        """
+        if points or bucket:
+            return self._downsampled_trends(user_id, points, bucket, page_args.get('start'), page_args.get('end'))
+        sessions, next_cursor = page or self.session_page(user_id, **page_args)
 
         trends = []
-        for session in sessions:
+        for session in reversed(sessions):
             trends.append({
                 'date': session.created_at.strftime('%Y-%m-%d %H:%M'),
                 'wellness_score': session.wellness_score or 5.0,
                 'productivity_score': session.productivity_score or 5.0
             })
 
-        return trends
+        return {'items': trends, 'next_cursor': next_cursor}
+
+    def _downsampled_trends(self, user_id, points, bucket, start, end):
+        rows = self.session_series(user_id, ScreenSession.wellness_score, ScreenSession.productivity_score,
+                                   start=start, end=end)
+        if not rows:
+            return {'items': [], 'next_cursor': None}
+
+        timestamps = np.array([row[0] for row in rows], dtype='datetime64[s]')
+        scores = np.array([[row[1] or 5.0, row[2] or 5.0] for row in rows])
+        timestamps, scores, counts = downsample(timestamps, scores, points=points, unit=bucket)
+
+        dates = _format_dates(timestamps, bucket)
+        return {'items': [{
+            'date': date,
+            'wellness_score': round(float(wellness), 2),
+            'productivity_score': round(float(productivity), 2),
+            'sessions': int(count)
+        } for date, (wellness, productivity), count in zip(dates, scores, counts)], 'next_cursor': None}
+
+    def _downsampled_sentiment(self, user_id, points, bucket, start, end):
+        rows = [row for row in self.session_series(user_id, ScreenSession.sentiment_distribution,
+                                                   start=start, end=end) if row[1]]
+        if not rows:
+            return {'items': [], 'next_cursor': None}
+
+        timestamps = np.array([row[0] for row in rows], dtype='datetime64[s]')
+        # positive, negative, neutral and the total over every sentiment
+        counts = np.array([[row[1].get('positive', 0), row[1].get('negative', 0), row[1].get('neutral', 0),
+                            sum(row[1].values())] for row in rows], dtype=np.float64)
+        if bucket:
+            # Pool the frame counts per bucket so long sessions weigh more than short ones
+            timestamps, counts, _ = bucket_series(timestamps, counts, bucket, how='sum')
+
+        totals = counts[:, 3:]
+        shares = np.divide(counts[:, :3] * 100, totals, out=np.zeros_like(counts[:, :3]), where=totals > 0)
+        timestamps, shares, _ = downsample(timestamps, shares, points=points)
+
+        dates = _format_dates(timestamps, 'day')
+        return {'items': [{
+            'date': date,
+            'positive': round(float(positive), 2),
+            'negative': round(float(negative), 2),
+            'neutral': round(float(neutral), 2)
+        } for date, (positive, negative, neutral) in zip(dates, shares)], 'next_cursor': None}
+
+    def get_recent_sessions(self, user_id, limit=10, sessions=None):
+        if sessions is None:
+            sessions = self.session_page(user_id, limit=limit)[0]
+        else:
+            sessions = sessions[:limit]
+
+        return [{
+            'id': s.id,
+            'name': s.session_name,
+            'created_at': s.created_at.isoformat(),
+            'duration_seconds': s.duration_seconds,
+            'wellness_score': s.wellness_score,
+            'productivity_score': s.productivity_score,
+            'top_app': max(s.app_usage.items(), key=lambda x: x[1])[0] if s.app_usage else 'Unknown'
+        } for s in sessions]
 
     def get_app_detailed_analysis(self, user_id, app_name):
-        frames = FrameAnalysis.query.join(ScreenSession).filter(
-            ScreenSession.user_id == user_id,
-            FrameAnalysis.app_detected == app_name
-        ).all()
+        """Aggregated in SQL over the (user_id, app_id) index range of the canonical app"""
+        catalog = AppCatalogService()
+        app_id = catalog.lookup(app_name)
+        rows = []
+        if app_id is not None:
+            rows = db.session.query(
+                FrameAnalysis.content_type,
+                FrameAnalysis.sentiment,
+                FrameAnalysis.wellness_impact,
+                func.count(FrameAnalysis.id),
+                func.coalesce(func.sum(FrameAnalysis.sentiment_score), 0)
+            ).filter(
+                FrameAnalysis.user_id == user_id,
+                FrameAnalysis.app_id == app_id
+            ).group_by(
+                FrameAnalysis.content_type, FrameAnalysis.sentiment, FrameAnalysis.wellness_impact
+            ).all()
 
-        if not frames:
+        if not rows:
             return {'error': 'No data found for this app'}
 
         content_types = {}
         sentiments = {'positive': 0, 'negative': 0, 'neutral': 0, 'mixed': 0}
         wellness_impacts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        total_frames = 0
+        score_sum = 0.0
 
-        for frame in frames:
-            if frame.content_type:
-                content_types[frame.content_type] = content_types.get(frame.content_type, 0) + 1
-            sentiments[frame.sentiment] = sentiments.get(frame.sentiment, 0) + 1
-            wellness_impacts[frame.wellness_impact] = wellness_impacts.get(frame.wellness_impact, 0) + 1
+        for content_type, sentiment, wellness_impact, count, scores in rows:
+            if content_type:
+                content_types[content_type] = content_types.get(content_type, 0) + count
+            sentiments[sentiment] = sentiments.get(sentiment, 0) + count
+            wellness_impacts[wellness_impact] = wellness_impacts.get(wellness_impact, 0) + count
+            total_frames += count
+            score_sum += scores
 
-        total_frames = len(frames)
-        avg_sentiment_score = sum(f.sentiment_score for f in frames if f.sentiment_score) / total_frames
+        avg_sentiment_score = score_sum / total_frames
 
         return {
-            'app_name': app_name,
+            'app_name': catalog.names([app_id])[app_id],
             'total_frames': total_frames,
             'content_types': content_types,
             'sentiments': sentiments,
             'wellness_impacts': wellness_impacts,
             'avg_sentiment_score': round(avg_sentiment_score, 2)
         }
+
+
+def _format_dates(timestamps, bucket):
+    """Chart labels matching the paged series: dates for buckets, minutes for single sessions"""
+    unit = 'D' if bucket else 'm'
+    return [label.replace('T', ' ') for label in np.datetime_as_string(timestamps, unit=unit)]
@@ -0,0 +1,191 @@
+"""
+App Catalog - resolves detected app names to canonical rows of the ``apps`` table
+"""
+import re
+import threading
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Application, FrameAnalysis, ScreenSession
+
+# Normalized key -> (id, name). Rows are never renamed or deleted, so entries never go stale.
+_cache = {}
+_cache_lock = threading.Lock()
+_aliases = None
+
+
+def normalize_app_key(name):
+    """'VSCode', 'Vs Code' and 'vs_code' all become 'vscode'"""
+    return re.sub(r'[^a-z0-9]', '', (name or '').lower())[:100]
+
+
+def _known_apps():
+    """{normalized alias: APP_DATABASE key} for every known app"""
+    global _aliases
+    if _aliases is None:
+        from app.services.screen_analyzer import ScreenAnalyzerService
+        database = ScreenAnalyzerService.APP_DATABASE
+        aliases = {normalize_app_key(name): name for name in database}
+        for name, info in database.items():
+            key = normalize_app_key(name)
+            for keyword in info['keywords']:
+                alias = normalize_app_key(keyword)
+                # Only keywords that spell out the name ('microsoft teams', 'stack overflow'), not generic words
+                if len(alias) >= 4 and (key in alias or alias in key):
+                    aliases.setdefault(alias, name)
+        _aliases = aliases
+    return _aliases
+
+
+class AppCatalogService:
+    """
+    Maps the free-text app names reported by the vision model onto the
+    ``apps`` dimension, so frames carry an integer ``app_id`` and per-app
+    queries are index range scans instead of string matches.
+
+    Names are normalized to lowercase letters and digits and matched against
+    APP_DATABASE (including spelled-out keywords such as 'Microsoft Teams');
+    anything else gets its own row the first time it is seen.
+    """
+
+    def resolve(self, name):
+        """Canonical app id for ``name``, creating the row if needed (inside the caller's transaction)"""
+        key, known = self._canonical_key(name)
+        if not key:
+            return None
+        cached = _cache.get(key)
+        if cached:
+            return cached[0]
+
+        row = Application.query.filter_by(key=key).first()
+        if row is None:
+            # Not cached until committed: a rollback would take the new row with it
+            return self._create(key, name, known).id
+        self._remember(row)
+        return row.id
+
+    def lookup(self, name):
+        """Canonical app id for ``name`` without creating anything, or None"""
+        key, _ = self._canonical_key(name)
+        if not key:
+            return None
+        cached = _cache.get(key)
+        if cached:
+            return cached[0]
+        row = Application.query.filter_by(key=key).first()
+        if row is None:
+            return None
+        self._remember(row)
+        return row.id
+
+    def names(self, app_ids):
+        """{app_id: canonical name}"""
+        with _cache_lock:
+            by_id = {app_id: name for app_id, name in _cache.values()}
+        missing = [app_id for app_id in set(app_ids) if app_id not in by_id]
+        if missing:
+            for row in Application.query.filter(Application.id.in_(missing)).all():
+                self._remember(row)
+                by_id[row.id] = row.name
+        return {app_id: by_id[app_id] for app_id in app_ids if app_id in by_id}
+
+    def canonical_usage(self, app_usage):
+        """Merge a session's {app name: frames} counts under canonical app names"""
+        merged = {}
+        for name, count in (app_usage or {}).items():
+            app_id = self.resolve(name)
+            canonical = self.names([app_id]).get(app_id, name) if app_id else name
+            merged[canonical] = merged.get(canonical, 0) + count
+        return merged
+
+    def seed_known(self):
+        """Insert a row for every APP_DATABASE entry; returns the number added"""
+        from app.services.screen_analyzer import ScreenAnalyzerService
+        existing = {key for key, in db.session.query(Application.key).all()}
+        added = 0
+        for name, info in ScreenAnalyzerService.APP_DATABASE.items():
+            key = normalize_app_key(name)
+            if key not in existing:
+                db.session.add(self._new_row(key, name, name))
+                added += 1
+        db.session.commit()
+        return added
+
+    def backfill(self, batch_size=1000):
+        """
+        Fill ``app_id`` and ``user_id`` on frames written before they existed
+        and re-key completed sessions' app usage by canonical name.
+        """
+        report = {'apps_seeded': self.seed_known(), 'frames': 0, 'sessions': 0}
+
+        last_id = 0
+        while True:
+            rows = db.session.query(
+                FrameAnalysis.id, FrameAnalysis.app_detected, ScreenSession.user_id
+            ).join(ScreenSession, ScreenSession.id == FrameAnalysis.session_id).filter(
+                FrameAnalysis.id > last_id,
+                db.or_(
+                    FrameAnalysis.user_id.is_(None),
+                    db.and_(FrameAnalysis.app_id.is_(None), FrameAnalysis.app_detected.isnot(None))
+                )
+            ).order_by(FrameAnalysis.id).limit(batch_size).all()
+            if not rows:
+                break
+            db.session.bulk_update_mappings(FrameAnalysis, [
+                {'id': row.id, 'user_id': row.user_id, 'app_id': self.resolve(row.app_detected)}
+                for row in rows
+            ])
+            db.session.commit()
+            report['frames'] += len(rows)
+            last_id = rows[-1].id
+
+        last_id = 0
+        while True:
+            sessions = ScreenSession.query.filter(
+                ScreenSession.id > last_id,
+                ScreenSession.status == 'completed'
+            ).order_by(ScreenSession.id).limit(batch_size).all()
+            if not sessions:
+                break
+            for session in sessions:
+                usage = self.canonical_usage(session.app_usage)
+                if usage != (session.app_usage or {}):
+                    session.app_usage = usage
+                    report['sessions'] += 1
+            db.session.commit()
+            last_id = sessions[-1].id
+
+        return report
+
+    def _canonical_key(self, name):
+        """(normalized key, APP_DATABASE key or None)"""
+        key = normalize_app_key(name)
+        if not key:
+            return None, None
+        known = _known_apps().get(key)
+        return (normalize_app_key(known) if known else key), known
+
+    def _create(self, key, name, known):
+        try:
+            # Savepoint, so losing a race with another worker doesn't roll back the caller's transaction
+            with db.session.begin_nested():
+                row = self._new_row(key, name, known)
+                db.session.add(row)
+            return row
+        except IntegrityError:
+            row = Application.query.filter_by(key=key).one()
+            self._remember(row)
+            return row
+
+    @staticmethod
+    def _new_row(key, name, known):
+        if known:
+            from app.services.screen_analyzer import ScreenAnalyzerService
+            info = ScreenAnalyzerService.APP_DATABASE[known]
+            return Application(key=key, name=known.replace('_', ' ').title(), category=info['category'],
+                               wellness_impact=info['wellness_impact'], known=True)
+        return Application(key=key, name=name.strip()[:100], known=False)
+
+    @staticmethod
+    def _remember(row):
+        with _cache_lock:
+            _cache[row.key] = (row.id, row.name)
@@ -0,0 +1,210 @@
+"""
+Audit Log - monthly partitions of audit_logs, partition-drop retention and per-user history
+"""
+import re
+from datetime import datetime
+import sqlalchemy as sa
+from app import db
+from app.models import AuditLog
+from app.utils.pagination import keyset_page, encode_cursor, DEFAULT_PAGE_SIZE
+from config import Config
+
+TABLE = 'audit_logs'
+PARTITION_PATTERN = re.compile(r'^audit_logs_(\d{4})(\d{2})$')
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(moment, months):
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_{month:%Y%m}'
+
+
+def partition_month(name):
+    match = PARTITION_PATTERN.match(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+class AuditLogService:
+    """
+    ``audit_logs`` is split by month so retention drops whole partitions
+    instead of deleting rows.
+
+    PostgreSQL: a table partitioned by range of ``timestamp``, with one
+    ``audit_logs_YYYYMM`` partition per month created AUDIT_PARTITIONS_AHEAD
+    months in advance and a default partition as a safety net. Queries on
+    the parent are pruned to the months they touch.
+
+    SQLite has no partitioning, so ``audit_logs`` holds the current month
+    and is renamed to ``audit_logs_YYYYMM`` (an O(1) catalog change) once the
+    month is over; a fresh ``audit_logs`` continues the id sequence. Reads
+    that span history query each table and merge.
+
+    Every partition has (user_id, timestamp) and (action, timestamp)
+    indexes. ``run_maintenance`` creates or rotates partitions and drops
+    those entirely older than AUDIT_RETENTION_MONTHS; it runs periodically.
+    """
+
+    # ---- maintenance ----
+
+    def run_maintenance(self, now=None):
+        now = now or datetime.utcnow()
+        created = self.ensure_partitions(now)
+        dropped = self.apply_retention(now)
+        return {'created': created, 'dropped': dropped}
+
+    def ensure_partitions(self, now=None):
+        """Create the partitions the coming months will write to (rotate the live table on SQLite)"""
+        now = now or datetime.utcnow()
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            if connection.dialect.name == 'postgresql':
+                return self._ensure_postgres(connection, now)
+            return self._rotate_sqlite(connection, now)
+
+    def apply_retention(self, now=None):
+        """Drop every partition whose rows are all older than AUDIT_RETENTION_MONTHS; returns their names"""
+        cutoff = add_months(month_start(now or datetime.utcnow()), -Config.AUDIT_RETENTION_MONTHS)
+        dropped = []
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            postgres = connection.dialect.name == 'postgresql'
+            for name in self._partition_names(connection):
+                # A partition named for month M holds rows up to the end of M
+                if add_months(partition_month(name), 1) > cutoff:
+                    continue
+                if postgres:
+                    connection.exec_driver_sql(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+                connection.exec_driver_sql(f'DROP TABLE IF EXISTS {name}')
+                dropped.append(name)
+        return dropped
+
+    def _ensure_postgres(self, connection, now):
+        created = []
+        existing = set(self._partition_names(connection))
+        for offset in range(Config.AUDIT_PARTITIONS_AHEAD + 1):
+            month = add_months(month_start(now), offset)
+            name = partition_name(month)
+            if name in existing:
+                continue
+            try:
+                connection.exec_driver_sql(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')")
+                created.append(name)
+            except sa.exc.DBAPIError as e:
+                # The default partition already holds rows of this month; they stay there until moved by hand
+                print(f"Audit log: cannot create partition {name}: {e}")
+        return created
+
+    def _rotate_sqlite(self, connection, now):
+        current = month_start(now)
+        AuditLog.__table__.create(connection, checkfirst=True)  # Heals a rotation interrupted after the rename
+        first = connection.execute(sa.text(f'SELECT timestamp FROM {TABLE} ORDER BY id LIMIT 1')).scalar()
+        if first is None or _as_datetime(first) >= current:
+            return []
+
+        name = partition_name(add_months(current, -1))
+        if sa.inspect(connection).has_table(name):
+            return []  # Already rotated this month; older rows are late (replayed) events
+        last_id = connection.execute(sa.text(f'SELECT max(id) FROM {TABLE}')).scalar() or 0
+
+        try:
+            connection.exec_driver_sql(f'ALTER TABLE {TABLE} RENAME TO {name}')
+        except sa.exc.OperationalError:
+            return []  # Another worker rotated first
+        # Index names are global in SQLite, so the renamed table's indexes take the partition's suffix
+        for index in AuditLog.__table__.indexes:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS {index.name}')
+            connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {index.name}_{name[-6:]} ON {name} '
+                                       f'({", ".join(column.name for column in index.columns)})')
+        AuditLog.__table__.create(connection, checkfirst=True)
+        # Continue the id sequence, so ids stay unique across partitions
+        connection.execute(sa.text('DELETE FROM sqlite_sequence WHERE name = :table'), {'table': TABLE})
+        connection.execute(sa.text('INSERT INTO sqlite_sequence (name, seq) VALUES (:table, :seq)'),
+                           {'table': TABLE, 'seq': last_id})
+        return [name]
+
+    @staticmethod
+    def _partition_names(connection):
+        """Month partitions, oldest first"""
+        if connection.dialect.name == 'postgresql':
+            names = connection.execute(sa.text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table"), {'table': TABLE}).scalars()
+        else:
+            names = sa.inspect(connection).get_table_names()
+        return sorted(name for name in names if PARTITION_PATTERN.match(name))
+
+    # ---- reads and per-user changes ----
+
+    def tables(self):
+        """Tables that hold audit rows, newest first (just the parent on PostgreSQL)"""
+        if db.engine.dialect.name == 'postgresql':
+            return [AuditLog.__table__]
+        with db.engine.connect() as connection:
+            names = self._partition_names(connection)
+        return [AuditLog.__table__] + [_partition_table(name) for name in reversed(names)]
+
+    def user_history(self, user_id, action=None, cursor=None, limit=DEFAULT_PAGE_SIZE, start=None, end=None):
+        """One keyset page of a user's audit entries, newest first: (entries, next_cursor)"""
+        rows = []
+        more = False
+        for table in self.tables():
+            query = db.session.query(table).filter(table.c.user_id == user_id)
+            if action:
+                query = query.filter(table.c.action == action)
+            page, next_cursor = keyset_page(query, table.c.timestamp, table.c.id,
+                                            cursor=cursor, limit=limit, start=start, end=end)
+            rows.extend(page)
+            more = more or next_cursor is not None
+
+        rows.sort(key=lambda row: (row.timestamp, row.id), reverse=True)
+        if len(rows) > limit:
+            rows, more = rows[:limit], True
+        entries = [{
+            'id': row.id,
+            'action': row.action,
+            'resource': row.resource,
+            'status': row.status,
+            'ip_address': row.ip_address,
+            'details': row.details,
+            'timestamp': row.timestamp.isoformat()
+        } for row in rows]
+        return entries, (encode_cursor(rows[-1].timestamp, rows[-1].id) if more and rows else None)
+
+    def user_rows(self, user_id, chunk_rows=1000):
+        """Every audit row of a user, oldest partition first, streamed"""
+        for table in reversed(self.tables()):
+            query = db.session.query(table).filter(table.c.user_id == user_id).order_by(table.c.id)
+            yield from query.yield_per(chunk_rows)
+
+    def detach_user(self, user_id):
+        """Keep a deleted user's audit entries without the link to the user (caller commits)"""
+        for table in self.tables():
+            db.session.execute(sa.update(table).where(table.c.user_id == user_id).values(user_id=None))
+
+
+def _partition_table(name):
+    return AuditLog.__table__.to_metadata(sa.MetaData(), name=name)
+
+
+def _as_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def run_audit_maintenance():
+    report = AuditLogService().run_maintenance()
+    if report['created'] or report['dropped']:
+        print(f"Audit log partitions: created {report['created']}, dropped {report['dropped']}")
+    return report
+
+
+def start_audit_maintenance(app):
+    from app.utils.scheduler import start_periodic_job
+    return start_periodic_job(app, 'audit-maintenance', Config.AUDIT_MAINTENANCE_INTERVAL_SECONDS,
+                              run_audit_maintenance, initial_delay=30)
@@ -0,0 +1,225 @@
+"""
+Audit Writer - buffers audit events and bulk-inserts them off the request path
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app import db
+from app.models import AuditLog
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: spill files are not locked across processes
+    fcntl = None
+
+SPILL_PREFIX = 'audit_spill_'
+REPLAY_CLAIM_STALE_SECONDS = 600
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class AuditWriter:
+    """
+    Collects audit events in memory and writes them with one multi-row
+    INSERT every AUDIT_FLUSH_INTERVAL_SECONDS (sooner once AUDIT_BATCH_SIZE
+    are waiting), on a connection of its own: logging an event never opens a
+    transaction in the request or commits the caller's pending changes.
+
+    When the database cannot be reached a batch is appended to a spill file
+    (one JSON object per line, fsynced) in AUDIT_SPILL_FOLDER, and replayed by
+    whichever worker next writes successfully; workers claim a spill file by
+    renaming it. Events of a user deleted in the meantime are kept without
+    the user link, as account deletion does for older entries. The buffer is
+    flushed when the process exits.
+    """
+
+    def __init__(self, engine, interval=None, batch_size=None, spill_folder=None):
+        self.engine = engine
+        self.interval = interval if interval is not None else Config.AUDIT_FLUSH_INTERVAL_SECONDS
+        self.batch_size = batch_size or Config.AUDIT_BATCH_SIZE
+        self.spill_folder = Path(spill_folder or Config.AUDIT_SPILL_FOLDER)
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='audit-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self, event):
+        with self._buffer_lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write everything buffered (and any spilled events, if the database is back); returns the rows written"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, []
+            written = 0
+            if rows:
+                if not self._insert(rows):
+                    self._spill(rows)
+                    return 0
+                written = len(rows)
+            return written + self._replay_spills()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.interval, 1) * 5)
+        self.flush()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Audit writer flush failed: {e}")
+                traceback.print_exc()
+
+    def _insert(self, rows):
+        """Bulk insert; False when the database is unavailable and the rows must be kept"""
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(sa.insert(AuditLog.__table__), rows)
+            return True
+        except IntegrityError:
+            pass
+        except SQLAlchemyError as e:
+            print(f"Audit writer: database unavailable, spilling {len(rows)} events: {e}")
+            return False
+
+        # Some row references a user deleted since it was logged; write row by row and drop the dangling links
+        try:
+            for row in rows:
+                try:
+                    with self.engine.begin() as connection:
+                        connection.execute(sa.insert(AuditLog.__table__), [row])
+                except IntegrityError:
+                    try:
+                        with self.engine.begin() as connection:
+                            connection.execute(sa.insert(AuditLog.__table__), [{**row, 'user_id': None}])
+                    except IntegrityError as e:
+                        # Not a dangling user; retrying can never succeed
+                        print(f"Audit writer: dropping invalid event {row.get('action')}: {e}")
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def _spill(self, rows):
+        self.spill_folder.mkdir(parents=True, exist_ok=True)
+        path = self.spill_folder / f'{SPILL_PREFIX}{os.getpid()}.ndjson'
+        while True:
+            f = open(path, 'a', encoding='utf-8')
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                if os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            # Claimed for replay between open and lock; start a new file
+            f.close()
+        with f:
+            for row in rows:
+                f.write(json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_spills(self):
+        if not self.spill_folder.is_dir():
+            return 0
+        written = 0
+        for path in sorted(self.spill_folder.iterdir()):
+            claimed = self._claim(path)
+            if claimed is None:
+                continue
+            with open(claimed, encoding='utf-8') as f:
+                if fcntl:
+                    # Wait for a spill that opened the file before it was claimed
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                rows = [json.loads(line) for line in f if line.strip()]
+            for row in rows:
+                row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                if self._insert(batch):
+                    written += len(batch)
+                else:
+                    # Down again: keep what is left in this worker's own spill file
+                    self._spill(rows[start:])
+                    os.remove(claimed)
+                    return written
+            os.remove(claimed)
+        return written
+
+    @staticmethod
+    def _claim(path):
+        """Rename a spill file to this worker's claim; None if it isn't ours to replay"""
+        name = path.name
+        if not name.startswith(SPILL_PREFIX):
+            return None
+        if name.endswith('.replaying'):
+            # Claimed by a worker that died while replaying
+            try:
+                if time.time() - path.stat().st_mtime < REPLAY_CLAIM_STALE_SECONDS:
+                    return None
+            except FileNotFoundError:
+                return None
+        elif not name.endswith('.ndjson'):
+            return None
+
+        claimed = path.with_name(f'{name.split(".")[0]}.{os.getpid()}.{time.monotonic_ns()}.replaying')
+        try:
+            os.rename(path, claimed)
+            os.utime(claimed)  # The claim's age is what marks it stale
+        except FileNotFoundError:
+            return None  # Another worker claimed it first
+        return claimed
+
+
+def record_event(event):
+    """Queue an audit event; without a running writer it is inserted at once, still outside the caller's session"""
+    event.setdefault('timestamp', datetime.utcnow())
+    writer = _writer
+    if writer is not None:
+        writer.write(event)
+        return
+    fallback = AuditWriter(db.engine)
+    if not fallback._insert([event]):
+        fallback._spill([event])
+
+
+def flush_audit_events():
+    """Write out this worker's buffered events now (e.g. before deleting the users they reference)"""
+    return _writer.flush() if _writer is not None else 0
+
+
+def start_audit_writer(app):
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            with app.app_context():
+                _writer = AuditWriter(db.engine).start()
+            atexit.register(_writer.close)
+        return _writer
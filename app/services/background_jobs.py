@@ -0,0 +1,179 @@
+"""
+Background Jobs - runs long user-initiated tasks off the request thread and tracks their progress
+"""
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from flask import current_app
+from app import db
+from app.models import BackgroundJob
+from config import Config
+
+_handlers = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def job_handler(kind):
+    """Register ``func(context)`` as the code run for jobs of ``kind``; its return value becomes the job result"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.BACKGROUND_JOB_WORKERS, thread_name_prefix='job')
+        return _executor
+
+
+class JobContext:
+    """What a handler sees of its job: the parameters, progress reporting and an output file"""
+
+    def __init__(self, job):
+        self.job_id = job.id
+        self.user_id = job.user_id
+        self.params = job.params or {}
+        self.result_path = None
+
+    def report(self, **progress):
+        """Store progress (and a heartbeat) so pollers see it; commits the handler's session"""
+        now = datetime.utcnow()
+        BackgroundJob.query.filter_by(id=self.job_id).update(
+            {BackgroundJob.progress: progress, BackgroundJob.heartbeat_at: now}, synchronize_session=False)
+        db.session.commit()
+
+    def output_path(self, suffix):
+        """Path of the file this job produces; it is deleted when the job expires"""
+        folder = Path(Config.BACKGROUND_JOB_FOLDER)
+        folder.mkdir(parents=True, exist_ok=True)
+        self.result_path = folder / f'{self.job_id}{suffix}'
+        return self.result_path
+
+
+class BackgroundJobService:
+    """
+    Persists jobs in ``background_jobs`` and runs them on a small per-worker
+    thread pool (``BACKGROUND_JOB_WORKERS``). Callers poll the row for status
+    and progress. A job still marked running whose heartbeat is older than
+    ``BACKGROUND_JOB_STALE_SECONDS`` died with its worker and is reported as
+    failed. Finished jobs and their files are removed after
+    ``BACKGROUND_JOB_TTL_HOURS``.
+    """
+
+    def submit(self, kind, user_id=None, params=None):
+        if kind not in _handlers:
+            raise ValueError(f'No handler registered for job kind {kind!r}')
+        self.purge_expired()
+
+        job = BackgroundJob(id=uuid.uuid4().hex, user_id=user_id, kind=kind, params=params or {},
+                            status='queued', heartbeat_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.commit()
+        _get_executor().submit(_run_job, current_app._get_current_object(), job.id)
+        return job
+
+    def get(self, job_id, user_id=None):
+        query = BackgroundJob.query.filter_by(id=job_id)
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        job = query.first()
+        if job is not None and self._is_dead(job):
+            job.status = 'failed'
+            job.error = 'The worker running this job stopped'
+            job.finished_at = datetime.utcnow()
+            job.expires_at = job.finished_at + timedelta(hours=Config.BACKGROUND_JOB_TTL_HOURS)
+            db.session.commit()
+        return job
+
+    def active(self, user_id, kind):
+        """The user's queued or running job of this kind, if any"""
+        jobs = BackgroundJob.query.filter(
+            BackgroundJob.user_id == user_id,
+            BackgroundJob.kind == kind,
+            BackgroundJob.status.in_(('queued', 'running'))
+        ).order_by(BackgroundJob.created_at.desc()).all()
+        for job in jobs:
+            if not self._is_dead(job):
+                return job
+        return None
+
+    def purge_expired(self):
+        """Delete finished jobs past their expiry together with their files"""
+        expired = BackgroundJob.query.filter(BackgroundJob.expires_at < datetime.utcnow()).all()
+        for job in expired:
+            if job.result_path:
+                try:
+                    os.remove(job.result_path)
+                except FileNotFoundError:
+                    pass
+            db.session.delete(job)
+        if expired:
+            db.session.commit()
+        return len(expired)
+
+    def delete_user(self, user_id):
+        """Drop a user's jobs and their files (caller commits)"""
+        for job in BackgroundJob.query.filter_by(user_id=user_id).all():
+            if job.result_path:
+                try:
+                    os.remove(job.result_path)
+                except FileNotFoundError:
+                    pass
+            db.session.delete(job)
+
+    @staticmethod
+    def _is_dead(job):
+        if job.status not in ('queued', 'running'):
+            return False
+        stale_before = datetime.utcnow() - timedelta(seconds=Config.BACKGROUND_JOB_STALE_SECONDS)
+        return (job.heartbeat_at or job.created_at) < stale_before
+
+
+def _run_job(app, job_id):
+    with app.app_context():
+        try:
+            job = db.session.get(BackgroundJob, job_id)
+            if job is None:
+                return
+            job.status = 'running'
+            job.started_at = job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+
+            context = JobContext(job)
+            try:
+                result = _handlers[job.kind](context)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Background job {job_id} ({job.kind}) failed: {e}")
+                traceback.print_exc()
+                if context.result_path:
+                    try:
+                        os.remove(context.result_path)
+                    except FileNotFoundError:
+                        pass
+                job = db.session.get(BackgroundJob, job_id)
+                if job is None:
+                    return
+                job.status = 'failed'
+                job.error = str(e)
+            else:
+                job = db.session.get(BackgroundJob, job_id)
+                if job is None:
+                    # Deleted with its user while running
+                    return
+                job.status = 'completed'
+                job.result = result
+                job.result_path = str(context.result_path) if context.result_path else None
+            job.finished_at = datetime.utcnow()
+            job.expires_at = job.finished_at + timedelta(hours=Config.BACKGROUND_JOB_TTL_HOURS)
+            db.session.commit()
+        finally:
+            db.session.remove()
@@ -0,0 +1,148 @@
+"""
+Capture Control - adaptive capture directives and load shedding for frame uploads
+"""
+import threading
+import time
+from collections import OrderedDict
+from app.utils.image_hash import dhash, hash_similarity
+from config import Config
+
+ACCEPT = 'accept'
+SAMPLE_OUT = 'sampled_out'
+REJECT_USER_BACKLOG = 'user_backlog'
+REJECT_OVERLOADED = 'overloaded'
+
+# HTTP status per admission outcome
+STATUS_CODES = {
+    ACCEPT: 200,
+    SAMPLE_OUT: 202,           # Received but deliberately not analyzed
+    REJECT_USER_BACKLOG: 429,  # This user already has too many frames in flight
+    REJECT_OVERLOADED: 503,    # The worker is over its global backlog threshold
+}
+
+
+class TokenBucket:
+    """Model-call budget refilled continuously at ``rate_per_minute``"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def fill_ratio(self):
+        self._refill()
+        return self.tokens / self.capacity if self.capacity else 0.0
+
+    def try_consume(self, amount):
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+
+class CaptureController:
+    """
+    Decides, per uploaded frame, whether to analyze it and how the client
+    should capture the next one.
+
+    Inputs are the user's in-flight frame count (queue depth), the worker's
+    model-call budget and the perceptual similarity to the session's previous
+    frame. State is per worker process, which matches where the load lands.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inflight_by_user = {}
+        self.inflight_total = 0
+        self.budget = TokenBucket(Config.MODEL_CALL_BUDGET_PER_MINUTE)
+        self.last_hashes = OrderedDict()
+
+    def admit(self, user_id, session_id, frame_number, image_bytes):
+        """
+        Return (outcome, http_status, directive, similarity).
+
+        An accepted frame holds an in-flight slot until :meth:`release` is called.
+        """
+        try:
+            frame_hash = dhash(image_bytes)
+        except Exception:
+            frame_hash = None
+
+        with self._lock:
+            similarity = hash_similarity(frame_hash, self.last_hashes.get(session_id))
+            self._remember_hash(session_id, frame_hash)
+
+            depth = self.inflight_by_user.get(user_id, 0)
+            budget_ratio = self.budget.fill_ratio()
+
+            if self.inflight_total >= Config.CAPTURE_MAX_INFLIGHT_GLOBAL:
+                outcome = REJECT_OVERLOADED
+            elif depth >= Config.CAPTURE_MAX_INFLIGHT_PER_USER:
+                outcome = REJECT_USER_BACKLOG
+            elif self._should_sample_out(frame_number, similarity, budget_ratio):
+                outcome = SAMPLE_OUT
+            elif not self.budget.try_consume(Config.MODEL_CALLS_PER_FRAME):
+                outcome = SAMPLE_OUT
+            else:
+                outcome = ACCEPT
+                # Reserve the in-flight slot under the same lock as the checks above
+                self.inflight_by_user[user_id] = depth + 1
+                self.inflight_total += 1
+
+            directive = self._directive(depth, budget_ratio, similarity)
+
+        return outcome, STATUS_CODES[outcome], directive, similarity
+
+    def release(self, user_id):
+        """Free the in-flight slot reserved by an accepted frame"""
+        with self._lock:
+            remaining = self.inflight_by_user.get(user_id, 1) - 1
+            if remaining > 0:
+                self.inflight_by_user[user_id] = remaining
+            else:
+                self.inflight_by_user.pop(user_id, None)
+            self.inflight_total = max(0, self.inflight_total - 1)
+
+    def _should_sample_out(self, frame_number, similarity, budget_ratio):
+        # Near-identical frames add nothing once the budget is under pressure
+        if similarity >= Config.CAPTURE_DUPLICATE_SIMILARITY and budget_ratio < 0.5:
+            return True
+        # Below the low-water mark keep only every Nth frame
+        if budget_ratio < Config.CAPTURE_BUDGET_LOW_WATER:
+            return frame_number % Config.CAPTURE_SAMPLE_EVERY != 0
+        return False
+
+    def _directive(self, depth, budget_ratio, similarity):
+        interval = Config.FRAME_EXTRACTION_RATE * 1000
+        if similarity >= Config.CAPTURE_DUPLICATE_SIMILARITY:
+            interval *= 2
+        elif similarity >= 0.9:
+            interval *= 1.5
+        interval *= 1 + depth
+        if budget_ratio < Config.CAPTURE_BUDGET_LOW_WATER:
+            interval *= 3
+        elif budget_ratio < 0.5:
+            interval *= 1.5
+
+        loaded = depth > 0 or budget_ratio < 0.5
+        return {
+            'interval_ms': int(min(max(interval, Config.CAPTURE_MIN_INTERVAL_MS), Config.CAPTURE_MAX_INTERVAL_MS)),
+            'max_width': Config.CAPTURE_REDUCED_WIDTH if loaded else Config.CAPTURE_MAX_WIDTH,
+            'quality': Config.CAPTURE_REDUCED_QUALITY if loaded else Config.CAPTURE_QUALITY
+        }
+
+    def _remember_hash(self, session_id, frame_hash):
+        self.last_hashes[session_id] = frame_hash
+        self.last_hashes.move_to_end(session_id)
+        while len(self.last_hashes) > 1024:
+            self.last_hashes.popitem(last=False)
+
+
+capture_controller = CaptureController()
@@ -0,0 +1,250 @@
+"""
+Data Export - streams everything stored about a user as NDJSON or a ZIP archive
+"""
+import base64
+import json
+import time
+import zipfile
+from datetime import date, datetime
+from sqlalchemy import func
+from app import db
+from app.models import (
+    User, ScreenSession, FrameAnalysis, QuizResponse, PeriodicAssessment, KnowledgeGraph,
+    AuditLog, UserConsent
+)
+from app.services.audit_log import AuditLogService
+from app.services.background_jobs import job_handler
+from app.services.data_keys import DataKeyService, SEALED_TEXT_FIELDS
+from app.services.frame_storage import FrameStorageService
+from config import Config
+
+FORMATS = {'ndjson': ('application/x-ndjson', '.ndjson'), 'zip': ('application/zip', '.zip')}
+
+# Server bookkeeping that says nothing about the user
+PROFILE_EXCLUDE = ('password_hash', 'data_version')
+SESSION_EXCLUDE = ('retention_claim', 'retention_claimed_at')
+FRAME_EXCLUDE = ('frame_path',)
+
+
+class DataExportService:
+    """
+    Produces a user's complete data export as a stream of byte chunks:
+    profile, consents, quiz responses, assessments, knowledge graph, audit
+    history, and every session with all of its frame analyses (their sealed
+    text decrypted, optionally with the decrypted frame images).
+
+    Rows are read as plain column tuples in ``chunk_rows`` batches (sessions
+    by id range, frames per session), never as ORM objects collected in a
+    list, so memory stays constant however much history the user has; the
+    ZIP writer only keeps each entry's directory record.
+    """
+
+    def __init__(self, user_id, include_frames=False, chunk_rows=None):
+        self.user_id = user_id
+        self.include_frames = include_frames
+        self.chunk_rows = chunk_rows or Config.PRIVACY_EXPORT_CHUNK_ROWS
+        self.storage = FrameStorageService() if include_frames else None
+        self.keys = DataKeyService()
+
+    def session_count(self):
+        return ScreenSession.query.filter_by(user_id=self.user_id).count()
+
+    def frame_count(self):
+        return db.session.query(func.count(FrameAnalysis.id)).join(
+            ScreenSession, ScreenSession.id == FrameAnalysis.session_id
+        ).filter(ScreenSession.user_id == self.user_id).scalar()
+
+    def stream(self, fmt, on_session=None):
+        """Byte chunks of the export in ``fmt`` ('ndjson' or 'zip'); ``on_session(done, total)`` tracks progress"""
+        if fmt == 'zip':
+            return self.zip(on_session)
+        return self.ndjson(on_session)
+
+    # ---- NDJSON: one {"type": ..., ...} object per line ----
+
+    def ndjson(self, on_session=None):
+        yield _line({'type': 'export', 'user_id': self.user_id, 'exported_at': datetime.utcnow().isoformat(),
+                     'include_frames': self.include_frames})
+        for name, records in self._documents():
+            for record in records:
+                yield _line({'type': name, **record})
+
+        for session, frames in self._sessions(on_session):
+            yield _line({'type': 'session', **session})
+            for frame in frames:
+                if self.include_frames:
+                    image = self._frame_image(frame)
+                    frame['image_base64'] = base64.b64encode(image).decode('ascii') if image is not None else None
+                yield _line({'type': 'frame', **frame})
+
+    # ---- ZIP: one file per document, a folder per session ----
+
+    def zip(self, on_session=None):
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            def entry(name, chunks, compress=True):
+                info = zipfile.ZipInfo(name, date_time=datetime.utcnow().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+                with archive.open(info, 'w', force_zip64=True) as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                        yield from sink.drain()
+                yield from sink.drain()
+
+            yield from entry('export.json', [_json({
+                'user_id': self.user_id, 'exported_at': datetime.utcnow().isoformat(),
+                'include_frames': self.include_frames
+            })])
+            for name, records in self._documents():
+                yield from entry(f'{name}.ndjson', (_line(record) for record in records))
+
+            for session, frames in self._sessions(on_session):
+                folder = f"sessions/{session['id']}"
+                yield from entry(f'{folder}/session.json', [_json(session)])
+                images = []
+                yield from entry(f'{folder}/frames.ndjson', self._frame_lines(frames, images))
+                for frame_number, frame_path in images:
+                    image = self._read_image(frame_path)
+                    if image is not None:
+                        # JPEG is already compressed
+                        yield from entry(f'{folder}/frames/frame_{frame_number:04d}.jpg', [image], compress=False)
+        yield from sink.drain()
+
+    def _frame_lines(self, frames, images):
+        for frame in frames:
+            if self.include_frames and frame.get('_frame_path'):
+                images.append((frame['frame_number'], frame['_frame_path']))
+            frame.pop('_frame_path', None)
+            yield _line(frame)
+
+    # ---- record sources ----
+
+    def _documents(self):
+        """(name, records) for everything that is not a session"""
+        user = db.session.get(User, self.user_id)
+        yield 'profile', [_row_dict(user.__table__.columns, [getattr(user, c.name) for c in user.__table__.columns],
+                                    PROFILE_EXCLUDE)]
+        yield 'consents', self._rows(UserConsent, UserConsent.user_id == self.user_id)
+        yield 'quiz_responses', self._rows(QuizResponse, QuizResponse.user_id == self.user_id)
+        yield 'assessments', self._rows(PeriodicAssessment, PeriodicAssessment.user_id == self.user_id)
+        yield 'knowledge_graph', self._rows(KnowledgeGraph, KnowledgeGraph.user_id == self.user_id)
+        columns = list(AuditLog.__table__.columns)
+        yield 'audit_log', (_row_dict(columns, row) for row in AuditLogService().user_rows(self.user_id,
+                                                                                          self.chunk_rows))
+
+    def _rows(self, model, *criteria, exclude=()):
+        columns = [c for c in model.__table__.columns if c.name not in exclude]
+        query = db.session.query(*columns).filter(*criteria).order_by(*model.__table__.primary_key.columns)
+        for row in query.yield_per(self.chunk_rows):
+            yield _row_dict(columns, row)
+
+    def _sessions(self, on_session=None):
+        """(session record, frame records) per session, oldest first"""
+        columns = [c for c in ScreenSession.__table__.columns if c.name not in SESSION_EXCLUDE]
+        total = self.session_count() if on_session else None
+        done = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(*columns).filter(
+                ScreenSession.user_id == self.user_id,
+                ScreenSession.id > last_id
+            ).order_by(ScreenSession.id).limit(self.chunk_rows).all()
+            if not rows:
+                break
+            for row in rows:
+                session = _row_dict(columns, row)
+                yield session, self._frames(session['id'])
+                done += 1
+                if on_session:
+                    on_session(done, total)
+            last_id = rows[-1].id
+
+    def _frames(self, session_id):
+        columns = [c for c in FrameAnalysis.__table__.columns if c.name not in FRAME_EXCLUDE]
+        query = db.session.query(*columns, FrameAnalysis.frame_path).filter(
+            FrameAnalysis.session_id == session_id
+        ).order_by(FrameAnalysis.frame_number, FrameAnalysis.id)
+        sealed = [i for i, c in enumerate(columns) if c.name in SEALED_TEXT_FIELDS]
+        for row in query.yield_per(self.chunk_rows):
+            values = list(row)
+            for i in sealed:
+                values[i] = self.keys.open_text(session_id, values[i])
+            frame = _row_dict(columns, values)
+            frame['_frame_path'] = row[-1]
+            yield frame
+
+    def _frame_image(self, frame):
+        return self._read_image(frame.pop('_frame_path', None))
+
+    def _read_image(self, frame_path):
+        """Decrypted image bytes, or None when the frame was never stored or has been purged"""
+        if not frame_path:
+            return None
+        try:
+            return self.storage.read(frame_path)
+        except Exception:
+            # A missing or unreadable frame leaves a gap instead of failing the whole export
+            return None
+
+
+class _ChunkSink:
+    """Write-only file object for zipfile; the generator hands each written chunk on"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return value
+
+
+def _row_dict(columns, values, exclude=()):
+    return {c.name: _jsonable(v) for c, v in zip(columns, values) if c.name not in exclude}
+
+
+def _json(record):
+    return json.dumps(record, default=str).encode('utf-8')
+
+
+def _line(record):
+    return _json(record) + b'\n'
+
+
+@job_handler('privacy_export')
+def run_export_job(context):
+    """Write the export to the job's file, reporting session progress"""
+    fmt = context.params.get('format', 'zip')
+    service = DataExportService(context.user_id, include_frames=context.params.get('include_frames', False))
+    path = context.output_path(FORMATS[fmt][1])
+
+    last_report = [0.0]
+
+    def on_session(done, total):
+        if time.monotonic() - last_report[0] >= 2 or done == total:
+            context.report(sessions_done=done, sessions_total=total)
+            last_report[0] = time.monotonic()
+
+    size = 0
+    with open(path, 'wb') as f:
+        for chunk in service.stream(fmt, on_session=on_session):
+            f.write(chunk)
+            size += len(chunk)
+
+    AuditLog.log_event(user_id=context.user_id, action='EXPORT', resource='user_data', status='success',
+                       details={'job_id': context.job_id, 'format': fmt, 'include_frames': service.include_frames})
+    return {'format': fmt, 'bytes': size, 'filename': f'mindfulscreen_data{FORMATS[fmt][1]}'}
@@ -0,0 +1,161 @@
+"""
+Data Keys - per-session encryption keys for frames and their text, wrapped by the master key, so deleting data is deleting a key
+"""
+import threading
+import time
+from collections import OrderedDict
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import DataKey, ScreenSession
+from app.utils.encryption import EncryptionService
+from config import Config
+
+_master = None
+_master_lock = threading.Lock()
+
+# session_id -> (user_id, Fernet, loaded_at); only keys read back from committed rows
+_keys = OrderedDict()
+_keys_lock = threading.Lock()
+
+# FrameAnalysis columns holding free text sealed with the session's key
+SEALED_TEXT_FIELDS = ('extracted_text', 'translated_text', 'content_description', 'audio_transcript')
+
+# Every Fernet token starts with these characters (version byte and the high bytes of its timestamp)
+_SEALED_TEXT_PREFIX = 'gAAAAA'
+
+
+def master_cipher():
+    """The master-key Fernet; deriving it costs a PBKDF2 run, so it is done once per process"""
+    global _master
+    with _master_lock:
+        if _master is None:
+            _master = EncryptionService(Config.ENCRYPTION_KEY).cipher
+        return _master
+
+
+class DataKeyService:
+    """
+    Every session gets its own random data-encryption key (DEK). Frames, and
+    the free text read off them (extracted_text, translated_text,
+    content_description, audio_transcript), are sealed with it, and only the
+    DEK wrapped by the master key is stored, in ``data_keys``. Deleting those
+    rows crypto-shreds the frames at once, at the cost of one small DELETE
+    however many files there are; the files themselves become unreadable
+    noise that the frame sweeper reclaims later.
+
+    Ciphers are MultiFernets of (DEK, master key): they encrypt with the DEK
+    and still decrypt frames written before sessions had keys. Shredding a
+    key does not make those frames unreadable, so sessions that may hold
+    them are reported by ``master_sealed_sessions`` and their files have to
+    be removed when they are shredded. Unwrapped keys
+    are cached per process for DATA_KEY_CACHE_SECONDS, which also bounds how
+    long another worker can keep reading a shredded session.
+    """
+
+    def create_session_key(self, session):
+        """Give a new session its key (caller commits, together with the session)"""
+        db.session.add(DataKey(session_id=session.id, user_id=session.user_id,
+                               wrapped_key=master_cipher().encrypt(Fernet.generate_key())))
+
+    def cipher_for(self, session_id, create=False):
+        """
+        Cipher for a session's frames. With ``create`` a session without a key
+        (started before keys existed) gets one; otherwise such sessions, and
+        shredded ones, get the master key alone.
+        """
+        key = self._session_key(session_id, create) if session_id is not None else None
+        return MultiFernet([key, master_cipher()] if key else [master_cipher()])
+
+    def seal_text(self, session_id, text):
+        """Encrypt a frame's free text with the session's key (unchanged when frame encryption is disabled)"""
+        if not text or not Config.ENCRYPT_FRAMES:
+            return text
+        return self.cipher_for(session_id, create=True).encrypt(text.encode()).decode()
+
+    def open_text(self, session_id, value):
+        """
+        Decrypt a frame's sealed text. Text stored before it was sealed comes
+        back as it is; text whose key was shredded comes back as None.
+        """
+        if not value or not value.startswith(_SEALED_TEXT_PREFIX):
+            return value
+        try:
+            return self.cipher_for(session_id).decrypt(value.encode()).decode()
+        except InvalidToken:
+            return None
+
+    def master_sealed_sessions(self, session_ids):
+        """
+        Those of these sessions whose frames may be sealed with the master key:
+        sessions without a key, and sessions whose key was created after they
+        had already stored frames. Shredding their keys leaves those frames readable.
+        """
+        if not session_ids or not Config.ENCRYPT_FRAMES:
+            return []
+        sealed = {row.session_id for row in db.session.query(DataKey.session_id).filter(
+            DataKey.session_id.in_(session_ids), DataKey.legacy_frames.is_(False)).all()}
+        return [session_id for session_id in session_ids if session_id not in sealed]
+
+    def shred_sessions(self, session_ids):
+        """Destroy the keys of these sessions (caller commits)"""
+        if not session_ids:
+            return 0
+        deleted = DataKey.query.filter(DataKey.session_id.in_(session_ids)).delete(synchronize_session=False)
+        with _keys_lock:
+            for session_id in session_ids:
+                _keys.pop(session_id, None)
+        return deleted
+
+    def shred_user(self, user_id):
+        """Destroy the keys of all of a user's sessions (caller commits)"""
+        deleted = DataKey.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        with _keys_lock:
+            for session_id in [sid for sid, entry in _keys.items() if entry[0] == user_id]:
+                del _keys[session_id]
+        return deleted
+
+    def _session_key(self, session_id, create):
+        with _keys_lock:
+            entry = _keys.get(session_id)
+            if entry and time.monotonic() - entry[2] < Config.DATA_KEY_CACHE_SECONDS:
+                _keys.move_to_end(session_id)
+                return entry[1]
+
+        row = db.session.query(DataKey.user_id, DataKey.wrapped_key).filter(DataKey.session_id == session_id).first()
+        if row is None:
+            if not create:
+                return None
+            row = self._create_committed(session_id)
+            if row is None:
+                return None
+
+        key = Fernet(master_cipher().decrypt(row.wrapped_key))
+        with _keys_lock:
+            _keys[session_id] = (row.user_id, key, time.monotonic())
+            _keys.move_to_end(session_id)
+            while len(_keys) > Config.DATA_KEY_CACHE_SIZE:
+                _keys.popitem(last=False)
+        return key
+
+    @staticmethod
+    def _create_committed(session_id):
+        """
+        Create a key in its own transaction, so a frame sealed with it never
+        outlives a rolled-back request; losing the race to another worker
+        just means using its key.
+        """
+        user_id = db.session.query(ScreenSession.user_id).filter(ScreenSession.id == session_id).scalar()
+        if user_id is None:
+            return None
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(sa.insert(DataKey).values(
+                    session_id=session_id, user_id=user_id, legacy_frames=True,
+                    wrapped_key=master_cipher().encrypt(Fernet.generate_key())))
+        except IntegrityError:
+            pass
+        with db.engine.connect() as connection:
+            return connection.execute(sa.select(DataKey.user_id, DataKey.wrapped_key).where(
+                DataKey.session_id == session_id)).first()
@@ -0,0 +1,196 @@
+"""
+Frame Storage - where analyzed frame images are kept and how they are read back
+"""
+import os
+import shutil
+from pathlib import Path
+from app import db
+from app.models import FrameAnalysis
+from app.services.data_keys import DataKeyService
+from app.utils.frame_archive import FrameArchive, ARCHIVE_SUFFIX, make_frame_ref, parse_frame_ref
+from app.utils.frame_video import FrameVideoStore, parse_video_ref
+from config import Config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class FrameStorageService:
+    """
+    Stores frame images for a session using the configured backend:
+
+    - ``archive``: one append-only ``<session_id>.pack`` per session (default)
+    - ``files``: one ``frame_NNNN.jpg[.enc]`` file per frame (legacy layout)
+    - ``video``: frames are staged in the archive while recording and encoded
+      into encrypted video segments when the session completes
+
+    Reads understand every reference format ever written, so switching the
+    backend never strands existing frames. With ENCRYPT_FRAMES each session's
+    frames are sealed with that session's own key (see DataKeyService).
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or Config.FRAME_STORAGE_BACKEND
+        self.frames_dir = Path(Config.FRAMES_FOLDER)
+        self.keys = DataKeyService() if Config.ENCRYPT_FRAMES else None
+
+    def cipher_for(self, session_id, create=False):
+        """The session's frame cipher, or None when frame encryption is disabled"""
+        return self.keys.cipher_for(session_id, create=create) if self.keys else None
+
+    def seal(self, image_bytes, session_id):
+        """Encrypt raw image bytes with the session's key (no-op when frame encryption is disabled)"""
+        cipher = self.cipher_for(session_id, create=True)
+        return cipher.encrypt(image_bytes) if cipher else image_bytes
+
+    def write(self, session_id, frame_number, sealed_bytes):
+        """Persist sealed frame bytes and return the reference to store in frame_path"""
+        if self.backend in ('archive', 'video'):
+            archive = self.archive_for(session_id)
+            offset = archive.append(frame_number, sealed_bytes)
+            return make_frame_ref(archive.path, offset)
+
+        session_dir = self.frames_dir / str(session_id)
+        session_dir.mkdir(parents=True, exist_ok=True)
+        suffix = '.jpg.enc' if self.keys else '.jpg'
+        frame_path = session_dir / f"frame_{frame_number:04d}{suffix}"
+        with open(frame_path, 'wb') as f:
+            f.write(sealed_bytes)
+        return str(frame_path)
+
+    def read(self, frame_ref, session_id=None):
+        """Return the decrypted image bytes for a stored frame reference"""
+        if session_id is None:
+            session_id = self.session_of(frame_ref)
+        cipher = self.cipher_for(session_id)
+
+        video_ref = parse_video_ref(frame_ref)
+        if video_ref:
+            segment_path, position = video_ref
+            return self.video_store_for(segment_path.parent.parent, cipher).read_frame(segment_path, position)
+
+        archive_ref = parse_frame_ref(frame_ref)
+        if archive_ref:
+            archive_path, offset = archive_ref
+            data = FrameArchive(archive_path).read(offset)
+            return cipher.decrypt(data) if cipher else data
+
+        with open(frame_ref, 'rb') as f:
+            data = f.read()
+        return cipher.decrypt(data) if cipher and str(frame_ref).endswith('.enc') else data
+
+    @staticmethod
+    def session_of(frame_ref):
+        """Session id a frame reference belongs to, from the storage layout (None if it doesn't follow it)"""
+        video_ref = parse_video_ref(frame_ref)
+        archive_ref = parse_frame_ref(frame_ref)
+        if video_ref:
+            name = video_ref[0].parent.parent.name
+        elif archive_ref:
+            name = archive_ref[0].name[:-len(ARCHIVE_SUFFIX)]
+        else:
+            name = Path(frame_ref).parent.name
+        return int(name) if name.isdigit() else None
+
+    def archive_for(self, session_id):
+        return FrameArchive(self.frames_dir / f"{session_id}{ARCHIVE_SUFFIX}")
+
+    def video_store_for(self, session_dir, cipher=None):
+        return FrameVideoStore(
+            session_dir,
+            fourcc=Config.FRAME_VIDEO_FOURCC,
+            extension=Config.FRAME_VIDEO_EXTENSION,
+            cipher=cipher
+        )
+
+    def session_files(self, session_id):
+        """Fixed per-session artifacts that are not referenced from frame_path"""
+        return [self.archive_for(session_id).path,
+                self.video_store_for(self.frames_dir / str(session_id)).index_path]
+
+    @staticmethod
+    def physical_path(frame_ref):
+        """The file on disk that holds a frame (the archive or video segment for packed frames)"""
+        packed_ref = parse_video_ref(frame_ref) or parse_frame_ref(frame_ref)
+        return packed_ref[0] if packed_ref else Path(frame_ref)
+
+    def finalize_session(self, session_id):
+        """Called when a recording completes; encodes staged frames into video for the video backend"""
+        if self.backend == 'video':
+            return self.compact_to_video(session_id)
+        return 0
+
+    def compact_to_video(self, session_id):
+        """
+        Move the session's archive-staged frames into a new video segment.
+
+        frame_path is rewritten to the segment reference in one bulk update.
+        The staging archive is removed only if nothing was appended to it
+        while encoding, so a still-recording session never loses frames.
+        Returns the number of frames moved.
+        """
+        archive = self.archive_for(session_id)
+        cipher = self.cipher_for(session_id)
+        store = self.video_store_for(self.frames_dir / str(session_id), cipher)
+        store.video_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(store.video_dir / '.lock', 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+
+            rows = FrameAnalysis.query.with_entities(
+                FrameAnalysis.id, FrameAnalysis.frame_number, FrameAnalysis.frame_path
+            ).filter(
+                FrameAnalysis.session_id == session_id,
+                FrameAnalysis.frame_path.like(f'%{ARCHIVE_SUFFIX}#%')
+            ).order_by(FrameAnalysis.frame_number).all()
+            if not rows:
+                return 0
+
+            archive_size = archive.size()
+            offsets = [parse_frame_ref(row.frame_path)[1] for row in rows]
+            blobs = dict(archive.read_many(offsets))
+            ordered = [(row.frame_number, row.id, blobs[offset]) for row, offset in zip(rows, offsets)]
+
+            segment_size = Config.FRAME_VIDEO_SEGMENT_FRAMES
+            updates = []
+            for start in range(0, len(ordered), segment_size):
+                chunk = ordered[start:start + segment_size]
+                refs = store.append_segment([
+                    (frame_number, cipher.decrypt(blob) if cipher else blob)
+                    for frame_number, _, blob in chunk
+                ])
+                updates.extend(
+                    {'id': row_id, 'frame_path': refs[frame_number]}
+                    for frame_number, row_id, _ in chunk if frame_number in refs
+                )
+
+            db.session.bulk_update_mappings(FrameAnalysis, updates)
+            db.session.commit()
+
+            still_staged = FrameAnalysis.query.filter(
+                FrameAnalysis.session_id == session_id,
+                FrameAnalysis.frame_path.like(f'%{ARCHIVE_SUFFIX}#%')
+            ).count()
+            if not still_staged and archive.size() == archive_size:
+                archive.delete()
+
+            return len(updates)
+
+    def delete_session(self, session_id):
+        """Remove every stored frame of a session; returns the bytes reclaimed"""
+        reclaimed = self.archive_for(session_id).delete()
+
+        session_dir = self.frames_dir / str(session_id)
+        if session_dir.is_dir():
+            for root, _, files in os.walk(session_dir):
+                for name in files:
+                    try:
+                        reclaimed += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+            shutil.rmtree(session_dir, ignore_errors=True)
+
+        return reclaimed
@@ -0,0 +1,162 @@
+"""
+Usage Heatmap - per-user weekday x hour counts of categories, wellness impacts and sentiments
+"""
+from datetime import timedelta
+from sqlalchemy.exc import IntegrityError
+import numpy as np
+from app import db
+from app.models import ScreenSession, FrameAnalysis, UserUsageHeatmap
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Channel order of the stored array. Changing it means bumping LAYOUT; arrays
+# written with another layout are rebuilt from the frames on first read.
+LAYOUT = 1
+CATEGORIES = ('social_media', 'video', 'entertainment', 'messaging', 'work', 'professional', 'educational',
+              'shopping', 'gaming', 'news', 'health', 'finance', 'utility', 'travel', 'food', 'music', 'dating',
+              'ai_tools', 'other')
+IMPACTS = ('positive', 'neutral', 'negative')
+SENTIMENTS = ('positive', 'negative', 'neutral', 'mixed')
+CHANNELS = len(CATEGORIES) + len(IMPACTS) + len(SENTIMENTS)
+SHAPE = (7, 24, CHANNELS)
+
+_CATEGORY_INDEX = {name: i for i, name in enumerate(CATEGORIES)}
+_IMPACT_INDEX = {name: len(CATEGORIES) + i for i, name in enumerate(IMPACTS)}
+_SENTIMENT_INDEX = {name: len(CATEGORIES) + len(IMPACTS) + i for i, name in enumerate(SENTIMENTS)}
+
+
+class HeatmapService:
+    """
+    Keeps one 7 x 24 x CHANNELS uint32 array per user (about 17 KB) in
+    ``user_usage_heatmaps``: for every weekday and hour, how many frames
+    fell in each content category, wellness impact and sentiment. Completing
+    a session adds that session's frames (one indexed read of at most
+    MAX_FRAMES_PER_SESSION rows); the dashboard reads the array back as is,
+    without touching frame_analysis. Weekdays and hours are UTC, Monday first.
+
+    Each session keeps the few slots it added in ``heatmap_slots``, so a
+    session completed again swaps its old contribution for the new one
+    instead of recounting all of the user's frames.
+    """
+
+    def apply_session(self, session, recompleted=False):
+        """
+        Add a completed session's frames to its user's heatmap; ``recompleted``
+        replaces what the session added when it was completed before (caller commits)
+        """
+        counts = self._frame_counts(FrameAnalysis.session_id == session.id)
+        previous = session.heatmap_slots if recompleted else None
+        session.heatmap_slots = _slots(counts)
+        if recompleted and (previous is None or previous.get('layout') != LAYOUT):
+            # Completed before sessions kept their contribution; recount the user's sessions
+            self.rebuild_user(session.user_id)
+            return
+
+        delta = counts - _counts(previous) if previous else counts
+        if not delta.any():
+            return
+        row = self._locked_row(session.user_id)
+        if row.layout != LAYOUT:
+            self.rebuild_user(session.user_id)
+            return
+        row.counts = np.maximum(_unpack(row.counts) + delta, 0).astype('<u4').tobytes()
+
+    def rebuild_user(self, user_id):
+        """Recompute a user's heatmap from all their completed sessions (caller commits)"""
+        counts = self._frame_counts(ScreenSession.user_id == user_id, ScreenSession.status == 'completed')
+        row = self._locked_row(user_id)
+        row.layout = LAYOUT
+        row.counts = counts.astype('<u4').tobytes()
+        return int(counts[:, :, :len(CATEGORIES)].sum())
+
+    def delete_user(self, user_id):
+        """Drop a user's heatmap (caller commits)"""
+        UserUsageHeatmap.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+    def backfill(self, user_ids=None):
+        """Rebuild heatmaps for the given users (default: everyone with a completed session)"""
+        if user_ids is None:
+            user_ids = [row.user_id for row in ScreenSession.query.with_entities(
+                ScreenSession.user_id).filter_by(status='completed').distinct().all()]
+        report = {'users': 0, 'frames': 0}
+        for user_id in user_ids:
+            report['frames'] += self.rebuild_user(user_id)
+            db.session.commit()
+            report['users'] += 1
+        return report
+
+    def get_heatmap(self, user_id):
+        row = db.session.get(UserUsageHeatmap, user_id)
+        if row is not None and row.layout != LAYOUT:
+            self.rebuild_user(user_id)
+            db.session.commit()
+        counts = _unpack(row.counts) if row is not None else np.zeros(SHAPE, dtype=np.uint32)
+
+        def grids(names, index):
+            return {name: counts[:, :, index[name]].tolist() for name in names}
+
+        categories = counts[:, :, :len(CATEGORIES)]
+        return {
+            'days': WEEKDAYS,
+            'hours': list(range(24)),
+            'frames': categories.sum(axis=2).tolist(),
+            # Only categories that occur, so the payload stays small for typical users
+            'categories': {name: grid for name, grid in grids(CATEGORIES, _CATEGORY_INDEX).items()
+                           if counts[:, :, _CATEGORY_INDEX[name]].any()},
+            'impacts': grids(IMPACTS, _IMPACT_INDEX),
+            'sentiments': grids(SENTIMENTS, _SENTIMENT_INDEX),
+            'no_data': not categories.any()
+        }
+
+    def _frame_counts(self, *criteria):
+        counts = np.zeros(SHAPE, dtype=np.int64)
+        rows = db.session.query(
+            FrameAnalysis.created_at, FrameAnalysis.timestamp, ScreenSession.created_at,
+            FrameAnalysis.content_type, FrameAnalysis.wellness_impact, FrameAnalysis.sentiment
+        ).join(ScreenSession, ScreenSession.id == FrameAnalysis.session_id).filter(*criteria).all()
+
+        days, hours, channels = [], [], []
+        for frame_at, offset, session_at, category, impact, sentiment in rows:
+            # Frames written before created_at was recorded are placed by their offset into the session
+            at = frame_at or (session_at + timedelta(seconds=offset or 0) if session_at else None)
+            if at is None:
+                continue
+            for channel in (_CATEGORY_INDEX.get(category or 'other', _CATEGORY_INDEX['other']),
+                            _IMPACT_INDEX.get(impact), _SENTIMENT_INDEX.get(sentiment)):
+                if channel is not None:
+                    days.append(at.weekday())
+                    hours.append(at.hour)
+                    channels.append(channel)
+        np.add.at(counts, (days, hours, channels), 1)
+        return counts
+
+    def _locked_row(self, user_id):
+        """The user's heatmap row, locked for the rest of the transaction where the database supports it"""
+        row = UserUsageHeatmap.query.filter_by(user_id=user_id).with_for_update().first()
+        if row is not None:
+            return row
+        try:
+            # Savepoint, so losing a race with another worker doesn't roll back the caller's transaction
+            with db.session.begin_nested():
+                row = UserUsageHeatmap(user_id=user_id, layout=LAYOUT, counts=np.zeros(SHAPE, dtype='<u4').tobytes())
+                db.session.add(row)
+            return row
+        except IntegrityError:
+            return UserUsageHeatmap.query.filter_by(user_id=user_id).with_for_update().one()
+
+
+def _unpack(data):
+    return np.frombuffer(data, dtype='<u4').reshape(SHAPE).astype(np.int64)
+
+
+def _slots(counts):
+    """The non-zero slots of a counts array, as stored on the session"""
+    index = np.nonzero(counts)
+    return {'layout': LAYOUT, 'slots': [[*map(int, slot), int(counts[slot])] for slot in zip(*index)]}
+
+
+def _counts(slots):
+    counts = np.zeros(SHAPE, dtype=np.int64)
+    for day, hour, channel, count in slots['slots']:
+        counts[day, hour, channel] = count
+    return counts
@@ -1,6 +1,7 @@
 import networkx as nx
 from app import db
 from app.models import User, KnowledgeGraph, ScreenSession, FrameAnalysis
+from app.services.rollups import RollupService
 from sqlalchemy import func
 
 class KnowledgeGraphService:
@@ -46,30 +47,12 @@ class KnowledgeGraphService:
             G.add_node(stress_node, type='wellness')
             G.add_edge('User', stress_node, relationship='experiences')
 
-        sessions = ScreenSession.query.filter_by(user_id=user_id, status='completed').all()
+        rollups = RollupService()
+        totals = rollups.totals(user_id)
 
-        app_usage = {}
-        content_types = {}
-        total_wellness = 0
-        total_productivity = 0
-
-        for session in sessions:
-            if session.wellness_score:
-                total_wellness += session.wellness_score
-            if session.productivity_score:
-                total_productivity += session.productivity_score
-
-            if session.app_usage:
-                for app, count in session.app_usage.items():
-                    app_usage[app] = app_usage.get(app, 0) + count
-
-            if session.content_categories:
-                for cat, count in session.content_categories.items():
-                    content_types[cat] = content_types.get(cat, 0) + count
-
-        if sessions:
-            avg_wellness = total_wellness / len(sessions)
-            avg_productivity = total_productivity / len(sessions)
+        if totals['session_count']:
+            avg_wellness = totals['wellness_score_sum'] / totals['session_count']
+            avg_productivity = totals['productivity_score_sum'] / totals['session_count']
 
             wellness_node = f"Avg Wellness: {avg_wellness:.1f}/10"
             G.add_node(wellness_node, type='metric', value=avg_wellness)
@@ -79,11 +62,11 @@ class KnowledgeGraphService:
             G.add_node(productivity_node, type='metric', value=avg_productivity)
             G.add_edge('User', productivity_node, relationship='has_metric')
 
-        for app, count in sorted(app_usage.items(), key=lambda x: x[1], reverse=True)[:5]:
+        for app, count in rollups.app_totals(user_id, limit=5):
             G.add_node(app, type='app', usage_count=count)
             G.add_edge('User', app, relationship='uses')
 
-        for content, count in sorted(content_types.items(), key=lambda x: x[1], reverse=True)[:5]:
+        for content, count in rollups.category_totals(user_id, limit=5):
             content_node = f"{content.replace('_', ' ').title()} Content"
             G.add_node(content_node, type='content', count=count)
             G.add_edge('User', content_node, relationship='consumes')
@@ -121,6 +104,7 @@ class KnowledgeGraphService:
             kg = KnowledgeGraph(user_id=user_id, graph_data=graph_data)
             db.session.add(kg)
 
+        User.bump_data_version(user_id)
         db.session.commit()
 
         return graph_data
@@ -0,0 +1,213 @@
+"""
+Pipeline Metrics - per-route and per-stage latency histograms plus OpenAI token/cost accounting
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# USD per 1M tokens: (prompt, completion)
+MODEL_PRICING = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; cheap to update and to merge"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Approximate percentile (upper bound of the bucket containing it)"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 2),
+            'avg_ms': round(self.total / self.count, 2) if self.count else None,
+            'max_ms': round(self.max, 2),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': {
+                **{f'le_{b}': c for b, c in zip(self.buckets, self.counts)},
+                'le_inf': self.counts[-1]
+            }
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics store. Each gunicorn worker keeps its own registry,
+    so the metrics endpoint reports the worker that served the request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.routes = {}
+            self.route_status = {}
+            self.stages = {}
+            self.models = {}
+
+    def observe_route(self, endpoint, duration_ms, status_code):
+        endpoint = endpoint or 'unmatched'
+        with self._lock:
+            self.routes.setdefault(endpoint, Histogram()).observe(duration_ms)
+            statuses = self.route_status.setdefault(endpoint, {})
+            statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+
+    def observe_stage(self, stage, duration_ms):
+        with self._lock:
+            self.stages.setdefault(stage, Histogram()).observe(duration_ms)
+
+    def record_usage(self, model, prompt_tokens, completion_tokens):
+        """Accumulate token usage for a model and return the estimated cost in USD"""
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            stats = self.models.setdefault(model, {
+                'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0
+            })
+            stats['calls'] += 1
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+            stats['cost_usd'] += cost
+        return cost
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'routes': {
+                    name: {**hist.to_dict(), 'status_codes': dict(self.route_status.get(name, {}))}
+                    for name, hist in self.routes.items()
+                },
+                'stages': {name: hist.to_dict() for name, hist in self.stages.items()},
+                'models': {
+                    name: {**stats, 'cost_usd': round(stats['cost_usd'], 6)}
+                    for name, stats in self.models.items()
+                }
+            }
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    # Dated snapshots ("gpt-4o-2024-08-06") are priced like their base model
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        base = max((m for m in MODEL_PRICING if model and model.startswith(m)), key=len, default=None)
+        pricing = MODEL_PRICING.get(base, (0.0, 0.0))
+    return (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1_000_000
+
+
+metrics = MetricsRegistry()
+
+
+class StageTimer:
+    """
+    Collects timing spans and token usage for a single unit of work
+    (one analyzed frame) and feeds them into the shared registry.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry or metrics
+        self.timings = {}
+        self.tokens = {}
+        self.graph = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()  # Stages of one frame may run on several threads
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.timings[name] = round(self.timings.get(name, 0) + elapsed_ms, 2)
+            self.registry.observe_stage(name, elapsed_ms)
+
+    def record_graph(self, report):
+        """Keep a StageGraph report; critical path and total work get their own histograms"""
+        self.graph = report
+        self.registry.observe_stage('pipeline.critical_path', report['critical_path_ms'])
+        self.registry.observe_stage('pipeline.work', report['work_ms'])
+
+    def record_usage(self, stage, response):
+        """Record the token usage reported by a chat completion response"""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+        model = getattr(response, 'model', None) or 'unknown'
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        cost = self.registry.record_usage(model, prompt_tokens, completion_tokens)
+
+        with self._lock:
+            entry = self.tokens.setdefault(stage, {
+                'model': model, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0
+            })
+            entry['prompt_tokens'] += prompt_tokens
+            entry['completion_tokens'] += completion_tokens
+            entry['cost_usd'] = round(entry['cost_usd'] + cost, 6)
+
+    def to_dict(self):
+        with self._lock:
+            result = {
+                'stages_ms': dict(self.timings),
+                'total_ms': round((time.perf_counter() - self._started) * 1000, 2),
+                'tokens': {k: dict(v) for k, v in self.tokens.items()},
+                'cost_usd': round(sum(v['cost_usd'] for v in self.tokens.values()), 6)
+            }
+        if self.graph:
+            result['graph'] = self.graph
+        return result
+
+
+def init_app(app):
+    """Register request hooks that feed the per-route latency histograms"""
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            metrics.observe_route(
+                request.endpoint,
+                (time.perf_counter() - started) * 1000,
+                response.status_code
+            )
+        return response
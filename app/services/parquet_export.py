@@ -0,0 +1,277 @@
+"""
+Parquet Export - columnar, partitioned snapshots of sessions and frame analyses for offline studies
+"""
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app import db
+from app.models import ScreenSession, FrameAnalysis, Application
+from app.services.data_keys import DataKeyService
+from config import Config
+
+WATERMARK_FILE = '_watermark.json'
+
+# Low-cardinality strings are dictionary-encoded: stored once per row group, read back as categoricals
+_LABEL = pa.dictionary(pa.int32(), pa.string())
+
+SESSION_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('created_at', pa.timestamp('us')),
+    ('duration_seconds', pa.int64()),
+    ('total_frames', pa.int64()),
+    ('wellness_score', pa.float64()),
+    ('productivity_score', pa.float64()),
+    ('sentiment_positive', pa.int64()),
+    ('sentiment_negative', pa.int64()),
+    ('sentiment_neutral', pa.int64()),
+    ('sentiment_mixed', pa.int64()),
+    ('impact_positive', pa.int64()),
+    ('impact_negative', pa.int64()),
+    ('impact_neutral', pa.int64()),
+])
+
+FRAME_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('session_id', pa.int64()),
+    ('frame_number', pa.int32()),
+    ('timestamp', pa.float64()),
+    ('created_at', pa.timestamp('us')),
+    ('app_id', pa.int64()),
+    ('app', _LABEL),
+    ('app_category', _LABEL),
+    ('content_type', _LABEL),
+    ('detected_language', _LABEL),
+    ('sentiment', _LABEL),
+    ('sentiment_score', pa.float64()),
+    ('sentiment_status', _LABEL),
+    ('wellness_impact', _LABEL),
+    ('analysis_mode', _LABEL),
+])
+
+TEXT_FIELDS = [('extracted_text', pa.string()), ('translated_text', pa.string()), ('content_description', pa.string())]
+
+
+class _PartitionWriters:
+    """
+    One open ParquetWriter per ``user_id=/month=`` partition touched by a run.
+    At most ``max_open`` files stay open; the least recently used is closed
+    and a later write to its partition starts a new part file.
+    """
+
+    def __init__(self, root, schema, run_id, max_open):
+        self.root = Path(root)
+        self.schema = schema
+        self.run_id = run_id
+        self.max_open = max_open
+        self.writers = {}
+        self.parts = {}
+        self.files = []
+        self.rows = 0
+
+    def write(self, partition, columns):
+        writer = self.writers.pop(partition, None)
+        if writer is None:
+            if len(self.writers) >= self.max_open:
+                oldest = next(iter(self.writers))
+                self.writers.pop(oldest).close()
+            user_id, month = partition
+            directory = self.root / f'user_id={user_id}' / f'month={month}'
+            directory.mkdir(parents=True, exist_ok=True)
+            part = self.parts[partition] = self.parts.get(partition, -1) + 1
+            path = directory / f'part-{self.run_id}-{part:03d}.parquet'
+            writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+            self.files.append(str(path))
+        self.writers[partition] = writer  # re-inserted: most recently used last
+
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+
+
+class ParquetExportService:
+    """
+    Streams completed sessions and their frame analyses into Hive-style
+    partitioned Parquet datasets::
+
+        <root>/sessions/user_id=<id>/month=<YYYY-MM>/part-<run>-<n>.parquet
+        <root>/frames/user_id=<id>/month=<YYYY-MM>/part-<run>-<n>.parquet
+
+    Sessions are exported whole, in id order and ``chunk_sessions`` at a time,
+    with frames read in ``chunk_rows`` slices, so memory stays bounded by the
+    chunk sizes rather than the table sizes. ``user_id`` and ``month`` live
+    only in the partition path; readers get them back as partition columns. The watermark (last exported
+    session id) is stored next to the data; each run appends only newer
+    sessions. It never moves past a session that is still processing, unless
+    that session has been abandoned for ``PARQUET_EXPORT_ABANDONED_HOURS``, so
+    late-completing sessions are not skipped. With ``include_text`` the
+    frames' sealed text is exported decrypted.
+    """
+
+    def __init__(self, root=None, include_text=False):
+        self.root = Path(root or Config.EXPORT_FOLDER)
+        self.include_text = include_text
+        self.keys = DataKeyService()
+        self.chunk_rows = Config.PARQUET_EXPORT_CHUNK_ROWS
+        self.chunk_sessions = Config.PARQUET_EXPORT_CHUNK_SESSIONS
+        self.max_open = Config.PARQUET_EXPORT_MAX_OPEN_FILES
+
+    def read_watermark(self):
+        try:
+            with open(self.root / WATERMARK_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'last_session_id': 0}
+
+    def export(self, full=False):
+        """Export sessions past the watermark (``full`` rewrites the whole dataset); returns a report"""
+        if full:
+            for dataset in ('sessions', 'frames'):
+                shutil.rmtree(self.root / dataset, ignore_errors=True)
+        watermark = {'last_session_id': 0} if full else self.read_watermark()
+        last_id = watermark['last_session_id']
+        limit_id = self._export_limit(last_id)
+
+        run_id = datetime.utcnow().strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:6]
+        frame_schema = pa.schema(list(FRAME_SCHEMA) + TEXT_FIELDS) if self.include_text else FRAME_SCHEMA
+        sessions_out = _PartitionWriters(self.root / 'sessions', SESSION_SCHEMA, run_id, self.max_open)
+        frames_out = _PartitionWriters(self.root / 'frames', frame_schema, run_id, self.max_open)
+        apps = {row.id: (row.name, row.category) for row in Application.query.all()}
+
+        exported_to = last_id
+        try:
+            while True:
+                query = ScreenSession.query.filter(
+                    ScreenSession.id > exported_to,
+                    ScreenSession.status == 'completed'
+                )
+                if limit_id is not None:
+                    query = query.filter(ScreenSession.id < limit_id)
+                sessions = query.order_by(ScreenSession.id).limit(self.chunk_sessions).all()
+                if not sessions:
+                    break
+
+                months = {s.id: (s.created_at or datetime.utcnow()).strftime('%Y-%m') for s in sessions}
+                for partition, rows in _group(sessions, lambda s: (s.user_id, months[s.id])).items():
+                    sessions_out.write(partition, _session_columns(rows))
+                self._export_frames(sessions, months, apps, frames_out)
+
+                exported_to = sessions[-1].id
+                db.session.expunge_all()
+        finally:
+            sessions_out.close()
+            frames_out.close()
+
+        if limit_id is not None:
+            # Everything below the blocking session has been exported (or was abandoned unfinished)
+            exported_to = max(exported_to, limit_id - 1)
+        self._write_watermark({
+            'last_session_id': exported_to,
+            'exported_at': datetime.utcnow().isoformat(),
+            'run_id': run_id
+        })
+        return {
+            'run_id': run_id,
+            'sessions': sessions_out.rows,
+            'frames': frames_out.rows,
+            'files': len(sessions_out.files) + len(frames_out.files),
+            'watermark': exported_to
+        }
+
+    def _export_limit(self, last_id):
+        """Id of the oldest session past the watermark that is still processing (None when there is none)"""
+        abandoned_before = datetime.utcnow() - timedelta(hours=Config.PARQUET_EXPORT_ABANDONED_HOURS)
+        return ScreenSession.query.with_entities(db.func.min(ScreenSession.id)).filter(
+            ScreenSession.id > last_id,
+            ScreenSession.status != 'completed',
+            ScreenSession.created_at >= abandoned_before
+        ).scalar()
+
+    def _export_frames(self, sessions, months, apps, writers):
+        owners = {s.id: s.user_id for s in sessions}
+        columns = [FrameAnalysis.id, FrameAnalysis.session_id, FrameAnalysis.frame_number, FrameAnalysis.timestamp,
+                   FrameAnalysis.created_at, FrameAnalysis.app_id, FrameAnalysis.app_detected,
+                   FrameAnalysis.content_type, FrameAnalysis.detected_language, FrameAnalysis.sentiment,
+                   FrameAnalysis.sentiment_score, FrameAnalysis.sentiment_status, FrameAnalysis.wellness_impact,
+                   FrameAnalysis.analysis_mode]
+        if self.include_text:
+            columns += [FrameAnalysis.extracted_text, FrameAnalysis.translated_text, FrameAnalysis.content_description]
+
+        rows = db.session.query(*columns).filter(
+            FrameAnalysis.session_id.in_(list(owners))
+        ).order_by(FrameAnalysis.session_id, FrameAnalysis.frame_number).yield_per(self.chunk_rows)
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                self._write_frames(chunk, owners, months, apps, writers)
+                chunk = []
+        if chunk:
+            self._write_frames(chunk, owners, months, apps, writers)
+
+    def _write_frames(self, chunk, owners, months, apps, writers):
+        grouped = _group(chunk, lambda r: (owners[r.session_id], months[r.session_id]))
+        for partition, rows in grouped.items():
+            app_info = [apps.get(r.app_id, (r.app_detected, None)) for r in rows]
+            columns = {
+                'id': [r.id for r in rows],
+                'session_id': [r.session_id for r in rows],
+                'frame_number': [r.frame_number for r in rows],
+                'timestamp': [r.timestamp for r in rows],
+                'created_at': [r.created_at for r in rows],
+                'app_id': [r.app_id for r in rows],
+                'app': [name for name, _ in app_info],
+                'app_category': [category for _, category in app_info],
+                'content_type': [r.content_type for r in rows],
+                'detected_language': [r.detected_language for r in rows],
+                'sentiment': [r.sentiment for r in rows],
+                'sentiment_score': [r.sentiment_score for r in rows],
+                'sentiment_status': [r.sentiment_status for r in rows],
+                'wellness_impact': [r.wellness_impact for r in rows],
+                'analysis_mode': [r.analysis_mode for r in rows],
+            }
+            if self.include_text:
+                for field, _ in TEXT_FIELDS:
+                    columns[field] = [self.keys.open_text(r.session_id, getattr(r, field)) for r in rows]
+            writers.write(partition, columns)
+
+    def _write_watermark(self, watermark):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / WATERMARK_FILE
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(watermark, f)
+        os.replace(tmp, path)
+
+
+def _group(items, key):
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return groups
+
+
+def _session_columns(sessions):
+    def counts(attr, key):
+        return [(getattr(s, attr) or {}).get(key, 0) for s in sessions]
+
+    return {
+        'id': [s.id for s in sessions],
+        'created_at': [s.created_at for s in sessions],
+        'duration_seconds': [s.duration_seconds for s in sessions],
+        'total_frames': [s.total_frames for s in sessions],
+        'wellness_score': [s.wellness_score for s in sessions],
+        'productivity_score': [s.productivity_score for s in sessions],
+        **{f'sentiment_{k}': counts('sentiment_distribution', k) for k in ('positive', 'negative', 'neutral', 'mixed')},
+        **{f'impact_{k}': counts('wellness_impacts', k) for k in ('positive', 'negative', 'neutral')},
+    }
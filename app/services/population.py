@@ -0,0 +1,346 @@
+"""
+Population Statistics - precomputed histograms for "how do I compare with everyone else" percentiles
+"""
+import bisect
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+import numpy as np
+import sqlalchemy as sa
+from app import db
+from app.models import (
+    User, UserDailyRollup, UserDailyCategory, PopulationHistogramBin, UserPopulationStanding, PopulationRebuildLease
+)
+from app.services.rollups import RollupService
+from config import Config
+
+# Per-user metrics: fixed-width bins over a known range, so histograms from different runs line up
+METRICS = {
+    'wellness': {'label': 'Wellness score', 'low': 0.0, 'high': 10.0, 'bins': 100, 'higher_is_better': True},
+    'productivity': {'label': 'Productivity score', 'low': 0.0, 'high': 10.0, 'bins': 100, 'higher_is_better': True},
+    'social_media_share': {'label': 'Social media share (%)', 'low': 0.0, 'high': 100.0, 'bins': 100,
+                           'higher_is_better': False},
+}
+EDGES = {name: np.linspace(spec['low'], spec['high'], spec['bins'] + 1).tolist() for name, spec in METRICS.items()}
+
+AGE_GROUPS = [(0, 17, 'under-18'), (18, 24, '18-24'), (25, 34, '25-34'), (35, 44, '35-44'),
+              (45, 54, '45-54'), (55, 64, '55-64'), (65, None, '65+')]
+SEGMENT_KINDS = ('all', 'cluster', 'age_group')
+
+
+def age_group(age):
+    if age is None:
+        return None
+    for low, high, label in AGE_GROUPS:
+        if age >= low and (high is None or age <= high):
+            return label
+    return None
+
+
+def user_segments(cluster, age):
+    """Every segment a user with this personality cluster and age is counted in"""
+    segments = ['all']
+    if cluster is not None:
+        segments.append(f'cluster:{cluster}')
+    group = age_group(age)
+    if group:
+        segments.append(f'age:{group}')
+    return segments
+
+
+def metric_bin(metric, value):
+    """Bin index of a value; values outside the range fall into the first or last bin"""
+    edges = EDGES[metric]
+    return min(max(bisect.bisect_right(edges, value) - 1, 0), len(edges) - 2)
+
+
+class PopulationStatsService:
+    """
+    Answers "what share of users scores below this?" from small histograms
+    per metric and segment (everyone, each personality cluster, each age
+    group) instead of aggregating every user's data per request.
+
+    A user's metrics are their all-time averages from the daily rollups.
+    ``rebuild`` recomputes every histogram from the rollups in a few grouped
+    queries and runs periodically; ``apply_user`` moves one user between
+    bins with SQL increments when one of their sessions completes, inside
+    the caller's transaction. UserPopulationStanding remembers where each
+    user is counted so the move can subtract the old contribution. The
+    periodic rebuild also heals drift from concurrent updates and from
+    cluster or age changes, which are not applied incrementally.
+
+    Every worker schedules the rebuild, but it runs behind a lease taken with
+    a compare-and-set UPDATE on PopulationRebuildLease: one worker rebuilds
+    at a time, at most once per POPULATION_STATS_INTERVAL_SECONDS, and a
+    crashed worker's lease expires after POPULATION_REBUILD_LEASE_SECONDS.
+    Users whose rollups changed while the rebuild ran are re-binned after it,
+    so sessions completed meanwhile are not overwritten by its snapshot.
+
+    A lookup reads one histogram (at most a hundred rows), builds its
+    cumulative counts and bisects the bin edges.
+    """
+
+    def __init__(self, rollups=None):
+        self.rollups = rollups or RollupService()
+
+    # ---- write side ----
+
+    def user_values(self, user_id):
+        """{metric: value} for a user, or None without completed sessions"""
+        totals = self.rollups.totals(user_id)
+        sessions = totals['session_count']
+        if not sessions:
+            return None
+        values = {
+            'wellness': totals['wellness_score_sum'] / sessions,
+            'productivity': totals['productivity_score_sum'] / sessions,
+        }
+        categories = dict(self.rollups.category_totals(user_id))
+        frames = sum(categories.values())
+        if frames:
+            values['social_media_share'] = categories.get('social_media', 0) * 100 / frames
+        return values
+
+    def apply_user(self, user_id):
+        """Re-bin a user after their data changed (caller commits)"""
+        user = db.session.get(User, user_id)
+        values = self.user_values(user_id) if user else None
+        standing = db.session.get(UserPopulationStanding, user_id)
+
+        old = _contributions(standing.bins, standing.segments) if standing else set()
+        if values is None:
+            new, bins, segments = set(), {}, []
+        else:
+            bins = {metric: metric_bin(metric, value) for metric, value in values.items()}
+            segments = user_segments(user.personality_cluster, user.age)
+            new = _contributions(bins, segments)
+
+        for metric, segment, index in old - new:
+            self._increment(metric, segment, index, -1)
+        for metric, segment, index in new - old:
+            self._increment(metric, segment, index, 1)
+
+        if values is None:
+            if standing:
+                db.session.delete(standing)
+        elif standing:
+            standing.values, standing.bins, standing.segments = values, bins, segments
+        else:
+            db.session.add(UserPopulationStanding(user_id=user_id, values=values, bins=bins, segments=segments))
+
+    def remove_user(self, user_id):
+        """Take a user out of every histogram (caller commits)"""
+        standing = db.session.get(UserPopulationStanding, user_id)
+        if standing is None:
+            return
+        for metric, segment, index in _contributions(standing.bins, standing.segments):
+            self._increment(metric, segment, index, -1)
+        db.session.delete(standing)
+
+    def rebuild(self, force=False):
+        """
+        Recompute every histogram and standing from the rollups; returns a
+        report, or None when another worker is rebuilding or (unless ``force``)
+        one rebuilt within the last POPULATION_STATS_INTERVAL_SECONDS
+        """
+        started = datetime.utcnow()
+        token = self._claim_rebuild(started, force)
+        if token is None:
+            return None
+        rebuilt = False
+        try:
+            report = self._rebuild()
+            report['replayed'] = self._replay_since(started)
+            rebuilt = True
+            return report
+        finally:
+            db.session.rollback()
+            PopulationRebuildLease.query.filter_by(id=1, claim=token).update(
+                {PopulationRebuildLease.claim: None, PopulationRebuildLease.claimed_at: None,
+                 **({PopulationRebuildLease.rebuilt_at: started} if rebuilt else {})},
+                synchronize_session=False)
+            db.session.commit()
+
+    def _claim_rebuild(self, now, force):
+        """Take the rebuild lease with a compare-and-set UPDATE; returns its token, or None"""
+        if db.session.get(PopulationRebuildLease, 1) is None:
+            try:
+                db.session.add(PopulationRebuildLease(id=1))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+
+        token = uuid.uuid4().hex
+        criteria = [PopulationRebuildLease.id == 1,
+                    db.or_(PopulationRebuildLease.claimed_at.is_(None),
+                           PopulationRebuildLease.claimed_at < now - timedelta(
+                               seconds=Config.POPULATION_REBUILD_LEASE_SECONDS))]
+        if not force:
+            # Workers' timers drift apart; whichever comes first rebuilds and the others skip
+            criteria.append(db.or_(PopulationRebuildLease.rebuilt_at.is_(None),
+                                   PopulationRebuildLease.rebuilt_at <= now - timedelta(
+                                       seconds=Config.POPULATION_STATS_INTERVAL_SECONDS)))
+        claimed = PopulationRebuildLease.query.filter(*criteria).update(
+            {PopulationRebuildLease.claim: token, PopulationRebuildLease.claimed_at: now},
+            synchronize_session=False)
+        db.session.commit()
+        return token if claimed else None
+
+    def _replay_since(self, started):
+        """Re-bin the users whose rollups changed or went away since ``started``; returns how many"""
+        with_rollups = db.session.query(UserDailyRollup.user_id)
+        user_ids = {row.user_id for row in with_rollups.filter(UserDailyRollup.updated_at >= started).distinct()}
+        user_ids.update(row.user_id for row in db.session.query(UserPopulationStanding.user_id).filter(
+            UserPopulationStanding.user_id.notin_(with_rollups.distinct().scalar_subquery())))
+        for user_id in sorted(user_ids):
+            self.apply_user(user_id)
+        db.session.commit()
+        return len(user_ids)
+
+    def _rebuild(self):
+        sessions = func.sum(UserDailyRollup.session_count)
+        score_rows = db.session.query(
+            UserDailyRollup.user_id, sessions,
+            func.sum(UserDailyRollup.wellness_score_sum), func.sum(UserDailyRollup.productivity_score_sum)
+        ).group_by(UserDailyRollup.user_id).having(sessions > 0).all()
+        social_frames = func.sum(sa.case((UserDailyCategory.category == 'social_media', UserDailyCategory.frame_count),
+                                         else_=0))
+        category_rows = db.session.query(
+            UserDailyCategory.user_id, func.sum(UserDailyCategory.frame_count), social_frames
+        ).group_by(UserDailyCategory.user_id).all()
+        shares = {user_id: social * 100 / frames for user_id, frames, social in category_rows if frames}
+        profiles = {row.id: (row.personality_cluster, row.age) for row in db.session.query(
+            User.id, User.personality_cluster, User.age).all()}
+
+        histograms = {}
+        standings = []
+        for user_id, count, wellness_sum, productivity_sum in score_rows:
+            if user_id not in profiles:
+                continue
+            values = {'wellness': wellness_sum / count, 'productivity': productivity_sum / count}
+            if user_id in shares:
+                values['social_media_share'] = shares[user_id]
+            bins = {metric: metric_bin(metric, value) for metric, value in values.items()}
+            segments = user_segments(*profiles[user_id])
+            for key in _contributions(bins, segments):
+                histograms[key] = histograms.get(key, 0) + 1
+            standings.append({'user_id': user_id, 'values': values, 'bins': bins, 'segments': segments})
+
+        try:
+            PopulationHistogramBin.query.delete(synchronize_session=False)
+            UserPopulationStanding.query.delete(synchronize_session=False)
+            if histograms:
+                db.session.execute(sa.insert(PopulationHistogramBin), [
+                    {'metric': metric, 'segment': segment, 'bin': index, 'count': count}
+                    for (metric, segment, index), count in histograms.items()
+                ])
+            if standings:
+                db.session.execute(sa.insert(UserPopulationStanding), standings)
+            db.session.commit()
+        except IntegrityError:
+            # Another worker rebuilt at the same moment; its result is just as current
+            db.session.rollback()
+        return {'users': len(standings), 'segments': len({segment for _, segment, _ in histograms}),
+                'bins': len(histograms)}
+
+    def _increment(self, metric, segment, index, delta):
+        keys = {'metric': metric, 'segment': segment, 'bin': index}
+        row = PopulationHistogramBin.query.filter_by(**keys).first()
+        if row is None:
+            try:
+                # Savepoint, so losing a race with another worker doesn't roll back the caller's transaction
+                with db.session.begin_nested():
+                    row = PopulationHistogramBin(count=0, **keys)
+                    db.session.add(row)
+            except IntegrityError:
+                row = PopulationHistogramBin.query.filter_by(**keys).one()
+        PopulationHistogramBin.query.filter_by(id=row.id).update(
+            {PopulationHistogramBin.count: PopulationHistogramBin.count + delta}, synchronize_session=False)
+
+    # ---- read side ----
+
+    def histogram(self, metric, segment='all'):
+        """Dense per-bin counts of a metric in a segment"""
+        counts = [0] * METRICS[metric]['bins']
+        for index, count in db.session.query(PopulationHistogramBin.bin, PopulationHistogramBin.count).filter(
+            PopulationHistogramBin.metric == metric,
+            PopulationHistogramBin.segment == segment
+        ).all():
+            if 0 <= index < len(counts):
+                counts[index] = max(count, 0)
+        return counts
+
+    def percentile(self, metric, value, segment='all'):
+        """
+        {'percentile', 'population'}: the share of users in the segment below
+        ``value``, interpolated inside its bin. None when the segment is
+        smaller than POPULATION_MIN_SEGMENT_USERS.
+        """
+        counts = self.histogram(metric, segment)
+        cumulative = np.cumsum(counts).tolist()
+        population = cumulative[-1] if cumulative else 0
+        if population < max(Config.POPULATION_MIN_SEGMENT_USERS, 1):
+            return None
+
+        edges = EDGES[metric]
+        value = float(value)
+        index = metric_bin(metric, value)
+        below = cumulative[index - 1] if index else 0
+        within = (min(max(value, edges[index]), edges[index + 1]) - edges[index]) / (edges[index + 1] - edges[index])
+        return {
+            'percentile': round((below + counts[index] * within) * 100 / population, 1),
+            'population': population
+        }
+
+    def get_user_standing(self, user_id, by='all'):
+        """The user's percentile for every metric, within everyone or within their cluster / age group"""
+        user = db.session.get(User, user_id)
+        values = self.user_values(user_id) or {}
+        segment = self.segment_for(user, by)
+
+        metrics = {}
+        for metric, spec in METRICS.items():
+            value = values.get(metric)
+            entry = {'label': spec['label'], 'value': round(value, 2) if value is not None else None,
+                     'higher_is_better': spec['higher_is_better'], 'segment': segment,
+                     'percentile': None, 'population': None}
+            if value is not None:
+                result = self.percentile(metric, value, segment)
+                if result is None and segment != 'all':
+                    # Too few users in the segment to compare against; fall back to everyone
+                    entry['segment'] = 'all'
+                    result = self.percentile(metric, value, 'all')
+                if result:
+                    entry.update(result)
+            metrics[metric] = entry
+        return {'segment': segment, 'metrics': metrics, 'no_data': not values}
+
+    @staticmethod
+    def segment_for(user, by):
+        if by == 'cluster' and user is not None and user.personality_cluster is not None:
+            return f'cluster:{user.personality_cluster}'
+        if by == 'age_group' and user is not None and age_group(user.age):
+            return f'age:{age_group(user.age)}'
+        return 'all'
+
+
+def _contributions(bins, segments):
+    """{(metric, segment, bin)} a user adds one to"""
+    return {(metric, segment, index) for metric, index in bins.items() for segment in segments}
+
+
+def rebuild_population_stats(force=False):
+    report = PopulationStatsService().rebuild(force=force)
+    if report is None:
+        print("Population histograms: rebuilt recently or by another worker, skipped")
+        return report
+    print(f"Population histograms rebuilt: {report['users']} users, {report['segments']} segments, "
+          f"{report['bins']} bins ({report['replayed']} users re-binned after it)")
+    return report
+
+
+def start_population_stats_worker(app):
+    from app.utils.scheduler import start_periodic_job
+    return start_periodic_job(app, 'population-stats', Config.POPULATION_STATS_INTERVAL_SECONDS,
+                              rebuild_population_stats, initial_delay=Config.POPULATION_STATS_INITIAL_DELAY_SECONDS)
@@ -0,0 +1,212 @@
+"""
+Purge - deletes a user's sessions or whole account in set-based batches, and their files in the background
+"""
+import os
+import shutil
+import time
+from pathlib import Path
+from app import db
+from app.models import (
+    User, ScreenSession, FrameAnalysis, QuizResponse, PeriodicAssessment, KnowledgeGraph, UserConsent
+)
+from app.services.audit_log import AuditLogService
+from app.services.audit_writer import flush_audit_events
+from app.services.background_jobs import BackgroundJobService, job_handler
+from app.services.data_keys import DataKeyService
+from app.services.frame_storage import FrameStorageService
+from app.utils.frame_archive import ARCHIVE_SUFFIX
+from app.services.heatmap import HeatmapService
+from app.services.population import PopulationStatsService
+from app.services.response_cache import ResponseCacheService
+from app.services.rollups import RollupService
+from app.services.translation import TranslationService
+from config import Config
+
+
+class PurgeService:
+    """
+    Deletes rows with ``DELETE ... WHERE id IN (...)`` over batches of at most
+    PURGE_BATCH_ROWS ids, committing after each batch, so a user with tens of
+    thousands of frames never holds one huge transaction or loads ORM objects.
+    Every step is idempotent: a purge interrupted half way is finished by
+    running it again.
+
+    The sessions' frame keys are destroyed first, in one statement, so the
+    frames and their text are unreadable from that moment on. Files are not
+    touched on the request path, except those of sessions that may hold
+    frames sealed with the master key (recorded before sessions had keys),
+    which shredding cannot reach: once the rows are gone the session ids are
+    handed to a ``purge_frames`` background job, which removes each session's
+    archive and frame directory and reports its progress. Anything it misses
+    is left to FrameSweeper. Cached translations of the user's screen text go
+    with the sessions.
+    """
+
+    def __init__(self, batch_rows=None):
+        self.batch_rows = batch_rows or Config.PURGE_BATCH_ROWS
+
+    def purge_sessions(self, user_id):
+        """
+        Delete all of a user's sessions, frame analyses and everything derived
+        from them; returns {'sessions', 'frames', 'job'} where ``job`` removes the files
+        """
+        session_ids, frames = self._purge_session_rows(user_id)
+        job = self._submit_file_purge(user_id, session_ids) if session_ids else None
+        return {'sessions': len(session_ids), 'frames': frames, 'job': job}
+
+    def purge_account(self, user_id):
+        """Delete the user and everything stored about them; audit entries are kept without the user link"""
+        session_ids, frames = self._purge_session_rows(user_id)
+
+        # Buffered events still reference the user; write them before the link is cleared
+        flush_audit_events()
+        BackgroundJobService().delete_user(user_id)
+        for model in (QuizResponse, PeriodicAssessment, KnowledgeGraph, UserConsent):
+            self._delete_batched(model, model.user_id == user_id)
+        AuditLogService().detach_user(user_id)
+        User.query.filter_by(id=user_id).delete(synchronize_session=False)
+        db.session.commit()
+
+        export_root = Path(Config.EXPORT_FOLDER)
+        paths = [path for path in (export_root / dataset / f'user_id={user_id}' for dataset in ('sessions', 'frames'))
+                 if path.exists()]
+        # The job outlives the user row, so it belongs to nobody
+        job = self._submit_file_purge(None, session_ids, paths) if session_ids or paths else None
+        return {'sessions': len(session_ids), 'frames': frames, 'job': job}
+
+    def _purge_session_rows(self, user_id):
+        session_ids = [row.id for row in ScreenSession.query.with_entities(ScreenSession.id).filter_by(
+            user_id=user_id).order_by(ScreenSession.id).all()]
+
+        keys = DataKeyService()
+        master_sealed = keys.master_sealed_sessions(session_ids)
+        keys.shred_user(user_id)
+        db.session.commit()
+        storage = FrameStorageService()
+        for session_id in master_sealed:
+            storage.delete_session(session_id)
+
+        frames = 0
+        for chunk in _chunks(session_ids, self.batch_rows):
+            frames += self._delete_batched(FrameAnalysis, FrameAnalysis.session_id.in_(chunk))
+        # Frames whose session row is already gone, from an earlier interrupted purge
+        frames += self._delete_batched(FrameAnalysis, FrameAnalysis.user_id == user_id)
+        self._delete_batched(ScreenSession, ScreenSession.user_id == user_id)
+
+        PopulationStatsService().remove_user(user_id)
+        HeatmapService().delete_user(user_id)
+        RollupService().delete_user(user_id)
+        ResponseCacheService().delete_user(user_id)
+        TranslationService.delete_user(user_id)
+        User.bump_data_version(user_id)
+        db.session.commit()
+        return session_ids, frames
+
+    def _delete_batched(self, model, *criteria):
+        """Delete matching rows PURGE_BATCH_ROWS at a time, committing after each batch; returns the count"""
+        deleted = 0
+        while True:
+            ids = [row[0] for row in db.session.query(model.id).filter(*criteria).limit(self.batch_rows).all()]
+            if not ids:
+                return deleted
+            deleted += model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+
+    @staticmethod
+    def _submit_file_purge(user_id, session_ids, paths=()):
+        return BackgroundJobService().submit('purge_frames', user_id=user_id,
+                                             params={'session_ids': session_ids, 'paths': [str(p) for p in paths]})
+
+
+class FrameSweeper:
+    """
+    Reclaims frame stores (``<session_id>.pack`` archives and ``<session_id>/``
+    directories in FRAMES_FOLDER) whose session no longer exists: leftovers of
+    crypto-shredded sessions whose purge job never ran to the end. It lists
+    only the top level of the folder, checks the session ids in batches, skips
+    anything modified in the last FRAME_SWEEP_GRACE_SECONDS and deletes at
+    most FRAME_SWEEP_MAX_SESSIONS_PER_SECOND stores a second, so it stays in
+    the background.
+    """
+
+    def __init__(self, grace_seconds=None, max_sessions_per_second=None):
+        self.grace_seconds = grace_seconds if grace_seconds is not None else Config.FRAME_SWEEP_GRACE_SECONDS
+        self.max_sessions_per_second = max_sessions_per_second or Config.FRAME_SWEEP_MAX_SESSIONS_PER_SECOND
+        self.storage = FrameStorageService()
+
+    def run(self):
+        report = {'sessions': 0, 'bytes_reclaimed': 0}
+        for session_id in self._orphans():
+            started = time.monotonic()
+            report['bytes_reclaimed'] += self.storage.delete_session(session_id)
+            report['sessions'] += 1
+            pause = 1 / self.max_sessions_per_second - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+        return report
+
+    def _orphans(self):
+        frames_dir = self.storage.frames_dir
+        if not frames_dir.is_dir():
+            return []
+
+        cutoff = time.time() - self.grace_seconds
+        stores = {}
+        with os.scandir(frames_dir) as entries:
+            for entry in entries:
+                name = entry.name[:-len(ARCHIVE_SUFFIX)] if entry.name.endswith(ARCHIVE_SUFFIX) else entry.name
+                if not name.isdigit():
+                    continue
+                try:
+                    modified = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                session_id = int(name)
+                stores[session_id] = max(stores.get(session_id, 0), modified)
+
+        candidates = sorted(session_id for session_id, modified in stores.items() if modified < cutoff)
+        orphans = []
+        for chunk in _chunks(candidates, 500):
+            existing = {row.id for row in ScreenSession.query.with_entities(ScreenSession.id).filter(
+                ScreenSession.id.in_(chunk)).all()}
+            orphans.extend(session_id for session_id in chunk if session_id not in existing)
+        return orphans
+
+
+def sweep_orphaned_frames():
+    report = FrameSweeper().run()
+    if report['sessions']:
+        print(f"Frame sweep: removed frames of {report['sessions']} deleted sessions, "
+              f"reclaimed {report['bytes_reclaimed']} bytes")
+    return report
+
+
+def start_frame_sweeper(app):
+    from app.utils.scheduler import start_periodic_job
+    return start_periodic_job(app, 'frame-sweeper', Config.FRAME_SWEEP_INTERVAL_SECONDS, sweep_orphaned_frames,
+                              initial_delay=Config.FRAME_SWEEP_INITIAL_DELAY_SECONDS)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@job_handler('purge_frames')
+def run_file_purge_job(context):
+    """Remove the frame stores of purged sessions (and any extra directories), reporting progress"""
+    storage = FrameStorageService()
+    session_ids = context.params.get('session_ids', [])
+    reclaimed = 0
+    last_report = time.monotonic()
+
+    for done, session_id in enumerate(session_ids, start=1):
+        reclaimed += storage.delete_session(session_id)
+        if time.monotonic() - last_report >= 2:
+            context.report(sessions_done=done, sessions_total=len(session_ids), bytes_reclaimed=reclaimed)
+            last_report = time.monotonic()
+
+    for path in context.params.get('paths', []):
+        shutil.rmtree(path, ignore_errors=True)
+
+    return {'sessions': len(session_ids), 'bytes_reclaimed': reclaimed}
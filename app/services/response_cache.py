@@ -0,0 +1,116 @@
+"""
+Response Cache - per-user dashboard API responses keyed by the user's data version
+"""
+import hashlib
+import time
+from datetime import datetime
+from functools import partial, wraps
+import sqlalchemy as sa
+from flask import current_app, request
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import ResponseCacheEntry
+from config import Config
+
+
+def _cache_key(endpoint, path, args):
+    query = '&'.join(f'{k}={v}' for k, v in sorted(args.items(multi=True)))
+    return hashlib.sha256(f'{endpoint}|{path}|{query}'.encode('utf-8')).hexdigest()
+
+
+def _etag(user_id, cache_key, version, bucket):
+    return hashlib.sha256(f'{user_id}|{cache_key}|{version}|{bucket}'.encode('utf-8')).hexdigest()[:32]
+
+
+class ResponseCacheService:
+    """
+    Stores serialized JSON responses in the ``response_cache`` table so every
+    gunicorn worker shares them. An entry is only valid for the
+    ``users.data_version`` it was computed at; the write paths that change
+    dashboard data bump the version (``User.bump_data_version``), so entries
+    never need explicit invalidation. Storing an entry drops the user's
+    entries from older versions.
+
+    Responses that depend on the current time as well (rolling windows,
+    "recent" lists) are also bounded in age: time is cut into buckets of
+    ``ttl_seconds`` and an entry, like its ETag, is only valid in the bucket
+    it was computed in.
+    """
+
+    def __init__(self, ttl_seconds=None):
+        self.ttl_seconds = ttl_seconds or Config.RESPONSE_CACHE_TTL_SECONDS
+
+    def bucket(self, now=None):
+        return int((now if now is not None else time.time()) // self.ttl_seconds)
+
+    def get(self, user_id, cache_key, version):
+        entry = ResponseCacheEntry.query.filter_by(user_id=user_id, cache_key=cache_key).first()
+        bucket_start = datetime.utcfromtimestamp(self.bucket() * self.ttl_seconds)
+        if entry is None or entry.data_version != version or entry.created_at < bucket_start:
+            return None
+        return entry.body
+
+    def put(self, user_id, cache_key, version, body):
+        """Store an entry on a connection of its own, leaving the caller's session untouched"""
+        table = ResponseCacheEntry.__table__
+        values = {'data_version': version, 'body': body, 'created_at': datetime.utcnow()}
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(sa.delete(table).where(table.c.user_id == user_id,
+                                                          table.c.data_version < version))
+                updated = connection.execute(sa.update(table).where(
+                    table.c.user_id == user_id, table.c.cache_key == cache_key).values(**values)).rowcount
+                if not updated:
+                    connection.execute(sa.insert(table).values(user_id=user_id, cache_key=cache_key, **values))
+        except IntegrityError:
+            # Another worker stored the same response first
+            pass
+
+    def delete_user(self, user_id):
+        """Drop a user's entries (caller commits)"""
+        ResponseCacheEntry.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+
+def cached_response(view=None, max_age=None):
+    """
+    Serve a login-required JSON view from the response cache, with an ETag
+    derived from (user, request, data version, time bucket) so unchanged data
+    costs the browser a 304 and the server no recomputation. Views whose
+    result also changes with the clock pass a shorter ``max_age`` (seconds)
+    than RESPONSE_CACHE_TTL_SECONDS.
+    """
+    if view is None:
+        return partial(cached_response, max_age=max_age)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.RESPONSE_CACHE_ENABLED or not current_user.is_authenticated:
+            return view(*args, **kwargs)
+
+        user_id = current_user.id
+        version = current_user.data_version or 0
+        cache_key = _cache_key(request.endpoint, request.path, request.args)
+        service = ResponseCacheService(max_age)
+        etag = _etag(user_id, cache_key, version, service.bucket())
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            body = service.get(user_id, cache_key, version)
+            if body is not None:
+                response = current_app.response_class(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or not response.is_json:
+                    return response
+                service.put(user_id, cache_key, version, response.get_data(as_text=True))
+                response.headers['X-Cache'] = 'MISS'
+
+        response.set_etag(etag)
+        # Browsers must revalidate, which the ETag makes cheap
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return wrapper
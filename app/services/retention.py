@@ -0,0 +1,180 @@
+"""
+Frame Retention - deletes stored frames older than AUTO_DELETE_FRAMES_AFTER_DAYS
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from app import db
+from app.models import ScreenSession, FrameAnalysis
+from app.services.data_keys import DataKeyService
+from app.services.frame_storage import FrameStorageService
+from app.utils.frame_video import VIDEO_DIRNAME
+from config import Config
+
+
+class FrameRetentionService:
+    """
+    Reaps frame files of sessions past the retention window, together with
+    the screen text and speech transcripts read off them.
+
+    Candidate sessions come from the (frames_purged_at, created_at) index, never
+    from walking FRAMES_FOLDER. Each batch is claimed with a compare-and-set
+    UPDATE carrying a lease, so several workers can run the reaper at once
+    without deleting the same session twice; a crashed worker's lease simply
+    expires and the session is picked up again.
+    """
+
+    def __init__(self, retention_days=None, batch_size=None, max_files_per_second=None):
+        self.retention_days = retention_days if retention_days is not None else Config.AUTO_DELETE_FRAMES_AFTER_DAYS
+        self.batch_size = batch_size or Config.RETENTION_BATCH_SIZE
+        self.max_files_per_second = max_files_per_second or Config.RETENTION_MAX_FILES_PER_SECOND
+        self.claim_ttl = timedelta(seconds=Config.RETENTION_CLAIM_TTL_SECONDS)
+        self.frames_dir = Path(Config.FRAMES_FOLDER)
+        self.storage = FrameStorageService()
+
+    def run(self, max_batches=None):
+        """Reap batches until no expired sessions remain; returns a summary report"""
+        report = {'sessions': 0, 'files_deleted': 0, 'bytes_reclaimed': 0, 'frames_updated': 0}
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            session_ids = self._claim_batch()
+            if not session_ids:
+                break
+
+            batch_report = self._reap_sessions(session_ids)
+            for key, value in batch_report.items():
+                report[key] += value
+            batches += 1
+
+        report['batches'] = batches
+        return report
+
+    def _claim_batch(self):
+        now = datetime.utcnow()
+        cutoff = now - timedelta(days=self.retention_days)
+        lease_expired = now - self.claim_ttl
+        token = uuid.uuid4().hex
+
+        candidates = [row.id for row in ScreenSession.query.with_entities(ScreenSession.id).filter(
+            ScreenSession.frames_purged_at.is_(None),
+            ScreenSession.created_at < cutoff
+        ).filter(
+            db.or_(ScreenSession.retention_claimed_at.is_(None),
+                   ScreenSession.retention_claimed_at < lease_expired)
+        ).order_by(ScreenSession.created_at).limit(self.batch_size).all()]
+
+        if not candidates:
+            return []
+
+        # Compare-and-set: only rows that are still unclaimed (or whose lease expired) are taken
+        ScreenSession.query.filter(
+            ScreenSession.id.in_(candidates),
+            ScreenSession.frames_purged_at.is_(None),
+            db.or_(ScreenSession.retention_claimed_at.is_(None),
+                   ScreenSession.retention_claimed_at < lease_expired)
+        ).update({
+            ScreenSession.retention_claim: token,
+            ScreenSession.retention_claimed_at: now
+        }, synchronize_session=False)
+        db.session.commit()
+
+        return [row.id for row in ScreenSession.query.with_entities(ScreenSession.id).filter(
+            ScreenSession.retention_claim == token
+        ).all()]
+
+    def _reap_sessions(self, session_ids):
+        report = {'sessions': len(session_ids), 'files_deleted': 0, 'bytes_reclaimed': 0, 'frames_updated': 0}
+
+        frame_paths = FrameAnalysis.query.with_entities(FrameAnalysis.frame_path).filter(
+            FrameAnalysis.session_id.in_(session_ids),
+            FrameAnalysis.frame_path.isnot(None)
+        ).all()
+
+        # Packed frames share one archive per session, so each archive is unlinked once
+        paths = dict.fromkeys(self.storage.physical_path(row.frame_path) for row in frame_paths)
+        for session_id in session_ids:
+            paths.update(dict.fromkeys(self.storage.session_files(session_id)))
+
+        # Destroying the keys makes the frames unreadable before a single file is unlinked
+        DataKeyService().shred_sessions(session_ids)
+        db.session.commit()
+
+        deleted, reclaimed = self._delete_files(paths)
+        report['files_deleted'] = deleted
+        report['bytes_reclaimed'] = reclaimed
+
+        for session_id in session_ids:
+            session_dir = self.frames_dir / str(session_id)
+            for directory in (session_dir / VIDEO_DIRNAME, session_dir):
+                try:
+                    (directory / '.lock').unlink(missing_ok=True)
+                    directory.rmdir()
+                except OSError:
+                    pass  # Missing, or still holds files we don't track
+
+        report['frames_updated'] = FrameAnalysis.query.filter(
+            FrameAnalysis.session_id.in_(session_ids),
+            FrameAnalysis.frame_path.isnot(None)
+        ).update({FrameAnalysis.frame_path: None}, synchronize_session=False)
+        # The text read off the frames was sealed with the shredded key (or predates sealing); it goes too
+        FrameAnalysis.query.filter(FrameAnalysis.session_id.in_(session_ids)).update({
+            FrameAnalysis.extracted_text: None,
+            FrameAnalysis.translated_text: None,
+            FrameAnalysis.content_description: None,
+            FrameAnalysis.audio_transcript: None
+        }, synchronize_session=False)
+
+        ScreenSession.query.filter(ScreenSession.id.in_(session_ids)).update({
+            ScreenSession.frames_purged_at: datetime.utcnow(),
+            ScreenSession.retention_claim: None,
+            ScreenSession.retention_claimed_at: None
+        }, synchronize_session=False)
+        db.session.commit()
+
+        return report
+
+    def _delete_files(self, paths):
+        """Unlink files, throttled to max_files_per_second; returns (count, bytes)"""
+        deleted = 0
+        reclaimed = 0
+        window_started = time.monotonic()
+        window_count = 0
+
+        for path in paths:
+            try:
+                size = path.stat().st_size
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"Retention: could not delete {path}: {e}")
+                continue
+
+            deleted += 1
+            reclaimed += size
+            window_count += 1
+
+            if window_count >= self.max_files_per_second:
+                elapsed = time.monotonic() - window_started
+                if elapsed < 1:
+                    time.sleep(1 - elapsed)
+                window_started = time.monotonic()
+                window_count = 0
+
+        return deleted, reclaimed
+
+
+def reap_expired_frames():
+    report = FrameRetentionService().run()
+    if report['sessions']:
+        print(f"Frame retention: purged {report['files_deleted']} files from {report['sessions']} sessions, "
+              f"reclaimed {report['bytes_reclaimed']} bytes")
+    return report
+
+
+def start_retention_worker(app):
+    from app.utils.scheduler import start_periodic_job
+    return start_periodic_job(app, 'frame-retention', Config.RETENTION_INTERVAL_SECONDS, reap_expired_frames)
@@ -0,0 +1,201 @@
+"""
+Daily Rollups - per-user, per-day aggregates of completed sessions
+"""
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import (
+    ScreenSession, FrameAnalysis, UserDailyRollup, UserDailyAppUsage, UserDailyCategory
+)
+
+SENTIMENTS = ('positive', 'negative', 'neutral', 'mixed')
+IMPACTS = ('positive', 'negative', 'neutral')
+
+
+class RollupService:
+    """
+    Keeps ``user_daily_rollups`` and its app/category child tables in step
+    with completed sessions so dashboard readers never merge session JSON in
+    Python.
+
+    ``apply_session`` adds (or, with ``sign=-1``, removes) one session's
+    contribution using SQL increments inside the caller's transaction; the
+    caller commits together with the session itself. ``rebuild_user``
+    recomputes a user's rollups from scratch and backs the backfill command.
+
+    Reads are memoized per instance, so services sharing one RollupService
+    while building a single response query each aggregate only once.
+    """
+
+    def __init__(self):
+        self._memo = {}
+
+    # ---- write side ----
+
+    def apply_session(self, session, sign=1):
+        self._memo.clear()
+        if not session.created_at:
+            return
+        rollup_id = self._get_or_create(UserDailyRollup, user_id=session.user_id, day=session.created_at.date()).id
+
+        sentiments = session.sentiment_distribution or {}
+        impacts = session.wellness_impacts or {}
+        deltas = {
+            'session_count': 1,
+            'duration_seconds': session.duration_seconds or 0,
+            'total_frames': session.total_frames or 0,
+            'wellness_score_sum': session.wellness_score or 0,
+            'productivity_score_sum': session.productivity_score or 0,
+            **{f'sentiment_{s}': sentiments.get(s, 0) for s in SENTIMENTS},
+            **{f'impact_{i}': impacts.get(i, 0) for i in IMPACTS}
+        }
+        UserDailyRollup.query.filter_by(id=rollup_id).update(
+            {getattr(UserDailyRollup, column): getattr(UserDailyRollup, column) + sign * value
+             for column, value in deltas.items()},
+            synchronize_session=False
+        )
+
+        for model, key, counts in ((UserDailyAppUsage, 'app_name', session.app_usage),
+                                   (UserDailyCategory, 'category', session.content_categories)):
+            for name, count in (counts or {}).items():
+                if not name:
+                    continue
+                child_id = self._get_or_create(model, rollup_id=rollup_id, user_id=session.user_id,
+                                               **{key: name[:100]}).id
+                model.query.filter_by(id=child_id).update(
+                    {model.frame_count: model.frame_count + sign * count}, synchronize_session=False)
+
+    def delete_user(self, user_id):
+        """Drop every rollup row of a user (caller commits)"""
+        self._memo.clear()
+        UserDailyAppUsage.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        UserDailyCategory.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        UserDailyRollup.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+    def rebuild_user(self, user_id):
+        """Recompute a user's rollups from their completed sessions; returns the number of days written"""
+        self.delete_user(user_id)
+
+        sessions = ScreenSession.query.filter_by(user_id=user_id, status='completed').all()
+
+        # Sessions completed before wellness_impacts was stored get it from their frames
+        missing = [s.id for s in sessions if s.wellness_impacts is None]
+        frame_impacts = defaultdict(dict)
+        if missing:
+            rows = db.session.query(
+                FrameAnalysis.session_id, FrameAnalysis.wellness_impact, func.count(FrameAnalysis.id)
+            ).filter(FrameAnalysis.session_id.in_(missing)).group_by(
+                FrameAnalysis.session_id, FrameAnalysis.wellness_impact
+            ).all()
+            for session_id, impact, count in rows:
+                frame_impacts[session_id][impact] = count
+
+        days = {}
+        for session in sessions:
+            if not session.created_at:
+                continue
+            day = session.created_at.date()
+            entry = days.setdefault(day, {
+                'row': defaultdict(float), 'apps': defaultdict(int), 'categories': defaultdict(int)
+            })
+            row = entry['row']
+            row['session_count'] += 1
+            row['duration_seconds'] += session.duration_seconds or 0
+            row['total_frames'] += session.total_frames or 0
+            row['wellness_score_sum'] += session.wellness_score or 0
+            row['productivity_score_sum'] += session.productivity_score or 0
+            for s in SENTIMENTS:
+                row[f'sentiment_{s}'] += (session.sentiment_distribution or {}).get(s, 0)
+            impacts = session.wellness_impacts if session.wellness_impacts is not None else frame_impacts[session.id]
+            for i in IMPACTS:
+                row[f'impact_{i}'] += impacts.get(i, 0)
+            for name, count in (session.app_usage or {}).items():
+                if name:
+                    entry['apps'][name[:100]] += count
+            for name, count in (session.content_categories or {}).items():
+                if name:
+                    entry['categories'][name[:100]] += count
+
+        for day, entry in days.items():
+            rollup = UserDailyRollup(user_id=user_id, day=day, **{
+                column: value if column.endswith('_sum') else int(value)
+                for column, value in entry['row'].items()
+            })
+            rollup.apps = [UserDailyAppUsage(user_id=user_id, app_name=name, frame_count=count)
+                           for name, count in entry['apps'].items()]
+            rollup.categories = [UserDailyCategory(user_id=user_id, category=name, frame_count=count)
+                                 for name, count in entry['categories'].items()]
+            db.session.add(rollup)
+
+        db.session.commit()
+        return len(days)
+
+    def backfill(self, user_ids=None):
+        """Rebuild rollups for the given users (default: everyone with a completed session)"""
+        if user_ids is None:
+            user_ids = [row.user_id for row in ScreenSession.query.with_entities(
+                ScreenSession.user_id).filter_by(status='completed').distinct().all()]
+
+        report = {'users': 0, 'days': 0}
+        for user_id in user_ids:
+            report['days'] += self.rebuild_user(user_id)
+            report['users'] += 1
+        return report
+
+    def _get_or_create(self, model, **keys):
+        row = model.query.filter_by(**keys).first()
+        if row is not None:
+            return row
+        try:
+            # Savepoint, so losing a race with another worker doesn't roll back the caller's transaction
+            with db.session.begin_nested():
+                row = model(**keys)
+                db.session.add(row)
+            return row
+        except IntegrityError:
+            return model.query.filter_by(**keys).one()
+
+    # ---- read side ----
+
+    def _memoized(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def totals(self, user_id):
+        """All-time sums for a user as a dict (zeros when there is no data)"""
+        return self._memoized(('totals', user_id), lambda: self._totals(user_id))
+
+    def _totals(self, user_id):
+        columns = [c.name for c in UserDailyRollup.__table__.columns
+                   if c.name not in ('id', 'user_id', 'day', 'updated_at')]
+        row = db.session.query(*[
+            func.coalesce(func.sum(getattr(UserDailyRollup, c)), 0) for c in columns
+        ]).filter(UserDailyRollup.user_id == user_id).one()
+        return dict(zip(columns, row))
+
+    def app_totals(self, user_id, limit=None):
+        """[(app_name, frame_count)] ordered by usage"""
+        return self._memoized(('apps', user_id, limit), lambda: self._child_totals(UserDailyAppUsage, UserDailyAppUsage.app_name, user_id, limit))
+
+    def category_totals(self, user_id, limit=None):
+        """[(category, frame_count)] ordered by frame count"""
+        return self._memoized(('categories', user_id, limit), lambda: self._child_totals(
+            UserDailyCategory, UserDailyCategory.category, user_id, limit))
+
+    def recent_days(self, user_id, limit=60):
+        """Most recent days with at least one session, newest first"""
+        return self._memoized(('days', user_id, limit), lambda: UserDailyRollup.query.filter(
+            UserDailyRollup.user_id == user_id,
+            UserDailyRollup.session_count > 0
+        ).order_by(UserDailyRollup.day.desc()).limit(limit).all())
+
+    def _child_totals(self, model, name_column, user_id, limit):
+        total = func.sum(model.frame_count)
+        query = db.session.query(name_column, total).filter(
+            model.user_id == user_id
+        ).group_by(name_column).having(total > 0).order_by(total.desc(), name_column)
+        if limit:
+            query = query.limit(limit)
+        return [(name, int(count)) for name, count in query.all()]
@@ -1,13 +1,22 @@
 import os
 import base64
+import bisect
 from pathlib import Path
 from datetime import datetime
 import json
 import re
+from flask import current_app
 from openai import OpenAI
 from app import db
-from app.models import FrameAnalysis
-from app.utils.encryption import EncryptionService
+from app.models import FrameAnalysis, ScreenSession
+from app.services.app_catalog import AppCatalogService
+from app.services.data_keys import DataKeyService
+from app.services.frame_storage import FrameStorageService
+from app.services.metrics import StageTimer
+from app.services.sentiment_batcher import SentimentBatchService
+from app.services.translation import TranslationService
+from app.utils.image_hash import dhash, hash_similarity
+from app.utils.stage_graph import StageGraph, StageTimeout, get_executor, remaining_time
 from config import Config
 
 class ScreenAnalyzerService:
@@ -215,60 +224,100 @@ class ScreenAnalyzerService:
 
     def __init__(self):
         self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        self.frames_dir = Config.FRAMES_FOLDER
-        self.encryption_service = EncryptionService(Config.ENCRYPTION_KEY) if Config.ENCRYPT_FRAMES else None
-
-    def analyze_frame(self, session_id, frame_number, timestamp, frame_data, audio_text=None):
-        frame_path = self._save_frame(session_id, frame_number, frame_data)
-
-        vision_analysis = self._analyze_with_gpt4_vision(frame_path)
-
-        translated_text = None
-        if vision_analysis.get('extracted_text'):
-            detected_lang = vision_analysis.get('detected_language', 'en')
-            if detected_lang != 'en':
-                translated_text = self._translate_text(vision_analysis['extracted_text'], detected_lang)
+        self.frame_storage = FrameStorageService()
+        self.keys = DataKeyService()
+        self.translator = TranslationService(self)
+        self.apps = AppCatalogService()
+        self.timer = StageTimer()
+
+    def analyze_frame(self, session_id, frame_number, timestamp, frame_data, audio_text=None, user_id=None):
+        self.timer = StageTimer()
+        if user_id is None:
+            user_id = db.session.get(ScreenSession, session_id).user_id
+
+        image_bytes = frame_data.read()
+        with self.timer.stage('hash'):
+            frame_hash = self._frame_hash(image_bytes)
+
+        frame_path = self._save_frame(session_id, frame_number, image_bytes)
+
+        # Temporal mode: inside a stable run, copy the anchor's analysis instead of calling the models
+        anchor = self._find_temporal_anchor(session_id, frame_number, frame_hash, audio_text)
+        if anchor is not None:
+            return self._infer_frame(anchor, session_id, user_id, frame_number, timestamp, frame_path, frame_hash)
+
+        results, report = self._build_stage_graph(frame_path, audio_text, user_id).run()
+        self.timer.record_graph(report)
+
+        vision_analysis = results['vision']
+        extracted_text = vision_analysis.get('extracted_text')
+        detected_language, translated_text = results['translation']
+        audio_analysis = results.get('audio')
+        audio_transcript = audio_analysis.get('translated_text') if audio_analysis else None
+
+        if 'sentiment' in results:
+            sentiment_analysis = results['sentiment']
+            sentiment_status = 'scored'
+        else:
+            # Scored later together with other frames of the session (see SentimentBatchService)
+            sentiment_analysis = self._provisional_sentiment(vision_analysis)
+            sentiment_status = 'pending'
 
-        audio_analysis = None
-        if audio_text:
-            audio_analysis = self._analyze_audio_text(audio_text)
+        # Enhanced wellness impact with new indicators
+        with self.timer.stage('impact'):
+            wellness_impact = self._determine_wellness_impact(
+                vision_analysis.get('content_type'),
+                sentiment_analysis['sentiment'],
+                vision_analysis.get('app_detected'),
+                vision_analysis.get('engagement_indicators'),
+                vision_analysis.get('potential_concerns')
+            )
 
-        sentiment_analysis = self._analyze_sentiment(
-            vision_analysis.get('content_description', ''),
-            translated_text or vision_analysis.get('extracted_text', ''),
-            audio_analysis.get('translated_text') if audio_analysis else None
-        )
+        # Commit time is only visible in the stage histograms, not in the row itself
+        stage_timings = self.timer.to_dict()
 
-        # Enhanced wellness impact with new indicators
-        wellness_impact = self._determine_wellness_impact(
-            vision_analysis.get('content_type'),
-            sentiment_analysis['sentiment'],
-            vision_analysis.get('app_detected'),
-            vision_analysis.get('engagement_indicators'),
-            vision_analysis.get('potential_concerns')
-        )
+        with self.timer.stage('resolve_app'):
+            app_id = self.apps.resolve(vision_analysis.get('app_detected'))
 
+        # Screen text and speech are sealed with the session's key, like the frame itself
+        seal = lambda text: self.keys.seal_text(session_id, text)
         frame_analysis = FrameAnalysis(
             session_id=session_id,
+            user_id=user_id,
             frame_number=frame_number,
             timestamp=timestamp,
             frame_path=str(frame_path),
             app_detected=vision_analysis.get('app_detected'),
+            app_id=app_id,
             content_type=vision_analysis.get('content_type'),
-            extracted_text=vision_analysis.get('extracted_text'),
-            detected_language=vision_analysis.get('detected_language'),
+            extracted_text=seal(extracted_text),
+            translated_text=seal(translated_text),
+            detected_language=detected_language,
             sentiment=sentiment_analysis['sentiment'],
             sentiment_score=sentiment_analysis['score'],
+            sentiment_status=sentiment_status,
             objects_detected=vision_analysis.get('objects_detected', []),
-            content_description=vision_analysis.get('content_description'),
-            wellness_impact=wellness_impact
+            content_description=seal(vision_analysis.get('content_description')),
+            engagement_indicators=vision_analysis.get('engagement_indicators'),
+            potential_concerns=vision_analysis.get('potential_concerns'),
+            audio_transcript=seal(audio_transcript),
+            wellness_impact=wellness_impact,
+            stage_timings=stage_timings,
+            frame_hash=format(frame_hash, '016x') if frame_hash is not None else None,
+            analysis_mode='analyzed'
         )
 
-        db.session.add(frame_analysis)
-        db.session.commit()
+        with self.timer.stage('commit'):
+            db.session.add(frame_analysis)
+            self._propagate_between_anchors(session_id, frame_analysis)
+            db.session.commit()
+
+        if sentiment_status == 'pending':
+            SentimentBatchService(self).maybe_flush(session_id)
 
         return {
             'frame_number': frame_number,
+            'analysis_mode': 'analyzed',
             'app': vision_analysis.get('app_detected'),
             'content_type': vision_analysis.get('content_type'),
             'sentiment': sentiment_analysis['sentiment'],
@@ -279,6 +328,254 @@ class ScreenAnalyzerService:
             'potential_concerns': vision_analysis.get('potential_concerns', [])
         }
 
+    def _build_stage_graph(self, frame_path, audio_text, user_id):
+        """
+        The model calls of one frame as a dependency graph: audio analysis
+        runs alongside vision, translation waits only for the extracted text,
+        and inline sentiment (batching disabled) waits for all of them.
+        """
+        app = current_app._get_current_object()
+        graph = StageGraph(get_executor(Config.ANALYSIS_STAGE_WORKERS), context=app.app_context)
+        stage_timeout = Config.ANALYSIS_STAGE_TIMEOUT_SECONDS
+
+        graph.add('vision', lambda r: self._analyze_with_gpt4_vision(frame_path),
+                  timeout=Config.VISION_STAGE_TIMEOUT_SECONDS, fallback=lambda r: self._vision_error_result())
+
+        if audio_text:
+            graph.add('audio', lambda r: self._analyze_audio_text(audio_text), timeout=stage_timeout,
+                      fallback={'detected_language': 'en', 'translated_text': audio_text, 'category': 'other'})
+
+        graph.add('translation', lambda r: self._translate_extracted_text(r['vision'], user_id), requires=('vision',),
+                  timeout=stage_timeout,
+                  fallback=lambda r: (self.translator.detect(
+                      r['vision'].get('extracted_text'), r['vision'].get('detected_language'))[0], None))
+
+        if not Config.SENTIMENT_BATCHING_ENABLED:
+            requires = ('vision', 'translation', 'audio') if audio_text else ('vision', 'translation')
+            graph.add('sentiment', lambda r: self._analyze_sentiment(
+                r['vision'].get('content_description', ''),
+                r['translation'][1] or r['vision'].get('extracted_text') or '',
+                r['audio'].get('translated_text') if 'audio' in r else None
+            ), requires=requires, timeout=stage_timeout,
+                fallback=lambda r: self._provisional_sentiment(r['vision']))
+
+        return graph
+
+    def _translate_extracted_text(self, vision_analysis, user_id):
+        """Return (detected_language, translated_text); the vision model's language label is only a hint"""
+        extracted_text = vision_analysis.get('extracted_text')
+        with self.timer.stage('language_id'):
+            detected_language, translate = self.translator.detect(extracted_text, vision_analysis.get('detected_language'))
+
+        # English or very short text is never translated
+        translated_text = None
+        if translate:
+            translated_text = self.translator.cached(extracted_text, user_id)
+            if translated_text is None and not Config.SENTIMENT_BATCHING_ENABLED:
+                translated_text = self.translator.translate_many(
+                    [(extracted_text, detected_language)], user_id)[extracted_text]
+        return detected_language, translated_text
+
+    def _frame_hash(self, image_bytes):
+        try:
+            return dhash(image_bytes)
+        except Exception:
+            return None
+
+    def _find_temporal_anchor(self, session_id, frame_number, frame_hash, audio_text):
+        """
+        Return the analyzed frame to copy from when this frame can be inferred, else None.
+
+        A frame is inferred only when the last TEMPORAL_STABLE_FRAMES frames agree
+        on app and content type, it is not the Nth frame since the last full
+        analysis, and it looks like both the previous frame and the anchor.
+        Frames carrying audio are always analyzed.
+        """
+        if not Config.TEMPORAL_ANALYSIS_ENABLED or frame_hash is None or audio_text:
+            return None
+
+        stable_frames = Config.TEMPORAL_STABLE_FRAMES
+        analyze_every = Config.TEMPORAL_ANALYZE_EVERY
+        recent = FrameAnalysis.query.filter(
+            FrameAnalysis.session_id == session_id,
+            FrameAnalysis.frame_number < frame_number
+        ).order_by(FrameAnalysis.frame_number.desc()).limit(max(stable_frames, analyze_every)).all()
+
+        if len(recent) < stable_frames:
+            return None
+
+        run = recent[:stable_frames]
+        if len({(f.app_id, f.content_type) for f in run}) != 1:
+            return None
+
+        anchor = next((f for f in recent if f.analysis_mode != 'inferred'), None)
+        if anchor is None or frame_number - anchor.frame_number >= analyze_every:
+            return None
+
+        # Any large visual change forces a full analysis
+        threshold = Config.TEMPORAL_CHANGE_SIMILARITY
+        for reference in (recent[0], anchor):
+            if not reference.frame_hash or hash_similarity(frame_hash, int(reference.frame_hash, 16)) < threshold:
+                return None
+
+        return anchor
+
+    def _infer_frame(self, anchor, session_id, user_id, frame_number, timestamp, frame_path, frame_hash):
+        # The anchor's text is copied still sealed; both rows belong to the same session
+        frame_analysis = FrameAnalysis(
+            session_id=session_id,
+            user_id=user_id,
+            frame_number=frame_number,
+            timestamp=timestamp,
+            frame_path=str(frame_path),
+            app_detected=anchor.app_detected,
+            app_id=anchor.app_id,
+            content_type=anchor.content_type,
+            extracted_text=anchor.extracted_text,
+            translated_text=anchor.translated_text,
+            detected_language=anchor.detected_language,
+            sentiment=anchor.sentiment,
+            sentiment_score=anchor.sentiment_score,
+            sentiment_status='inherited',
+            objects_detected=anchor.objects_detected,
+            content_description=anchor.content_description,
+            engagement_indicators=anchor.engagement_indicators,
+            potential_concerns=anchor.potential_concerns,
+            wellness_impact=anchor.wellness_impact,
+            stage_timings=self.timer.to_dict(),
+            frame_hash=format(frame_hash, '016x'),
+            analysis_mode='inferred',
+            inferred_from_frame=anchor.frame_number
+        )
+
+        with self.timer.stage('commit'):
+            db.session.add(frame_analysis)
+            db.session.commit()
+
+        return {
+            'frame_number': frame_number,
+            'analysis_mode': 'inferred',
+            'inferred_from_frame': anchor.frame_number,
+            'app': anchor.app_detected,
+            'content_type': anchor.content_type,
+            'sentiment': anchor.sentiment,
+            'wellness_impact': anchor.wellness_impact,
+            'extracted_text': self.keys.open_text(session_id, anchor.extracted_text) or '',
+            'content_description': self.keys.open_text(session_id, anchor.content_description) or '',
+            'engagement_indicators': {},
+            'potential_concerns': []
+        }
+
+    def _propagate_between_anchors(self, session_id, new_anchor):
+        """
+        Re-derive the frames inferred since the previous anchor from both neighbours.
+
+        Sentiment scores are interpolated between the two anchors, and when the
+        anchors disagree, frames closer to the new anchor take its labels.
+        """
+        inferred = FrameAnalysis.query.filter(
+            FrameAnalysis.session_id == session_id,
+            FrameAnalysis.analysis_mode == 'inferred',
+            FrameAnalysis.frame_number < new_anchor.frame_number
+        ).order_by(FrameAnalysis.frame_number.desc()).limit(Config.TEMPORAL_ANALYZE_EVERY).all()
+        if not inferred:
+            return
+
+        previous = FrameAnalysis.query.filter_by(
+            session_id=session_id, frame_number=inferred[0].inferred_from_frame
+        ).first()
+        if previous is None:
+            return
+
+        span = new_anchor.frame_number - previous.frame_number
+        labels_differ = (previous.app_id, previous.content_type) != (new_anchor.app_id, new_anchor.content_type)
+        updates = []
+        for frame in inferred:
+            if frame.inferred_from_frame != previous.frame_number:
+                continue
+            t = (frame.frame_number - previous.frame_number) / span
+            update = {'id': frame.id}
+            if previous.sentiment_score is not None and new_anchor.sentiment_score is not None:
+                update['sentiment_score'] = round(
+                    previous.sentiment_score + t * (new_anchor.sentiment_score - previous.sentiment_score), 3
+                )
+            if labels_differ and t > 0.5:
+                update.update({
+                    'app_detected': new_anchor.app_detected,
+                    'app_id': new_anchor.app_id,
+                    'content_type': new_anchor.content_type,
+                    'sentiment': new_anchor.sentiment,
+                    'wellness_impact': new_anchor.wellness_impact,
+                    'content_description': new_anchor.content_description,
+                    'inferred_from_frame': new_anchor.frame_number
+                })
+            updates.append(update)
+
+        db.session.bulk_update_mappings(FrameAnalysis, updates)
+
+    def _interpolate_inferred_scores(self, session_id, anchor_numbers):
+        """
+        Re-derive the sentiment scores of inferred frames next to these anchors
+        from the anchors' current scores (e.g. once a batch has scored them):
+        interpolated between the analyzed frames on either side, or the
+        previous one's score after the last anchor. Caller commits.
+        """
+        if not anchor_numbers:
+            return
+        every = Config.TEMPORAL_ANALYZE_EVERY
+        inferred = FrameAnalysis.query.with_entities(FrameAnalysis.id, FrameAnalysis.frame_number).filter(
+            FrameAnalysis.session_id == session_id,
+            FrameAnalysis.analysis_mode == 'inferred',
+            FrameAnalysis.frame_number > min(anchor_numbers) - every,
+            FrameAnalysis.frame_number < max(anchor_numbers) + every
+        ).all()
+        if not inferred:
+            return
+
+        low = min(frame.frame_number for frame in inferred)
+        high = max(frame.frame_number for frame in inferred)
+        analyzed = FrameAnalysis.query.with_entities(FrameAnalysis.frame_number, FrameAnalysis.sentiment_score).filter(
+            FrameAnalysis.session_id == session_id,
+            FrameAnalysis.analysis_mode != 'inferred'
+        )
+        before = analyzed.filter(FrameAnalysis.frame_number < low).order_by(FrameAnalysis.frame_number.desc()).first()
+        after = analyzed.filter(FrameAnalysis.frame_number > high).order_by(FrameAnalysis.frame_number).first()
+        anchors = ([before] if before else []) + analyzed.filter(
+            FrameAnalysis.frame_number.between(low, high)
+        ).order_by(FrameAnalysis.frame_number).all() + ([after] if after else [])
+        numbers = [anchor.frame_number for anchor in anchors]
+
+        updates = []
+        for frame in inferred:
+            position = bisect.bisect_left(numbers, frame.frame_number)
+            previous = anchors[position - 1] if position > 0 else None
+            following = anchors[position] if position < len(anchors) else None
+            if previous is None or previous.sentiment_score is None:
+                continue
+            score = previous.sentiment_score
+            if following is not None and following.sentiment_score is not None:
+                t = (frame.frame_number - previous.frame_number) / (following.frame_number - previous.frame_number)
+                score = previous.sentiment_score + t * (following.sentiment_score - previous.sentiment_score)
+            updates.append({'id': frame.id, 'sentiment_score': round(score, 3)})
+
+        db.session.bulk_update_mappings(FrameAnalysis, updates)
+
+    def _create_completion(self, stage, **kwargs):
+        """
+        Run a chat completion as a timed pipeline stage and record its token
+        usage. Inside a stage graph the call is bounded by the stage's
+        remaining time, so an abandoned call frees its pool thread.
+        """
+        remaining = remaining_time()
+        if remaining is not None and 'timeout' not in kwargs:
+            if remaining <= 0:
+                raise StageTimeout(f"No time left for {stage}")
+            kwargs['timeout'] = remaining
+        with self.timer.stage(stage):
+            response = self.client.chat.completions.create(**kwargs)
+        self.timer.record_usage(stage, response)
+        return response
+
     def _identify_app_from_content(self, detected_app, extracted_text, description):
         """Use the comprehensive app database to accurately identify the app/website"""
         detected_app_lower = (detected_app or '').lower()
@@ -311,18 +608,18 @@ class ScreenAnalyzerService:
         return detected_app or 'Unknown', None
 
     def _analyze_with_gpt4_vision(self, frame_path):
-        if self.encryption_service and str(frame_path).endswith('.enc'):
-            image_bytes = self.encryption_service.decrypt_file(frame_path)
+        with self.timer.stage('decrypt'):
+            image_bytes = self.frame_storage.read(frame_path)
+
+        with self.timer.stage('base64'):
             image_data = base64.b64encode(image_bytes).decode('utf-8')
-        else:
-            with open(frame_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
 
         # Enhanced prompt for better text extraction and categorization
         app_list = ', '.join([k.replace('_', ' ').title() for k in list(self.APP_DATABASE.keys())[:50]])
         category_list = ', '.join(self.CONTENT_CATEGORIES.keys())
 
-        response = self.client.chat.completions.create(
+        response = self._create_completion(
+            'vision',
             model="gpt-4o",
             messages=[
                 {
@@ -406,24 +703,29 @@ Consider the actual content being viewed, not just the platform.
             return result
         except Exception as e:
             print(f"Vision analysis error: {e}")
-            return {
-                'app_detected': 'Unknown',
-                'content_type': 'other',
-                'extracted_text': '',
-                'detected_language': 'en',
-                'content_description': 'Unable to analyze',
-                'objects_detected': [],
-                'engagement_indicators': {},
-                'content_tone': 'neutral',
-                'potential_concerns': []
-            }
+            return self._vision_error_result()
+
+    def _vision_error_result(self):
+        """What a frame the vision model could not analyze is recorded as"""
+        return {
+            'app_detected': 'Unknown',
+            'content_type': 'other',
+            'extracted_text': '',
+            'detected_language': 'en',
+            'content_description': 'Unable to analyze',
+            'objects_detected': [],
+            'engagement_indicators': {},
+            'content_tone': 'neutral',
+            'potential_concerns': []
+        }
 
     def _translate_text(self, text, source_lang):
         if not text or len(text) < 3:
             return text
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
+                'translate',
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -438,7 +740,8 @@ Consider the actual content being viewed, not just the platform.
             return text
 
     def _analyze_audio_text(self, audio_text):
-        response = self.client.chat.completions.create(
+        response = self._create_completion(
+            'audio',
             model="gpt-4o-mini",
             messages=[
                 {
@@ -466,12 +769,13 @@ Return as JSON with keys: detected_language, translated_text, category"""
                 'category': 'other'
             }
 
-    def _analyze_sentiment(self, description, text, audio_text):
+    def _analyze_sentiment(self, description, text, audio_text, timeout=None):
         combined_content = f"Visual: {description}. Text: {text}."
         if audio_text:
             combined_content += f" Audio: {audio_text}"
 
-        response = self.client.chat.completions.create(
+        response = self._create_completion(
+            'sentiment',
             model="gpt-4o-mini",
             messages=[
                 {
@@ -485,7 +789,8 @@ Also provide a sentiment score from -1.0 (very negative) to 1.0 (very positive)
 Return as JSON with keys: sentiment, score"""
                 }
             ],
-            max_tokens=100
+            max_tokens=100,
+            **({'timeout': timeout} if timeout else {})
         )
 
         try:
@@ -494,6 +799,13 @@ Return as JSON with keys: sentiment, score"""
         except:
             return {'sentiment': 'neutral', 'score': 0.0}
 
+    def _provisional_sentiment(self, vision_analysis):
+        """Sentiment from the vision model's content tone, used until the batch scorer runs"""
+        tone = str(vision_analysis.get('content_tone') or 'neutral').lower()
+        if tone not in ('positive', 'negative', 'neutral', 'mixed'):
+            tone = 'neutral'
+        return {'sentiment': tone, 'score': {'positive': 0.5, 'negative': -0.5}.get(tone, 0.0)}
+
     def _determine_wellness_impact(self, content_type, sentiment, app, engagement_indicators=None, potential_concerns=None):
         """
         Enhanced wellness impact determination using app database and content analysis
@@ -534,12 +846,12 @@ Return as JSON with keys: sentiment, score"""
             len(concerns) >= 2
         ]
 
-        # Calculate impact score
-        if sum(high_risk_indicators) >= 2:
+        # Calculate impact score (indicators may be None when an engagement key is missing)
+        if sum(map(bool, high_risk_indicators)) >= 2:
             return 'negative'
-        elif sum(positive_indicators) >= 2:
+        elif sum(map(bool, positive_indicators)) >= 2:
             return 'positive'
-        elif sum(negative_indicators) >= 2:
+        elif sum(map(bool, negative_indicators)) >= 2:
             return 'negative'
         elif app_impact == 'moderate_risk':
             return 'neutral'
@@ -548,18 +860,12 @@ Return as JSON with keys: sentiment, score"""
         else:
             return 'neutral'
 
-    def _save_frame(self, session_id, frame_number, frame_data):
-        session_dir = self.frames_dir / str(session_id)
-        session_dir.mkdir(parents=True, exist_ok=True)
+    def _save_frame(self, session_id, frame_number, image_bytes):
+        with self.timer.stage('encrypt'):
+            sealed = self.frame_storage.seal(image_bytes, session_id)
 
-        frame_path = session_dir / f"frame_{frame_number:04d}.jpg"
-        frame_data.save(str(frame_path))
-
-        if self.encryption_service:
-            encrypted_path = self.encryption_service.encrypt_file(frame_path)
-            return Path(encrypted_path)
-
-        return frame_path
+        with self.timer.stage('save'):
+            return self.frame_storage.write(session_id, frame_number, sealed)
 
     def generate_session_summary(self, session_id):
         frames = FrameAnalysis.query.filter_by(session_id=session_id).all()
@@ -572,19 +878,29 @@ Return as JSON with keys: sentiment, score"""
                 'productivity_score': 5.0,
                 'sentiment_distribution': {},
                 'app_usage': {},
-                'content_categories': {}
+                'content_categories': {},
+                'wellness_impacts': {},
+                'analyzed_frames': 0,
+                'inferred_frames': 0
             }
 
         sentiment_dist = {'positive': 0, 'negative': 0, 'neutral': 0, 'mixed': 0}
         app_usage = {}
         content_categories = {}
         wellness_impacts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        inferred_frames = 0
+        # Usage is keyed by canonical app name, so spelling variants count as one app
+        app_names = self.apps.names({frame.app_id for frame in frames if frame.app_id})
 
         for frame in frames:
+            if frame.analysis_mode == 'inferred':
+                inferred_frames += 1
+
             sentiment_dist[frame.sentiment] = sentiment_dist.get(frame.sentiment, 0) + 1
 
-            if frame.app_detected:
-                app_usage[frame.app_detected] = app_usage.get(frame.app_detected, 0) + 1
+            app_name = app_names.get(frame.app_id) or frame.app_detected
+            if app_name:
+                app_usage[app_name] = app_usage.get(app_name, 0) + 1
 
             if frame.content_type:
                 content_categories[frame.content_type] = content_categories.get(frame.content_type, 0) + 1
@@ -610,5 +926,8 @@ Return as JSON with keys: sentiment, score"""
             'productivity_score': round(productivity_score, 2),
             'sentiment_distribution': sentiment_dist,
             'app_usage': app_usage,
-            'content_categories': content_categories
+            'content_categories': content_categories,
+            'wellness_impacts': wellness_impacts,
+            'analyzed_frames': total_frames - inferred_frames,
+            'inferred_frames': inferred_frames
         }
@@ -0,0 +1,259 @@
+"""
+Sentiment Batching - scores the sentiment of many frames with a single completion
+"""
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from functools import partial
+from app import db
+from app.models import FrameAnalysis, ScreenSession
+from config import Config
+
+SENTIMENTS = ('positive', 'negative', 'neutral', 'mixed')
+MAX_FIELD_CHARS = 600
+
+
+class SentimentBatchService:
+    """
+    Frames are stored with a provisional sentiment (the vision model's
+    content tone) and ``sentiment_status='pending'``. Pending frames of a
+    session are scored together once SENTIMENT_BATCH_SIZE of them have
+    accumulated, once the oldest has waited SENTIMENT_BATCH_MAX_WAIT_SECONDS,
+    or when the session completes. The batch call is bounded by
+    SENTIMENT_LATENCY_BUDGET_SECONDS; on timeout or a malformed answer the
+    affected frames fall back to per-frame sentiment calls within what is
+    left of that budget. Translations deferred at analysis time are filled in
+    first, also as one batch.
+
+    Scoring never fails the request that triggers it: frames that could not
+    be scored go back to 'pending' for the next flush, and a claim left by a
+    worker that died expires after SENTIMENT_CLAIM_TTL_SECONDS.
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.batch_size = Config.SENTIMENT_BATCH_SIZE
+        self.max_wait = timedelta(seconds=Config.SENTIMENT_BATCH_MAX_WAIT_SECONDS)
+
+    def maybe_flush(self, session_id):
+        """Score the session's pending frames if the batch is full or has waited long enough"""
+        pending = FrameAnalysis.query.with_entities(
+            db.func.count(FrameAnalysis.id), db.func.min(FrameAnalysis.created_at)
+        ).filter(
+            FrameAnalysis.session_id == session_id,
+            self._claimable()
+        ).one()
+        count, oldest = pending
+        if not count:
+            return 0
+        if count >= self.batch_size or (oldest and datetime.utcnow() - oldest >= self.max_wait):
+            return self.flush_session(session_id)
+        return 0
+
+    def flush_session(self, session_id):
+        """
+        Score every pending frame of a session; returns the number of frames
+        scored. Stops early, leaving the rest pending, when a batch cannot be
+        scored completely.
+        """
+        scored = 0
+        while True:
+            token, frames = self._claim(session_id)
+            if not frames:
+                return scored
+            try:
+                self._translate(frames)
+                written = self._write_back(frames, self._score(frames))
+            except Exception as e:
+                print(f"Sentiment batch of session {session_id} failed, frames stay pending: {e}")
+                db.session.rollback()
+                written = 0
+            scored += written
+            if written < len(frames):
+                self._release(token)
+                return scored
+
+    def _claimable(self):
+        """Pending frames, and frames whose claim is older than SENTIMENT_CLAIM_TTL_SECONDS"""
+        # Claim tokens start with their creation time, so expired ones sort below this bound
+        expired = f"batch:{int(time.time() - Config.SENTIMENT_CLAIM_TTL_SECONDS):010d}:"
+        return db.or_(
+            FrameAnalysis.sentiment_status == 'pending',
+            db.and_(FrameAnalysis.sentiment_status.like('batch:%'), FrameAnalysis.sentiment_status < expired)
+        )
+
+    def _claim(self, session_id):
+        """Return (token, frames) for up to SENTIMENT_BATCH_SIZE claimable frames of the session"""
+        # Compare-and-set so concurrent flushes of one session never score a frame twice
+        token = f"batch:{int(time.time()):010d}:{uuid.uuid4().hex[:12]}"
+        ids = [row.id for row in FrameAnalysis.query.with_entities(FrameAnalysis.id).filter(
+            FrameAnalysis.session_id == session_id,
+            self._claimable()
+        ).order_by(FrameAnalysis.frame_number).limit(self.batch_size).all()]
+        if not ids:
+            return token, []
+
+        FrameAnalysis.query.filter(
+            FrameAnalysis.id.in_(ids),
+            self._claimable()
+        ).update({FrameAnalysis.sentiment_status: token}, synchronize_session=False)
+        db.session.commit()
+
+        return token, FrameAnalysis.query.filter(
+            FrameAnalysis.sentiment_status == token
+        ).order_by(FrameAnalysis.frame_number).all()
+
+    def _release(self, token):
+        """Put the frames of a claim that were not scored back to 'pending'"""
+        FrameAnalysis.query.filter(
+            FrameAnalysis.sentiment_status == token
+        ).update({FrameAnalysis.sentiment_status: 'pending'}, synchronize_session=False)
+        db.session.commit()
+
+    def _translate(self, frames):
+        """Fill in translations that were deferred at analysis time, one batched call for the whole batch"""
+        translator = self.analyzer.translator
+        keys = self.analyzer.keys
+        items = []
+        for frame in frames:
+            text = keys.open_text(frame.session_id, frame.extracted_text)
+            if frame.translated_text is None and text:
+                language, translate = translator.detect(text, frame.detected_language)
+                if translate:
+                    items.append((frame, text, language))
+        if not items:
+            return
+
+        user_id = db.session.get(ScreenSession, frames[0].session_id).user_id
+        translations = translator.translate_many([(text, language) for _, text, language in items], user_id)
+        for frame, text, _ in items:
+            frame.translated_text = keys.seal_text(frame.session_id, translations.get(text))
+
+    def _score(self, frames):
+        """
+        Return {frame.id: {'sentiment', 'score'}} using one batched call plus
+        per-frame fallbacks; frames missing from the result could not be
+        scored within SENTIMENT_LATENCY_BUDGET_SECONDS
+        """
+        deadline = time.monotonic() + Config.SENTIMENT_LATENCY_BUDGET_SECONDS
+        results = {}
+        try:
+            results = self._score_batch(frames)
+        except Exception as e:
+            print(f"Batched sentiment failed, falling back to per-frame calls: {e}")
+
+        for frame in frames:
+            if frame.id in results:
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                result = self.analyzer._analyze_sentiment(*self._inputs(frame), timeout=remaining)
+            except Exception as e:
+                print(f"Sentiment of frame {frame.id} failed: {e}")
+                continue
+            results[frame.id] = {
+                'sentiment': result.get('sentiment', 'neutral'),
+                'score': result.get('score', 0.0)
+            }
+        return results
+
+    def _score_batch(self, frames):
+        items = []
+        for i, frame in enumerate(frames):
+            description, text, audio = self._inputs(frame)
+            item = {'i': i, 'visual': (description or '')[:MAX_FIELD_CHARS], 'text': (text or '')[:MAX_FIELD_CHARS]}
+            if audio:
+                item['audio'] = audio[:MAX_FIELD_CHARS]
+            items.append(item)
+
+        response = self.analyzer._create_completion(
+            'sentiment_batch',
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"""Analyze the sentiment and emotional impact of each screen content item below.
+
+Items:
+{json.dumps(items, ensure_ascii=False)}
+
+For every item classify the sentiment as: positive, negative, neutral, or mixed
+and give a sentiment score from -1.0 (very negative) to 1.0 (very positive).
+
+Return ONLY a JSON array with one object per item, in any order:
+[{{"i": <item index>, "sentiment": "...", "score": <float>}}]"""
+                }
+            ],
+            max_tokens=40 + 30 * len(frames),
+            timeout=Config.SENTIMENT_LATENCY_BUDGET_SECONDS
+        )
+
+        content = response.choices[0].message.content
+        if '```' in content:
+            content = content.split('```')[1].removeprefix('json')
+        parsed = json.loads(content.strip())
+
+        results = {}
+        for entry in parsed:
+            try:
+                index = int(entry['i'])
+                sentiment = str(entry['sentiment']).lower()
+                score = max(-1.0, min(1.0, float(entry['score'])))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < len(frames) and sentiment in SENTIMENTS:
+                results[frames[index].id] = {'sentiment': sentiment, 'score': score}
+        return results
+
+    def _inputs(self, frame):
+        open_text = partial(self.analyzer.keys.open_text, frame.session_id)
+        return (
+            open_text(frame.content_description) or '',
+            open_text(frame.translated_text) or open_text(frame.extracted_text) or '',
+            open_text(frame.audio_transcript)
+        )
+
+    def _write_back(self, frames, results):
+        """Store the scores of the frames in ``results``; returns how many were written"""
+        frames = [frame for frame in frames if frame.id in results]
+        updates = []
+        for frame in frames:
+            result = results[frame.id]
+            wellness_impact = self.analyzer._determine_wellness_impact(
+                frame.content_type,
+                result['sentiment'],
+                frame.app_detected,
+                frame.engagement_indicators,
+                frame.potential_concerns
+            )
+            updates.append({
+                'id': frame.id,
+                'sentiment': result['sentiment'],
+                'sentiment_score': result['score'],
+                'wellness_impact': wellness_impact,
+                'sentiment_status': 'scored'
+            })
+
+        db.session.bulk_update_mappings(FrameAnalysis, updates)
+
+        # Frames inferred from a freshly scored anchor inherit its final labels; their scores are
+        # interpolated again between the anchors around them
+        for frame, update in zip(frames, updates):
+            FrameAnalysis.query.filter(
+                FrameAnalysis.session_id == frame.session_id,
+                FrameAnalysis.analysis_mode == 'inferred',
+                FrameAnalysis.inferred_from_frame == frame.frame_number
+            ).update({
+                FrameAnalysis.translated_text: frame.translated_text,
+                FrameAnalysis.sentiment: update['sentiment'],
+                FrameAnalysis.wellness_impact: update['wellness_impact']
+            }, synchronize_session=False)
+        if frames:
+            self.analyzer._interpolate_inferred_scores(frames[0].session_id,
+                                                       [frame.frame_number for frame in frames])
+
+        db.session.commit()
+        return len(frames)
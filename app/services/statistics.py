@@ -0,0 +1,382 @@
+"""
+Statistics Engine - vectorized cross-session statistics over a user's sessions and frames
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+import sqlalchemy as sa
+from app import db
+from app.models import ScreenSession, FrameAnalysis, User
+from config import Config
+
+SECONDS_PER_DAY = 86400
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+IMPACTS = ('positive', 'neutral', 'negative')
+PERCENTILES = (10, 25, 50, 75, 90)
+ROLLING_WINDOWS = (7, 30)
+GOOD_DAY_WELLNESS = 6.0  # Daily mean wellness at or above this counts towards the good-day streak
+SECTIONS = ('rolling', 'percentiles', 'streaks', 'distributions', 'week_over_week')
+
+# user_id -> (data_version, UserSeries), least recently used first
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+class UserSeries:
+    """
+    Column arrays of a user's completed sessions and their frames, each
+    sorted by time. Timestamps are UTC epoch seconds (int64); frame impacts
+    are indexes into IMPACTS, -1 when unknown. Derived arrays (sorted
+    values, weekday/hour slots) are computed on first use and kept with the
+    snapshot.
+    """
+
+    def __init__(self, session_ts, wellness, productivity, duration, frame_ts, sentiment_score, impact):
+        self.session_ts = session_ts
+        self.wellness = wellness
+        self.productivity = productivity
+        self.duration = duration
+        self.frame_ts = frame_ts
+        self.sentiment_score = sentiment_score
+        self.impact = impact
+        self._derived = {}
+
+    def sorted_values(self, name):
+        """Non-missing values of a column in ascending order"""
+        key = ('sorted', name)
+        if key not in self._derived:
+            values = getattr(self, name)
+            self._derived[key] = np.sort(values[~np.isnan(values)])
+        return self._derived[key]
+
+    def slots(self, kind):
+        """weekday * 24 + hour (Monday 00:00 is 0) of every session or frame"""
+        key = ('slots', kind)
+        if key not in self._derived:
+            ts = self.session_ts if kind == 'session' else self.frame_ts
+            # 1970-01-01 was a Thursday, so Monday is day 0 after shifting by 3
+            self._derived[key] = (ts // SECONDS_PER_DAY + 3) % 7 * 24 + ts % SECONDS_PER_DAY // 3600
+        return self._derived[key]
+
+    @classmethod
+    def load(cls, user_id):
+        """
+        Read the user's columns with two queries. The database converts
+        timestamps to epoch seconds and impacts to their codes, and rows go
+        from the DBAPI cursor into one float64 array per query, so no ORM
+        rows or datetime objects are built even for a million frames.
+        """
+        dialect = db.session.get_bind().dialect.name
+        completed = sa.select(ScreenSession.id).where(
+            ScreenSession.user_id == user_id,
+            ScreenSession.status == 'completed'
+        )
+        sessions = _fetch_array(sa.select(
+            _epoch(ScreenSession.created_at, dialect), ScreenSession.wellness_score,
+            ScreenSession.productivity_score, ScreenSession.duration_seconds
+        ).where(
+            ScreenSession.user_id == user_id,
+            ScreenSession.status == 'completed',
+            ScreenSession.created_at.isnot(None)
+        ).order_by(ScreenSession.created_at), 4)
+        frames = _fetch_array(sa.select(
+            _epoch(FrameAnalysis.created_at, dialect), FrameAnalysis.sentiment_score,
+            sa.case({impact: code for code, impact in enumerate(IMPACTS)},
+                    value=FrameAnalysis.wellness_impact, else_=-1)
+        ).where(
+            FrameAnalysis.user_id == user_id,
+            FrameAnalysis.session_id.in_(completed),
+            FrameAnalysis.created_at.isnot(None)
+        ), 3)
+
+        frame_ts = frames[:, 0].astype(np.int64)
+        order = np.argsort(frame_ts, kind='stable')
+        return cls(
+            session_ts=sessions[:, 0].astype(np.int64),
+            wellness=sessions[:, 1].copy(),
+            productivity=sessions[:, 2].copy(),
+            duration=sessions[:, 3].copy(),
+            frame_ts=frame_ts[order],
+            sentiment_score=frames[order, 1],
+            impact=frames[order, 2].astype(np.int8)
+        )
+
+
+class StatisticsService:
+    """
+    Rolling averages, percentiles, streaks, weekday/hour distributions and
+    week-over-week deltas, each computed with a handful of array operations
+    (bincount, cumsum, searchsorted) instead of Python loops over rows.
+
+    A user's columns are loaded once into a UserSeries and kept in a small
+    per-process LRU (``STATISTICS_CACHE_USERS``) for as long as the user's
+    ``data_version`` is unchanged, so repeated dashboard requests only pay
+    for the arithmetic. Days, weekdays and hours are UTC.
+    """
+
+    def series(self, user_id):
+        version = db.session.query(User.data_version).filter(User.id == user_id).scalar() or 0
+        with _snapshots_lock:
+            cached = _snapshots.get(user_id)
+            if cached and cached[0] == version:
+                _snapshots.move_to_end(user_id)
+                return cached[1]
+
+        series = UserSeries.load(user_id)
+        with _snapshots_lock:
+            _snapshots[user_id] = (version, series)
+            _snapshots.move_to_end(user_id)
+            while len(_snapshots) > Config.STATISTICS_CACHE_USERS:
+                _snapshots.popitem(last=False)
+        return series
+
+    def get_statistics(self, user_id, sections=SECTIONS, days=90, now=None):
+        result = compute_sections(self.series(user_id), sections, days, now)
+        result['generated_at'] = datetime.utcnow().isoformat()
+        return result
+
+
+def compute_sections(series, sections=SECTIONS, days=90, now=None):
+    now = _now_seconds(now)
+    compute = {
+        'rolling': lambda: rolling_averages(series, days, now),
+        'percentiles': lambda: percentiles(series),
+        'streaks': lambda: streaks(series, now),
+        'distributions': lambda: distributions(series),
+        'week_over_week': lambda: week_over_week(series, now),
+    }
+    return {section: compute[section]() for section in sections}
+
+
+def rolling_averages(series, days=90, now=None):
+    """Daily means and trailing 7/30-day session-weighted means for the last ``days`` days"""
+    now = _now_seconds(now)
+    today = now // SECONDS_PER_DAY
+    first_day = today - days + 1
+    # Windows reaching back before the first reported day need their history too
+    history_day = first_day - max(ROLLING_WINDOWS) + 1
+
+    day = series.session_ts // SECONDS_PER_DAY
+    in_range = (day >= history_day) & (day <= today)
+    index = day[in_range] - history_day
+    length = int(today - history_day + 1)
+
+    counts = np.bincount(index, minlength=length).astype(np.float64)
+    cumulative_counts = np.concatenate(([0.0], np.cumsum(counts)))
+    result = {'dates': _day_labels(first_day, days), 'sessions': counts[-days:].astype(int).tolist()}
+
+    for name, values in (('wellness', series.wellness), ('productivity', series.productivity)):
+        valid = ~np.isnan(values[in_range])
+        sums = np.bincount(index[valid], weights=values[in_range][valid], minlength=length)
+        valid_counts = np.bincount(index[valid], minlength=length).astype(np.float64)
+        result[name] = _rounded(_safe_divide(sums, valid_counts)[-days:])
+
+        cumulative_sums = np.concatenate(([0.0], np.cumsum(sums)))
+        cumulative_valid = np.concatenate(([0.0], np.cumsum(valid_counts)))
+        for window in ROLLING_WINDOWS:
+            window_sums = cumulative_sums[window:] - cumulative_sums[:-window]
+            window_counts = cumulative_valid[window:] - cumulative_valid[:-window]
+            result[f'{name}_{window}d'] = _rounded(_safe_divide(window_sums, window_counts)[-days:])
+
+    for window in ROLLING_WINDOWS:
+        result[f'sessions_{window}d'] = (cumulative_counts[window:] - cumulative_counts[:-window])[-days:].astype(int).tolist()
+    return result
+
+
+def percentiles(series):
+    """p10/p25/p50/p75/p90 of session scores and length and of frame sentiment scores"""
+    columns = (('wellness_score', 'wellness', 1), ('productivity_score', 'productivity', 1),
+               ('duration_minutes', 'duration', 1 / 60), ('sentiment_score', 'sentiment_score', 1))
+    result = {}
+    for name, column, scale in columns:
+        values = series.sorted_values(column)
+        if not values.size:
+            result[name] = None
+            continue
+        # Linear interpolation between closest ranks, as np.percentile does, without re-sorting
+        ranks = np.array(PERCENTILES) / 100 * (values.size - 1)
+        lower = np.floor(ranks).astype(np.int64)
+        upper = np.minimum(lower + 1, values.size - 1)
+        points = (values[lower] + (values[upper] - values[lower]) * (ranks - lower)) * scale
+        result[name] = {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, points)}
+        result[name]['count'] = int(values.size)
+    return result
+
+
+def streaks(series, now=None):
+    """
+    Current and longest runs of consecutive active days, and of good days
+    (mean wellness at or above GOOD_DAY_WELLNESS). A run still counts as
+    current when its last day is yesterday, so a day without a session yet
+    does not reset it.
+    """
+    now = _now_seconds(now)
+    if not series.session_ts.size:
+        return {'active_days': {'current': 0, 'longest': 0}, 'good_days': {'current': 0, 'longest': 0}}
+
+    today = now // SECONDS_PER_DAY
+    day = series.session_ts // SECONDS_PER_DAY
+    first_day = day.min()
+    keep = day <= today
+    index = day[keep] - first_day
+    length = int(today - first_day + 1)
+
+    counts = np.bincount(index, minlength=length)
+    valid = ~np.isnan(series.wellness[keep])
+    wellness_sums = np.bincount(index[valid], weights=series.wellness[keep][valid], minlength=length)
+    wellness_counts = np.bincount(index[valid], minlength=length)
+    good = _safe_divide(wellness_sums, wellness_counts.astype(np.float64)) >= GOOD_DAY_WELLNESS
+
+    return {'active_days': _runs(counts > 0), 'good_days': _runs(good)}
+
+
+def distributions(series):
+    """Frames and sessions per weekday and per hour, with mean scores and impact shares"""
+    slots = 7 * 24
+    frame_slots = series.slots('frame')
+    session_slots = series.slots('session')
+
+    # Everything is counted once per weekday-hour slot, then summed down to weekdays and to hours
+    impacts = len(IMPACTS) + 1  # column 0 holds frames with an unknown impact
+    impact_grid = np.bincount(frame_slots * impacts + series.impact + 1,
+                              minlength=slots * impacts).reshape(7, 24, impacts).astype(np.float64)
+    scored = ~np.isnan(series.sentiment_score)
+    sentiment_grid = np.stack([
+        np.bincount(frame_slots, weights=np.where(scored, series.sentiment_score, 0), minlength=slots),
+        np.bincount(frame_slots, weights=scored, minlength=slots),
+    ], axis=-1).reshape(7, 24, 2)
+    valid = ~np.isnan(series.wellness)
+    session_grid = np.stack([
+        np.bincount(session_slots, minlength=slots),
+        np.bincount(session_slots, weights=np.where(valid, series.wellness, 0), minlength=slots),
+        np.bincount(session_slots, weights=valid, minlength=slots),
+    ], axis=-1).reshape(7, 24, 3)
+
+    result = {}
+    for name, axis, labels in (('weekday', 1, WEEKDAYS), ('hour', 0, list(range(24)))):
+        impact_table = impact_grid.sum(axis=axis)
+        frames = impact_table.sum(axis=1)
+        known = impact_table[:, 1:]
+        impact_shares = _safe_divide(known * 100, known.sum(axis=1, keepdims=True))
+        sentiment_sums, scored_counts = sentiment_grid.sum(axis=axis).T
+        sessions, wellness_sums, wellness_counts = session_grid.sum(axis=axis).T
+
+        result[name] = {
+            'labels': labels,
+            'frames': frames.astype(int).tolist(),
+            'sessions': sessions.astype(int).tolist(),
+            'avg_sentiment_score': _rounded(_safe_divide(sentiment_sums, scored_counts)),
+            'avg_wellness': _rounded(_safe_divide(wellness_sums, wellness_counts)),
+            **{f'{impact}_impact_pct': _rounded(impact_shares[:, i]) for i, impact in enumerate(IMPACTS)},
+        }
+    return result
+
+
+def week_over_week(series, now=None):
+    """The last 7 days against the 7 before them"""
+    now = _now_seconds(now)
+    week = 7 * SECONDS_PER_DAY
+    bounds = np.array([now - 2 * week, now - week, now])
+    session_edges = np.searchsorted(series.session_ts, bounds, side='right')
+    frame_edges = np.searchsorted(series.frame_ts, bounds, side='right')
+
+    def summarize(i):
+        sessions = slice(session_edges[i], session_edges[i + 1])
+        frames = slice(frame_edges[i], frame_edges[i + 1])
+        impacts = series.impact[frames]
+        known = np.count_nonzero(impacts >= 0)
+        return {
+            'sessions': int(sessions.stop - sessions.start),
+            'screen_time_seconds': float(np.nansum(series.duration[sessions])),
+            'avg_wellness': _mean(series.wellness[sessions]),
+            'avg_productivity': _mean(series.productivity[sessions]),
+            'frames': int(frames.stop - frames.start),
+            'avg_sentiment_score': _mean(series.sentiment_score[frames]),
+            'negative_impact_pct': round(np.count_nonzero(impacts == IMPACTS.index('negative')) * 100 / known, 2)
+            if known else None,
+        }
+
+    previous, current = summarize(0), summarize(1)
+    deltas = {}
+    for key, value in current.items():
+        before = previous[key]
+        if value is None or before is None:
+            deltas[key] = {'change': None, 'pct_change': None}
+            continue
+        deltas[key] = {
+            'change': round(value - before, 2),
+            'pct_change': round((value - before) / abs(before) * 100, 1) if before else None
+        }
+    return {'current_week': current, 'previous_week': previous, 'deltas': deltas}
+
+
+def _runs(flags):
+    """{'current', 'longest'} run of True in a per-day array ending today"""
+    if not flags.any():
+        return {'current': 0, 'longest': 0}
+    padded = np.concatenate(([False], flags, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)  # exclusive
+    lengths = ends - starts
+    # The last run is current if it reaches today or yesterday
+    current = int(lengths[-1]) if ends[-1] >= len(flags) - 1 else 0
+    return {'current': current, 'longest': int(lengths.max())}
+
+
+def _epoch(column, dialect):
+    """SQL expression for a naive UTC DateTime column as epoch seconds"""
+    if dialect == 'postgresql':
+        return sa.cast(sa.extract('epoch', column), sa.BigInteger)
+    if dialect == 'sqlite':
+        return sa.cast(sa.func.strftime('%s', column), sa.Integer)
+    return sa.func.unix_timestamp(column)
+
+
+def _fetch_array(statement, width, chunk_rows=65536):
+    """
+    Rows of ``statement`` as a float64 array of ``width`` columns, NULL as
+    NaN, fetched in chunks from the DBAPI cursor of the session's connection
+    """
+    connection = db.session.connection()
+    # Only integers and fixed strings are bound here, so they can be inlined
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(sql)
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.float64).reshape(-1, width))
+    finally:
+        cursor.close()
+    return np.concatenate(chunks) if chunks else np.empty((0, width))
+
+
+def _now_seconds(now):
+    if isinstance(now, (int, np.integer)):
+        return int(now)
+    return int(np.datetime64(now or datetime.utcnow(), 's').astype(np.int64))
+
+
+def _safe_divide(numerator, denominator):
+    """Elementwise quotient, NaN where the denominator is zero"""
+    return np.divide(numerator, denominator, out=np.full(np.broadcast(numerator, denominator).shape, np.nan),
+                     where=denominator > 0)
+
+
+def _rounded(values):
+    """JSON-ready list: NaN becomes None"""
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+def _mean(values):
+    values = values[~np.isnan(values)]
+    return round(float(values.mean()), 2) if values.size else None
+
+
+def _day_labels(first_day, days):
+    return np.datetime_as_string(np.arange(first_day, first_day + days).astype('datetime64[D]')).tolist()
@@ -0,0 +1,150 @@
+"""
+Translation - batched English translation of on-screen text with a persistent cache
+"""
+import hashlib
+import json
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import TranslationCache
+from app.utils.language_id import detect_language, letter_count
+from config import Config
+
+MAX_ITEM_CHARS = 1500
+
+
+def text_hash(text):
+    return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+
+class TranslationService:
+    """
+    Decides locally whether text needs translating and translates the rest
+    in as few model calls as possible.
+
+    Text that is English or shorter than TRANSLATION_MIN_LETTERS letters is
+    never sent to the model. Everything else is looked up in the user's
+    ``translation_cache`` entries first; misses are translated together, up
+    to TRANSLATION_BATCH_SIZE texts per completion, and written back to the
+    cache so repeated UI strings are only translated once per user. The
+    entries are screen text, so they are deleted with the user's sessions
+    (``delete_user``).
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.batch_size = Config.TRANSLATION_BATCH_SIZE
+        self.min_letters = Config.TRANSLATION_MIN_LETTERS
+
+    def detect(self, text, hint=None):
+        """Return ``(language, needs_translation)`` for ``text``; ``hint`` is the vision model's guess"""
+        if not text:
+            return 'en', False
+        language = detect_language(text, hint)[0]
+        return language, language != 'en' and letter_count(text) >= self.min_letters
+
+    def cached(self, text, user_id):
+        """The user's cached translation of ``text``, or None"""
+        return self.lookup([text], user_id).get(text)
+
+    def lookup(self, texts, user_id):
+        """{text: translation} for every text already in the user's cache"""
+        by_hash = {text_hash(text): text for text in texts}
+        if not by_hash:
+            return {}
+
+        rows = TranslationCache.query.with_entities(
+            TranslationCache.text_hash, TranslationCache.translated_text
+        ).filter(
+            TranslationCache.user_id == user_id,
+            TranslationCache.text_hash.in_(list(by_hash))
+        ).all()
+        return {by_hash[row.text_hash]: row.translated_text for row in rows}
+
+    @staticmethod
+    def delete_user(user_id):
+        """Drop a user's cached translations (caller commits)"""
+        TranslationCache.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+    def translate_many(self, items, user_id):
+        """
+        Translate ``[(text, source_language), ...]`` of one user to English.
+
+        Returns {text: translation}; texts that cannot be translated map to
+        themselves, matching the per-frame translation fallback.
+        """
+        languages = {text: language for text, language in items if text}
+        results = self.lookup(languages, user_id)
+        misses = [text for text in languages if text not in results]
+
+        translated = {}
+        for start in range(0, len(misses), self.batch_size):
+            chunk = misses[start:start + self.batch_size]
+            try:
+                translated.update(self._translate_batch(chunk, languages))
+            except Exception as e:
+                print(f"Batched translation failed, falling back to per-text calls: {e}")
+            for text in chunk:
+                if text not in translated:
+                    translated[text] = self.analyzer._translate_text(text, languages[text])
+
+        self._store({text: value for text, value in translated.items() if value and value != text}, languages,
+                    user_id)
+        results.update(translated)
+        return results
+
+    def _translate_batch(self, texts, languages):
+        items = [{'i': i, 'lang': languages[text], 'text': text[:MAX_ITEM_CHARS]} for i, text in enumerate(texts)]
+        response = self.analyzer._create_completion(
+            'translate_batch',
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"""Translate each text item below to English. "lang" is the detected source language.
+
+Items:
+{json.dumps(items, ensure_ascii=False)}
+
+Return ONLY a JSON array with one object per item, in any order:
+[{{"i": <item index>, "text": "<English translation>"}}]"""
+                }
+            ],
+            max_tokens=min(4000, 50 + sum(len(item['text']) for item in items) // 2)
+        )
+
+        content = response.choices[0].message.content
+        if '```' in content:
+            content = content.split('```')[1].removeprefix('json')
+        parsed = json.loads(content.strip())
+
+        results = {}
+        for entry in parsed:
+            try:
+                index = int(entry['i'])
+                translation = str(entry['text']).strip()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < len(texts) and translation:
+                results[texts[index]] = translation
+        return results
+
+    def _store(self, translations, languages, user_id):
+        if not translations:
+            return
+        now = datetime.utcnow()
+        rows = {}
+        for text, translation in translations.items():
+            rows[text_hash(text)] = TranslationCache(
+                user_id=user_id,
+                text_hash=text_hash(text),
+                source_language=languages.get(text),
+                translated_text=translation,
+                created_at=now
+            )
+        db.session.add_all(rows.values())
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker cached the same text first; the cache is best-effort
+            db.session.rollback()
@@ -3,9 +3,14 @@ let screenStream;
 let audioStream;
 let sessionId;
 let frameCount = 0;
-let recordingInterval;
+let analyzedCount = 0;
+let captureTimer;
+let isCapturing = false;
 let startTime;
 
+// Capture directive; the server adjusts it with every upload response
+let captureDirective = { interval_ms: 2000, max_width: 1920, quality: 0.8 };
+
 function getCSRFToken() {
     return document.querySelector('meta[name="csrf-token"]')?.getAttribute('content') || '';
 }
@@ -43,59 +48,97 @@ async function startAnalysis() {
 
         startTime = Date.now();
         frameCount = 0;
+        analyzedCount = 0;
+        isCapturing = true;
 
-        recordingInterval = setInterval(captureFrame, 2000);
+        scheduleNextCapture(captureDirective.interval_ms);
         updateRecordingTime();
     } catch (err) {
         alert('Permission denied. Please allow screen and audio access.');
     }
 }
 
+function scheduleNextCapture(delay) {
+    if (!isCapturing) return;
+    captureTimer = setTimeout(captureFrame, delay);
+}
+
+function captureBlob(canvas, quality) {
+    return new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', quality));
+}
+
 async function captureFrame() {
+    let nextDelay = captureDirective.interval_ms;
+    try {
+        nextDelay = await uploadFrame();
+    } catch (err) {
+        console.error('Frame upload failed:', err);
+    } finally {
+        scheduleNextCapture(nextDelay);
+    }
+}
+
+// Captures one frame, uploads it and returns the delay before the next capture
+async function uploadFrame() {
     const video = document.createElement('video');
     video.srcObject = screenStream;
     await video.play();
 
+    // Downscale to the width the server asked for
+    const scale = Math.min(1, captureDirective.max_width / video.videoWidth);
     const canvas = document.createElement('canvas');
-    canvas.width = video.videoWidth;
-    canvas.height = video.videoHeight;
+    canvas.width = Math.round(video.videoWidth * scale);
+    canvas.height = Math.round(video.videoHeight * scale);
     const ctx = canvas.getContext('2d');
-    ctx.drawImage(video, 0, 0);
+    ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-    canvas.toBlob(async (blob) => {
-        frameCount++;
-        const timestamp = (Date.now() - startTime) / 1000;
+    const blob = await captureBlob(canvas, captureDirective.quality);
 
-        const formData = new FormData();
-        formData.append('session_id', sessionId);
-        formData.append('frame_number', frameCount);
-        formData.append('timestamp', timestamp);
-        formData.append('frame', blob, 'frame.jpg');
+    frameCount++;
+    const timestamp = (Date.now() - startTime) / 1000;
 
-        const res = await fetch('/analyzer/api/upload-frame', {
-            method: 'POST',
-            headers: {
-                'X-CSRFToken': getCSRFToken()
-            },
-            body: formData
-        });
+    const formData = new FormData();
+    formData.append('session_id', sessionId);
+    formData.append('frame_number', frameCount);
+    formData.append('timestamp', timestamp);
+    formData.append('frame', blob, 'frame.jpg');
 
-        const data = await res.json();
-        if (data.success) {
-            document.getElementById('framesAnalyzed').textContent = frameCount;
-
-            const resultHtml = `
-                <div class="alert alert-info">
-                    <strong>Frame ${frameCount}:</strong>
-                    App: <span class="badge bg-primary">${data.analysis.app}</span>
-                    Content: <span class="badge bg-success">${data.analysis.content_type}</span>
-                    Sentiment: <span class="badge bg-warning">${data.analysis.sentiment}</span>
-                </div>
-            `;
-
-            document.getElementById('liveResults').innerHTML = resultHtml + document.getElementById('liveResults').innerHTML;
-        }
-    }, 'image/jpeg', 0.8);
+    const res = await fetch('/analyzer/api/upload-frame', {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCSRFToken()
+        },
+        body: formData
+    });
+
+    const data = await res.json().catch(() => ({}));
+    if (data.capture) {
+        captureDirective = data.capture;
+    }
+
+    // 429/503: the server is shedding load; back off for at least Retry-After
+    if (res.status === 429 || res.status === 503) {
+        const retryAfter = parseInt(res.headers.get('Retry-After') || '0', 10) * 1000;
+        return Math.max(retryAfter, captureDirective.interval_ms);
+    }
+
+    if (data.success && data.analyzed) {
+        analyzedCount++;
+        document.getElementById('framesAnalyzed').textContent = analyzedCount;
+
+        const resultHtml = `
+            <div class="alert alert-info">
+                <strong>Frame ${frameCount}:</strong>
+                App: <span class="badge bg-primary">${data.analysis.app}</span>
+                Content: <span class="badge bg-success">${data.analysis.content_type}</span>
+                Sentiment: <span class="badge bg-warning">${data.analysis.sentiment}</span>
+            </div>
+        `;
+
+        document.getElementById('liveResults').innerHTML = resultHtml + document.getElementById('liveResults').innerHTML;
+    }
+
+    return captureDirective.interval_ms;
 }
 
 function updateRecordingTime() {
@@ -109,7 +152,8 @@ function updateRecordingTime() {
 }
 
 async function stopAnalysis() {
-    clearInterval(recordingInterval);
+    isCapturing = false;
+    clearTimeout(captureTimer);
 
     if (screenStream) {
         screenStream.getTracks().forEach(track => track.stop());
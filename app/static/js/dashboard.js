@@ -1,12 +1,24 @@
 let charts = {};
 let appDetailsModal;
+let overview = null;
+let trendItems = [];
+let trendsCursor = null;
+let trendsStart = null;
+const TREND_POINTS = 200;
 
 document.addEventListener('DOMContentLoaded', () => {
     appDetailsModal = new bootstrap.Modal(document.getElementById('appDetailsModal'));
+    document.querySelectorAll('[data-range]').forEach(button => {
+        button.addEventListener('click', () => setTrendsRange(button));
+    });
+    document.getElementById('loadOlderTrends')?.addEventListener('click', loadOlderTrends);
     initializeDashboard();
 });
 
 async function initializeDashboard() {
+    // One bundled snapshot for every panel; panels fall back to their own endpoint if it is unavailable
+    overview = await fetchData('/dashboard/api/overview');
+
     await Promise.all([
         loadStats(),
         loadTrends(),
@@ -23,7 +35,7 @@ async function initializeDashboard() {
 
 async function loadStats() {
     try {
-        const data = await fetchData('/dashboard/api/stats');
+        const data = await panelData('stats', '/dashboard/api/stats');
         if (!data) return;
 
         document.getElementById('totalSessions').textContent = data.total_sessions || 0;
@@ -47,7 +59,7 @@ async function loadStats() {
         document.getElementById('totalTime').textContent = hours > 0 ? `${hours}h ${minutes}m` : `${minutes}m`;
 
         // Calculate risk and productive percentages from content analysis
-        const contentData = await fetchData('/dashboard/api/content-analysis');
+        const contentData = await panelData('content_analysis', '/dashboard/api/content-analysis');
         if (contentData && contentData.content_types) {
             const total = Object.values(contentData.content_types).reduce((a, b) => a + b, 0);
             const productive = (contentData.content_types.work || 0) + (contentData.content_types.educational || 0);
@@ -61,73 +73,128 @@ async function loadStats() {
     }
 }
 
+function trendsUrl(cursor) {
+    const params = new URLSearchParams();
+    // A date range comes back downsampled in one response; all-time history is paged instead
+    if (trendsStart) {
+        params.set('start', trendsStart);
+        params.set('points', TREND_POINTS);
+    }
+    if (cursor) params.set('cursor', cursor);
+    return `/dashboard/api/wellness-trends?${params}`;
+}
+
 async function loadTrends() {
     try {
-        const data = await fetchData('/dashboard/api/wellness-trends');
-        if (!data || data.length === 0) {
-            document.querySelector('#trendsChart').parentElement.innerHTML =
-                '<p class="text-center text-muted py-5">No trend data available. Start analyzing to see your trends!</p>';
-            return;
-        }
+        // The overview holds the newest page of all-time trends; other ranges are fetched
+        const data = trendsStart
+            ? await fetchData(trendsUrl())
+            : await panelData('wellness_trends', '/dashboard/api/wellness-trends');
+        trendItems = data ? data.items : [];
+        trendsCursor = data ? data.next_cursor : null;
+        renderTrends();
+    } catch (error) {
+        console.error('Error loading trends:', error);
+    }
+}
 
-        renderChart('trendsChart', {
-            type: 'line',
-            data: {
-                labels: data.map(d => formatDate(d.date)),
-                datasets: [
-                    {
-                        label: 'Wellness',
-                        data: data.map(d => d.wellness_score),
-                        borderColor: '#10b981',
-                        backgroundColor: 'rgba(16, 185, 129, 0.1)',
-                        fill: true,
-                        tension: 0.4,
-                        borderWidth: 3,
-                        pointRadius: 4,
-                        pointHoverRadius: 6
-                    },
-                    {
-                        label: 'Productivity',
-                        data: data.map(d => d.productivity_score),
-                        borderColor: '#6366f1',
-                        backgroundColor: 'rgba(99, 102, 241, 0.1)',
-                        fill: true,
-                        tension: 0.4,
-                        borderWidth: 3,
-                        pointRadius: 4,
-                        pointHoverRadius: 6
-                    }
-                ]
-            },
-            options: {
-                responsive: true,
-                maintainAspectRatio: false,
-                plugins: {
-                    legend: {
-                        position: 'top',
-                        labels: { usePointStyle: true, padding: 15, font: { size: 12, weight: '600' } }
-                    },
-                    tooltip: {
-                        mode: 'index',
-                        intersect: false,
-                        backgroundColor: 'rgba(0, 0, 0, 0.8)',
-                        padding: 12
-                    }
+async function loadOlderTrends() {
+    if (!trendsCursor) return;
+    const data = await fetchData(trendsUrl(trendsCursor));
+    if (!data) return;
+    // Older sessions go in front so the chart stays in date order
+    trendItems = data.items.concat(trendItems);
+    trendsCursor = data.next_cursor;
+    renderTrends();
+}
+
+function setTrendsRange(button) {
+    document.querySelectorAll('[data-range]').forEach(b => b.classList.toggle('active', b === button));
+    const days = button.dataset.range;
+    if (days === 'all') {
+        trendsStart = null;
+    } else {
+        const start = new Date();
+        start.setDate(start.getDate() - Number(days) + 1);
+        trendsStart = start.toISOString().slice(0, 10);
+    }
+    loadTrends();
+}
+
+function renderTrends() {
+    const data = trendItems;
+    const canvas = document.getElementById('trendsChart');
+    const empty = document.getElementById('trendsEmpty');
+    const older = document.getElementById('loadOlderTrends');
+    if (older) older.classList.toggle('d-none', !trendsCursor);
+
+    if (data.length === 0) {
+        if (charts.trendsChart) {
+            charts.trendsChart.destroy();
+            delete charts.trendsChart;
+        }
+        canvas.classList.add('d-none');
+        empty.classList.remove('d-none');
+        return;
+    }
+    canvas.classList.remove('d-none');
+    empty.classList.add('d-none');
+
+    renderChart('trendsChart', {
+        type: 'line',
+        data: {
+            labels: data.map(d => formatDate(d.date)),
+            datasets: [
+                {
+                    label: 'Wellness',
+                    data: data.map(d => d.wellness_score),
+                    borderColor: '#10b981',
+                    backgroundColor: 'rgba(16, 185, 129, 0.1)',
+                    fill: true,
+                    tension: 0.4,
+                    borderWidth: 3,
+                    pointRadius: 4,
+                    pointHoverRadius: 6
                 },
-                scales: {
-                    y: { beginAtZero: true, max: 10, grid: { color: 'rgba(0, 0, 0, 0.05)' } },
-                    x: { grid: { display: false } }
+                {
+                    label: 'Productivity',
+                    data: data.map(d => d.productivity_score),
+                    borderColor: '#6366f1',
+                    backgroundColor: 'rgba(99, 102, 241, 0.1)',
+                    fill: true,
+                    tension: 0.4,
+                    borderWidth: 3,
+                    pointRadius: 4,
+                    pointHoverRadius: 6
+                }
+            ]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'top',
+                    labels: { usePointStyle: true, padding: 15, font: { size: 12, weight: '600' } }
+                },
+                tooltip: {
+                    mode: 'index',
+                    intersect: false,
+                    backgroundColor: 'rgba(0, 0, 0, 0.8)',
+                    padding: 12
                 }
+            },
+            scales: {
+                y: { beginAtZero: true, max: 10, grid: { color: 'rgba(0, 0, 0, 0.05)' } },
+                x: { grid: { display: false } }
             }
-        });
-    } catch (error) {
-        console.error('Error loading trends:', error);
-    }
+        }
+    });
 }
 
 async function loadSentiment() {
     try {
-        const data = await fetchData('/dashboard/api/content-analysis');
+        const data = await panelData('content_analysis', '/dashboard/api/content-analysis');
         if (!data || !data.sentiment_distribution) {
             document.querySelector('#sentimentChart').parentElement.innerHTML =
                 '<p class="text-center text-muted py-4">No sentiment data</p>';
@@ -179,7 +246,7 @@ async function loadSentiment() {
 
 async function loadContent() {
     try {
-        const data = await fetchData('/dashboard/api/content-analysis');
+        const data = await panelData('content_analysis', '/dashboard/api/content-analysis');
         if (!data || !data.content_types || Object.keys(data.content_types).length === 0) {
             document.querySelector('#contentChart').parentElement.innerHTML =
                 '<p class="text-center text-muted py-4">No content data</p>';
@@ -224,7 +291,7 @@ async function loadContent() {
 
 async function loadAppUsage() {
     try {
-        const data = await fetchData('/dashboard/api/app-usage');
+        const data = await panelData('app_usage', '/dashboard/api/app-usage');
         if (!data || !data.apps || data.apps.length === 0) {
             document.getElementById('appUsageContainer').innerHTML =
                 '<p class="text-center text-muted small py-4">No app usage data</p>';
@@ -288,7 +355,7 @@ async function loadAppUsage() {
 
 async function loadQuickInsights() {
     try {
-        const data = await fetchData('/dashboard/api/quick-insights');
+        const data = await panelData('quick_insights', '/dashboard/api/quick-insights');
         const container = document.getElementById('quickInsights');
 
         if (!data || data.length === 0) {
@@ -326,7 +393,7 @@ async function loadQuickInsights() {
 
 async function loadWellnessAlerts() {
     try {
-        const data = await fetchData('/dashboard/api/wellness-alerts');
+        const data = await panelData('wellness_alerts', '/dashboard/api/wellness-alerts');
         const container = document.getElementById('wellnessAlerts');
 
         if (!data || data.length === 0) {
@@ -352,7 +419,7 @@ async function loadWellnessAlerts() {
 
 async function loadRecentSessions() {
     try {
-        const data = await fetchData('/dashboard/api/recent-sessions');
+        const data = await panelData('recent_sessions', '/dashboard/api/recent-sessions');
         const tbody = document.getElementById('recentSessions');
 
         if (!data || data.length === 0) {
@@ -397,11 +464,10 @@ async function loadHeatmap() {
     const container = document.getElementById('heatmapChart');
     if (!container) return;
 
-    // Get actual session data to build heatmap
-    const trendsData = await fetchData('/dashboard/api/wellness-trends');
+    const data = await panelData('heatmap', '/dashboard/api/heatmap');
 
     // If no data, show empty heatmap with message
-    if (!trendsData || trendsData.length === 0) {
+    if (!data || data.no_data) {
         container.innerHTML = `
             <div class="text-center py-4 text-muted">
                 <i class="fas fa-calendar-times fa-2x mb-2"></i>
@@ -411,24 +477,22 @@ async function loadHeatmap() {
         return;
     }
 
-    // Build activity data from sessions
-    const activityMap = {};
-    trendsData.forEach(session => {
-        const date = new Date(session.date);
-        const dayIndex = date.getDay(); // 0-6 (Sun-Sat)
-        const hour = date.getHours();
-        const timeSlot = Math.floor(hour / 4); // 0-5 (6 time slots per day)
-        const key = `${dayIndex}-${timeSlot}`;
-
-        if (!activityMap[key]) {
-            activityMap[key] = { count: 0, totalWellness: 0 };
-        }
-        activityMap[key].count++;
-        activityMap[key].totalWellness += session.wellness_score || 5;
-    });
-
-    // Simplified heatmap visualization
-    const days = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
+    // The server counts in UTC, Monday first; shift the week by the browser's offset to show local time
+    const shift = Math.round(-new Date().getTimezoneOffset() / 60);
+    const local = grid => {
+        const cells = new Array(168).fill(0);
+        grid.forEach((hours, day) => hours.forEach((count, hour) => {
+            cells[((day * 24 + hour + shift) % 168 + 168) % 168] += count;
+        }));
+        return cells;
+    };
+    const frames = local(data.frames);
+    const negative = local(data.impacts.negative);
+    const neutral = local(data.impacts.neutral);
+    const rated = local(data.impacts.positive).map((count, i) => count + neutral[i] + negative[i]);
+    const categories = Object.entries(data.categories).map(([name, grid]) => [name, local(grid)]);
+
+    const days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'];
 
     let html = '<div class="d-flex flex-wrap justify-content-center gap-1">';
     days.forEach((day, dayIndex) => {
@@ -436,30 +500,38 @@ async function loadHeatmap() {
             <small class="text-muted">${day}</small>
             <div class="d-flex flex-column gap-1 mt-1">`;
         for (let slot = 0; slot < 6; slot++) {
-            const key = `${dayIndex}-${slot}`;
-            const activity = activityMap[key];
+            // Four-hour slots: sum the hourly cells
+            const cells = [0, 1, 2, 3].map(h => dayIndex * 24 + slot * 4 + h);
+            const sum = values => cells.reduce((total, i) => total + values[i], 0);
+            const slotFrames = sum(frames);
+            const slotRated = sum(rated);
             let color = '#e5e7eb'; // Default: no activity
+            let title = 'No activity';
 
-            if (activity) {
-                const avgWellness = activity.totalWellness / activity.count;
-                // Color based on wellness score (inverted: high wellness = green)
-                if (avgWellness >= 7) color = '#10b981';
-                else if (avgWellness >= 5) color = '#f59e0b';
+            if (slotFrames > 0) {
+                const risk = slotRated > 0 ? sum(negative) / slotRated : 0;
+                // Color by the share of frames with a negative wellness impact
+                if (risk < 0.15) color = '#10b981';
+                else if (risk < 0.35) color = '#f59e0b';
                 else color = '#ef4444';
+
+                const top = categories.map(([name, values]) => [name, sum(values)]).sort((a, b) => b[1] - a[1])[0];
+                title = `${slotFrames} frames, ${Math.round(risk * 100)}% negative impact` +
+                    (top && top[1] > 0 ? `, mostly ${top[0].replace('_', ' ')}` : '');
             }
 
             const hourStart = slot * 4;
             const hourEnd = hourStart + 4;
-            html += `<div style="height: 8px; background: ${color}; border-radius: 2px;" title="${day} ${hourStart}:00-${hourEnd}:00"></div>`;
+            html += `<div style="height: 8px; background: ${color}; border-radius: 2px;" title="${day} ${hourStart}:00-${hourEnd}:00: ${title}"></div>`;
         }
         html += '</div></div>';
     });
     html += '</div>';
     html += '<div class="d-flex justify-content-center gap-3 mt-3 small text-muted">';
     html += '<span><span style="display:inline-block;width:12px;height:12px;background:#e5e7eb;border-radius:2px;"></span> No Data</span>';
-    html += '<span><span style="display:inline-block;width:12px;height:12px;background:#10b981;border-radius:2px;"></span> Good Wellness</span>';
+    html += '<span><span style="display:inline-block;width:12px;height:12px;background:#10b981;border-radius:2px;"></span> Low Risk</span>';
     html += '<span><span style="display:inline-block;width:12px;height:12px;background:#f59e0b;border-radius:2px;"></span> Moderate</span>';
-    html += '<span><span style="display:inline-block;width:12px;height:12px;background:#ef4444;border-radius:2px;"></span> Needs Attention</span>';
+    html += '<span><span style="display:inline-block;width:12px;height:12px;background:#ef4444;border-radius:2px;"></span> High Risk</span>';
     html += '</div>';
 
     container.innerHTML = html;
@@ -470,8 +542,9 @@ async function loadAppTimeline() {
     if (!canvas) return;
 
     try {
-        const data = await fetchData('/dashboard/api/wellness-trends');
-        if (!data || data.length === 0) {
+        const page = await panelData('wellness_trends', '/dashboard/api/wellness-trends');
+        const data = page ? page.items : [];
+        if (data.length === 0) {
             canvas.parentElement.innerHTML = '<p class="text-center text-muted py-4">No timeline data available</p>';
             return;
         }
@@ -586,6 +659,11 @@ async function showAppDetails(appName) {
     }
 }
 
+async function panelData(key, url) {
+    if (overview && overview[key] !== undefined) return overview[key];
+    return fetchData(url);
+}
+
 async function fetchData(url) {
     try {
         const response = await fetch(url);
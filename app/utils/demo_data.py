@@ -4,7 +4,11 @@ Creates comprehensive showcase data for demo@mindfulscreen.com
 """
 from app import db
 from app.models import User, QuizResponse, ScreenSession, FrameAnalysis, KnowledgeGraph, PeriodicAssessment
+from app.services.app_catalog import AppCatalogService
 from app.services.knowledge_graph import KnowledgeGraphService
+from app.services.rollups import RollupService
+from app.services.population import PopulationStatsService
+from app.services.heatmap import HeatmapService
 from datetime import datetime, timedelta
 import random
 import json
@@ -223,6 +227,8 @@ def create_demo_sessions(user_id):
     # Clear existing sessions
     ScreenSession.query.filter_by(user_id=user_id).delete()
 
+    catalog = AppCatalogService()
+
     # Create 14 days of sessions with improving wellness scores
     for i in range(14):
         date_offset = datetime.utcnow() - timedelta(days=13-i)
@@ -247,12 +253,12 @@ def create_demo_sessions(user_id):
                     'neutral': random.randint(25, 45),
                     'mixed': random.randint(5, 15)
                 },
-                app_usage={
+                app_usage=catalog.canonical_usage({
                     random.choice(productive_apps): random.randint(30, 50),
                     random.choice(apps): random.randint(15, 35),
                     random.choice(apps): random.randint(10, 25),
                     random.choice(apps): random.randint(5, 20)
-                },
+                }),
                 content_categories={
                     'work': random.randint(35, 55),
                     'educational': random.randint(15, 30),
@@ -267,12 +273,15 @@ def create_demo_sessions(user_id):
 
             # Create frame analyses
             for j in range(random.randint(25, 60)):
+                app_name = random.choice(apps)
                 frame = FrameAnalysis(
                     session_id=session.id,
+                    user_id=user_id,
                     frame_number=j + 1,
                     timestamp=j * 2.0,
                     frame_path=f'/data/frames/demo/session_{session.id}/frame_{j}.jpg',
-                    app_detected=random.choice(apps),
+                    app_detected=app_name,
+                    app_id=catalog.resolve(app_name),
                     content_type=random.choice(content_types),
                     extracted_text=f'Code review in progress...' if j % 3 == 0 else f'Reading documentation...',
                     detected_language='en',
@@ -284,6 +293,11 @@ def create_demo_sessions(user_id):
                 )
                 db.session.add(frame)
 
+    User.bump_data_version(user_id)
+    db.session.commit()
+    RollupService().rebuild_user(user_id)
+    PopulationStatsService().apply_user(user_id)
+    HeatmapService().rebuild_user(user_id)
     db.session.commit()
 
 
@@ -0,0 +1,123 @@
+"""
+Downsampling of long time series for charts.
+
+``lttb`` keeps the points that preserve a line's visual shape
+(Largest-Triangle-Three-Buckets); ``bucket`` aggregates points per calendar
+day or ISO week. Both work on NumPy arrays so a series of a million points
+reduces in milliseconds, and both accept several value columns at once so
+related series (e.g. wellness and productivity) keep the same x positions.
+"""
+import numpy as np
+
+BUCKETS = ('day', 'week')
+MAX_POINTS = 2000
+
+# 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+_WEEK_OFFSET = np.timedelta64(3, 'D')
+
+
+def lttb(x, y, target):
+    """
+    Indices of the ``target`` points of (x, y) chosen by LTTB.
+
+    ``x`` is 1-D and sorted; ``y`` is 1-D or (n, k). With several columns a
+    point's triangle area is summed over the columns. The first and last
+    points are always kept.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if y.ndim == 1:
+        y = y[:, None]
+    n = len(x)
+    if target >= n:
+        return np.arange(n)
+    if target < 3:
+        raise ValueError("LTTB needs a target of at least 3 points")
+
+    # Bucket i (1..target-2) covers [edges[i-1], edges[i]) of the interior points
+    edges = np.linspace(1, n - 1, target - 1).astype(np.int64)
+    # Every bucket's mean is known up front; only the previously chosen point is sequential
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1, axis=0)
+    sizes = np.diff(edges)[:, None]
+    mean_x = np.append(sums_x / sizes[:, 0], x[-1])
+    mean_y = np.vstack([sums_y / sizes, y[-1]])
+
+    selected = np.empty(target, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(target - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area (a, candidate, mean of the next bucket), per column
+        area = np.abs(
+            (x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi, None]) * (mean_y[i + 1] - y[a])
+        ).sum(axis=1)
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def bucket(timestamps, values, unit='day', how='mean'):
+    """
+    Aggregate ``values`` (1-D or (n, k)) per calendar day or ISO week.
+
+    ``timestamps`` are datetime64 (or anything ``np.asarray`` turns into
+    them). Returns ``(bucket_starts, aggregated, counts)`` in time order;
+    ``how`` is 'mean' or 'sum'.
+    """
+    if unit not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {unit}")
+    days = np.asarray(timestamps, dtype='datetime64[D]')
+    if unit == 'week':
+        days = (days + _WEEK_OFFSET).astype('datetime64[W]').astype('datetime64[D]') - _WEEK_OFFSET
+
+    values = np.asarray(values, dtype=np.float64)
+    flat = values.ndim == 1
+    if flat:
+        values = values[:, None]
+
+    starts, inverse = np.unique(days, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(starts))
+    totals = np.column_stack([
+        np.bincount(inverse, weights=column, minlength=len(starts)) for column in values.T
+    ])
+    if how == 'mean':
+        totals /= counts[:, None]
+    elif how != 'sum':
+        raise ValueError(f"Unknown aggregation: {how}")
+    return starts, totals[:, 0] if flat else totals, counts
+
+
+def downsample(timestamps, values, points=None, unit=None, how='mean'):
+    """
+    Reduce a time series for display: bucket by ``unit`` when given, then
+    LTTB down to ``points`` when there are still more than that.
+
+    Returns ``(timestamps, values, counts)``; ``counts`` is the number of
+    raw points behind each output point (1 when LTTB picked a raw point).
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[s]')
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.ones(len(timestamps), dtype=np.int64)
+
+    if unit:
+        timestamps, values, counts = bucket(timestamps, values, unit, how)
+        timestamps = timestamps.astype('datetime64[s]')
+
+    if points and len(timestamps) > points:
+        keep = lttb(timestamps.astype(np.int64), values, points)
+        timestamps, values, counts = timestamps[keep], values[keep], counts[keep]
+    return timestamps, values, counts
+
+
+def parse_downsample_args(args):
+    """Read ``points`` and ``bucket`` from request args. Raises ValueError on bad input."""
+    points = args.get('points', type=int)
+    if 'points' in args and (points is None or points < 3):
+        raise ValueError("points must be an integer of at least 3")
+    unit = args.get('bucket') or None
+    if unit is not None and unit not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    return {'points': min(points, MAX_POINTS) if points else None, 'bucket': unit}
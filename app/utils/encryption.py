@@ -72,8 +72,14 @@ class EncryptionService:
         if not file_path.exists():
             return
 
-        file_size = file_path.stat().st_size
-        with open(file_path, 'wb') as f:
-            f.write(os.urandom(file_size))
+        # Overwrite in place ('wb' would truncate first and free the old blocks), a block at a time
+        remaining = file_path.stat().st_size
+        with open(file_path, 'r+b') as f:
+            while remaining > 0:
+                block = min(remaining, 1 << 20)
+                f.write(os.urandom(block))
+                remaining -= block
+            f.flush()
+            os.fsync(f.fileno())
 
         os.remove(file_path)
@@ -0,0 +1,123 @@
+"""
+Append-only per-session frame archive.
+
+All frames of a session live in one ``<session_id>.pack`` file instead of one
+file per frame. Each record is a fixed header followed by the (encrypted)
+frame blob; a frame is addressed by the byte offset of its header, so
+``frame_path`` stores ``<archive path>#<offset>``. The headers double as the
+offset index and can be rebuilt with :meth:`FrameArchive.index`.
+"""
+import mmap
+import os
+import struct
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not serialized across processes
+    fcntl = None
+
+ARCHIVE_SUFFIX = '.pack'
+FILE_MAGIC = b'MSFA0001'
+RECORD_MAGIC = b'FRM1'
+# magic, frame_number, blob length
+RECORD_HEADER = struct.Struct('<4sII')
+
+
+class FrameArchiveError(Exception):
+    pass
+
+
+def make_frame_ref(archive_path, offset):
+    return f"{archive_path}#{offset}"
+
+
+def parse_frame_ref(frame_ref):
+    """Return (archive_path, offset) for an archive reference, or None for a plain file path"""
+    path, sep, offset = str(frame_ref).rpartition('#')
+    if not sep or not path.endswith(ARCHIVE_SUFFIX) or not offset.isdigit():
+        return None
+    return Path(path), int(offset)
+
+
+class FrameArchive:
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def append(self, frame_number, blob):
+        """Append a frame blob and return its record offset"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                if offset == 0:
+                    f.write(FILE_MAGIC)
+                    offset = len(FILE_MAGIC)
+                f.write(RECORD_HEADER.pack(RECORD_MAGIC, frame_number, len(blob)))
+                f.write(blob)
+                f.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return offset
+
+    def read(self, offset):
+        """Read the blob stored at ``offset`` through a read-only memory map"""
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self._read_record(mm, offset)[1]
+
+    def read_many(self, offsets):
+        """Read several records with a single mapping; yields (offset, blob)"""
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for offset in offsets:
+                    yield offset, self._read_record(mm, offset)[1]
+
+    def index(self):
+        """Rebuild {frame_number: offset} by scanning the record headers"""
+        entries = {}
+        if not self.path.exists() or self.path.stat().st_size <= len(FILE_MAGIC):
+            return entries
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[:len(FILE_MAGIC)] != FILE_MAGIC:
+                    raise FrameArchiveError(f"Not a frame archive: {self.path}")
+                offset = len(FILE_MAGIC)
+                while offset + RECORD_HEADER.size <= len(mm):
+                    frame_number, length = self._read_header(mm, offset)
+                    entries[frame_number] = offset
+                    offset += RECORD_HEADER.size + length
+        return entries
+
+    def size(self):
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def delete(self):
+        """Remove the whole archive; returns the bytes reclaimed"""
+        size = self.size()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            return 0
+        return size
+
+    def _read_header(self, mm, offset):
+        if offset < len(FILE_MAGIC) or offset + RECORD_HEADER.size > len(mm):
+            raise FrameArchiveError(f"Offset {offset} out of range in {self.path}")
+        magic, frame_number, length = RECORD_HEADER.unpack_from(mm, offset)
+        if magic != RECORD_MAGIC:
+            raise FrameArchiveError(f"No frame record at offset {offset} in {self.path}")
+        return frame_number, length
+
+    def _read_record(self, mm, offset):
+        frame_number, length = self._read_header(mm, offset)
+        start = offset + RECORD_HEADER.size
+        if start + length > len(mm):
+            raise FrameArchiveError(f"Truncated frame record at offset {offset} in {self.path}")
+        return frame_number, mm[start:start + length]
@@ -0,0 +1,148 @@
+"""
+Per-session compressed video storage for analyzed frames.
+
+Consecutive screen captures are highly redundant, so instead of one JPEG per
+frame the frames of a session are encoded with OpenCV ``VideoWriter`` into
+video segments (``<session dir>/video/seg_NNNNN.mp4``). Segments are
+encrypted as whole containers, and ``index.json`` maps each frame number to
+``(segment, position)`` so single frames can be decoded by seeking.
+
+Video frame references look like ``<segment path>@<position>``.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+import cv2
+import numpy as np
+
+VIDEO_DIRNAME = 'video'
+INDEX_FILENAME = 'index.json'
+
+
+def make_video_ref(segment_path, position):
+    return f"{segment_path}@{position}"
+
+
+def parse_video_ref(frame_ref):
+    """Return (segment_path, position) for a video reference, or None"""
+    path, sep, position = str(frame_ref).rpartition('@')
+    if not sep or f'{os.sep}{VIDEO_DIRNAME}{os.sep}' not in path or not position.isdigit():
+        return None
+    return Path(path), int(position)
+
+
+class FrameVideoStore:
+    def __init__(self, session_dir, fourcc='mp4v', extension='.mp4', fps=1.0, cipher=None):
+        self.video_dir = Path(session_dir) / VIDEO_DIRNAME
+        self.fourcc = fourcc
+        self.extension = extension
+        self.fps = fps
+        self.cipher = cipher
+
+    @property
+    def index_path(self):
+        return self.video_dir / INDEX_FILENAME
+
+    def load_index(self):
+        """{frame_number: [segment filename, position]}"""
+        try:
+            with open(self.index_path) as f:
+                return {int(k): v for k, v in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+
+    def append_segment(self, frames):
+        """
+        Encode ``[(frame_number, jpeg_bytes), ...]`` as a new segment.
+
+        Returns {frame_number: reference}. All frames in a segment share the
+        first frame's resolution; later frames are resized to match.
+        """
+        if not frames:
+            return {}
+
+        self.video_dir.mkdir(parents=True, exist_ok=True)
+        index = self.load_index()
+        segment_name = f"seg_{self._next_segment_number():05d}{self.extension}"
+        if self.cipher:
+            segment_name += '.enc'
+        segment_path = self.video_dir / segment_name
+
+        images = [(n, cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)) for n, data in frames]
+        images = [(n, img) for n, img in images if img is not None]
+        if not images:
+            return {}
+        height, width = images[0][1].shape[:2]
+
+        fd, tmp_path = tempfile.mkstemp(suffix=self.extension, dir=self.video_dir)
+        os.close(fd)
+        try:
+            writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+            if not writer.isOpened():
+                raise RuntimeError(f"OpenCV cannot write {self.fourcc} video")
+            refs = {}
+            for position, (frame_number, img) in enumerate(images):
+                if img.shape[:2] != (height, width):
+                    img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+                writer.write(img)
+                refs[frame_number] = make_video_ref(segment_path, position)
+                index[frame_number] = [segment_name, position]
+            writer.release()
+
+            with open(tmp_path, 'rb') as f:
+                container = f.read()
+        finally:
+            os.remove(tmp_path)
+
+        if self.cipher:
+            container = self.cipher.encrypt(container)
+        with open(segment_path, 'wb') as f:
+            f.write(container)
+
+        self._write_index(index)
+        return refs
+
+    def read_frame(self, segment_path, position, jpeg_quality=90):
+        """Decode a single frame by seeking in its segment; returns JPEG bytes"""
+        return self.read_frames(segment_path, [position], jpeg_quality)[position]
+
+    def read_frames(self, segment_path, positions, jpeg_quality=90):
+        """Decode several frames of one segment with a single decrypt; returns {position: jpeg_bytes}"""
+        with open(segment_path, 'rb') as f:
+            container = f.read()
+        if self.cipher and str(segment_path).endswith('.enc'):
+            container = self.cipher.decrypt(container)
+
+        # OpenCV can only demux from a path, so the plaintext container lives briefly in a private temp file
+        fd, tmp_path = tempfile.mkstemp(suffix=self.extension)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(container)
+            capture = cv2.VideoCapture(tmp_path)
+            results = {}
+            current = 0
+            for position in sorted(positions):
+                if position != current:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, position)
+                ok, img = capture.read()
+                current = position + 1
+                if not ok:
+                    raise ValueError(f"Frame {position} not found in {segment_path}")
+                results[position] = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])[1].tobytes()
+            capture.release()
+            return results
+        finally:
+            os.remove(tmp_path)
+
+    def _next_segment_number(self):
+        if not self.video_dir.exists():
+            return 0
+        numbers = [int(p.name[4:9]) for p in self.video_dir.glob('seg_*') if p.name[4:9].isdigit()]
+        return max(numbers, default=-1) + 1
+
+    def _write_index(self, index):
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({str(k): v for k, v in sorted(index.items())}, f)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,25 @@
+"""
+Perceptual image hashing used to measure how much the screen changed between frames
+"""
+import io
+from PIL import Image
+
+
+def dhash(image_bytes, hash_size=8):
+    """64-bit difference hash: robust to compression noise, sensitive to layout changes"""
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        pixels = list(img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hash_similarity(hash_a, hash_b, bits=64):
+    """1.0 for identical hashes, 0.0 when every bit differs"""
+    if hash_a is None or hash_b is None:
+        return 0.0
+    return 1 - bin(hash_a ^ hash_b).count('1') / bits
@@ -0,0 +1,142 @@
+"""
+Local language identification for on-screen text.
+
+Non-Latin text is identified by its dominant Unicode script. Latin-script
+text is scored against character trigram profiles built from each
+language's most frequent words, plus exact hits on those words; when no
+language clearly wins it is taken as English, since English UI words
+(product names, menu labels) score about evenly across the profiles. Runs
+in microseconds, so it can gate every translation call.
+"""
+import re
+import unicodedata
+from collections import Counter
+
+# Script name prefix (from unicodedata.name) -> language it almost always means on a screen
+SCRIPT_LANGUAGES = {
+    'CYRILLIC': 'ru',
+    'GREEK': 'el',
+    'ARABIC': 'ar',
+    'HEBREW': 'he',
+    'HANGUL': 'ko',
+    'HIRAGANA': 'ja',
+    'KATAKANA': 'ja',
+    'CJK': 'zh',
+    'DEVANAGARI': 'hi',
+    'THAI': 'th',
+    'BENGALI': 'bn',
+    'TAMIL': 'ta',
+}
+
+FREQUENT_WORDS = {
+    'en': """the of and to in is you that it for was on are with as this be at have from or by not
+             but what all were we when your can there an which she do how their if will up other about
+             out many then them these so some her would make like him into time has more no could
+             people my than first been who its now new get see only our just here sign search view
+             settings home more share""",
+    'es': """de la que el en y los se del las un por con no una su para es al lo como más pero sus
+             le ya este sí porque esta entre cuando muy sin sobre también me hasta hay donde quien
+             desde todo nos durante todos uno les ni contra otros ese eso ver inicio buscar""",
+    'fr': """de la le et les des en un du une que est pour qui dans par plus pas au sur ne se ce il
+             sont avec mais comme on ou nous vous tout elle cette son ses aussi leur bien être fait
+             très accueil rechercher""",
+    'de': """der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch
+             es an werden aus er hat dass sie nach wird bei einer um am sind noch wie einem über
+             einen so zum war haben nur oder aber vor zur bis mehr durch man suchen""",
+    'pt': """de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi
+             ao ele das tem à seu sua ou ser quando muito há nos já está eu também só pelo pela até
+             isso você início pesquisar""",
+    'it': """di e il la che in a per un è del non sono le con i da si una al come ma anche più nel
+             alla lo ci gli delle ha mi questo se della dei ho io ti tutto essere cerca""",
+    'nl': """de en van het een is dat in te op zijn voor met die niet aan er om ook als bij of door
+             maar over nog naar dan uit wel tot kan geen zo deze heeft worden werd zoeken""",
+}
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+def _trigrams(words):
+    counts = Counter()
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            counts[padded[i:i + 3]] += 1
+    return counts
+
+
+def _build_profiles():
+    profiles = {}
+    for language, text in FREQUENT_WORDS.items():
+        words = text.split()
+        # Earlier (more frequent) words weigh more
+        weighted = Counter()
+        for rank, word in enumerate(words):
+            weight = 1.0 / (1 + rank / 20)
+            for gram, count in _trigrams([word]).items():
+                weighted[gram] += weight * count
+        norm = max(weighted.values())
+        profiles[language] = ({gram: value / norm for gram, value in weighted.items()}, frozenset(words))
+    return profiles
+
+
+PROFILES = _build_profiles()
+
+
+def _script(char):
+    try:
+        name = unicodedata.name(char)
+    except ValueError:
+        return None
+    if name.startswith('LATIN'):
+        return 'LATIN'
+    for prefix in SCRIPT_LANGUAGES:
+        if name.startswith(prefix):
+            return prefix
+    return 'OTHER'
+
+
+def letter_count(text):
+    return sum(1 for char in text or '' if char.isalpha())
+
+
+def detect_language(text, hint=None, min_confidence=0.1):
+    """
+    Return ``(language_code, confidence)`` for ``text``.
+
+    Latin-script text whose best language does not lead the runner-up by
+    ``min_confidence`` is English. ``hint`` (e.g. the vision model's guess)
+    is only used for scripts without a profile. Returns ``('en', 0.0)`` for
+    text with no letters.
+    """
+    scripts = Counter(_script(char) for char in text or '' if char.isalpha())
+    scripts.pop(None, None)
+    total = sum(scripts.values())
+    if not total:
+        return 'en', 0.0
+
+    script, count = scripts.most_common(1)[0]
+    if script in SCRIPT_LANGUAGES:
+        language = SCRIPT_LANGUAGES[script]
+        # Han characters next to kana are Japanese
+        if script == 'CJK' and (scripts['HIRAGANA'] or scripts['KATAKANA']):
+            language = 'ja'
+        return language, count / total
+    if script != 'LATIN':
+        return hint or 'und', 0.0
+
+    words = WORD_PATTERN.findall(text.lower())
+    grams = _trigrams(words)
+    gram_total = sum(grams.values()) or 1
+
+    scores = {}
+    for language, (profile, vocabulary) in PROFILES.items():
+        gram_score = sum(profile.get(gram, 0.0) * n for gram, n in grams.items()) / gram_total
+        word_score = sum(1 for word in words if word in vocabulary) / len(words)
+        scores[language] = word_score + 0.5 * gram_score
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best, best_score = ranked[0]
+    confidence = best_score - ranked[1][1]
+    if confidence < min_confidence:
+        return 'en', confidence
+    return best, confidence
@@ -0,0 +1,73 @@
+"""
+Keyset (cursor) pagination over (created_at, id), newest first.
+
+A cursor names the last row of the previous page, so fetching the next page
+is an index range scan no matter how deep the client has paged, unlike
+OFFSET which rereads every skipped row.
+"""
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id); raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_page_args(args, default_limit=DEFAULT_PAGE_SIZE):
+    """
+    Read ``cursor``, ``limit``, ``start`` and ``end`` (YYYY-MM-DD, inclusive)
+    from request args. Raises ValueError on bad input.
+    """
+    limit = args.get('limit', default_limit, type=int)
+    if limit is None or limit < 1:
+        raise ValueError("limit must be a positive integer")
+
+    cursor = args.get('cursor') or None
+    if cursor:
+        decode_cursor(cursor)
+
+    start = args.get('start')
+    end = args.get('end')
+    return {
+        'cursor': cursor,
+        'limit': min(limit, MAX_PAGE_SIZE),
+        'start': datetime.strptime(start, '%Y-%m-%d') if start else None,
+        # Inclusive end date: everything before the following midnight
+        'end': datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None,
+    }
+
+
+def keyset_page(query, created_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE, start=None, end=None):
+    """Return (rows newest first, next_cursor or None)"""
+    if start is not None:
+        query = query.filter(created_column >= start)
+    if end is not None:
+        query = query.filter(created_column < end)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created_column < created_at,
+            and_(created_column == created_at, id_column < row_id)
+        ))
+
+    rows = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
@@ -0,0 +1,50 @@
+"""
+Lightweight in-process periodic jobs for maintenance work (retention, sweeps, flushes).
+
+Every gunicorn worker may start the same job; the jobs themselves are written
+to be safe under concurrent execution, this module only makes sure a job is
+started at most once per process.
+"""
+import threading
+import time
+import traceback
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_periodic_job(app, name, interval_seconds, func, initial_delay=None):
+    """Run ``func()`` inside an app context every ``interval_seconds`` on a daemon thread"""
+    with _jobs_lock:
+        if name in _jobs:
+            return _jobs[name]
+
+        stop_event = threading.Event()
+
+        def _loop():
+            if stop_event.wait(interval_seconds if initial_delay is None else initial_delay):
+                return
+            while True:
+                started = time.monotonic()
+                try:
+                    with app.app_context():
+                        func()
+                except Exception as e:
+                    print(f"Periodic job '{name}' failed: {e}")
+                    traceback.print_exc()
+                remaining = interval_seconds - (time.monotonic() - started)
+                if stop_event.wait(max(remaining, 1)):
+                    return
+
+        thread = threading.Thread(target=_loop, name=f'job-{name}', daemon=True)
+        thread.stop_event = stop_event
+        _jobs[name] = thread
+        thread.start()
+        return thread
+
+
+def stop_periodic_job(name):
+    with _jobs_lock:
+        thread = _jobs.pop(name, None)
+    if thread:
+        thread.stop_event.set()
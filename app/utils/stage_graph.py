@@ -0,0 +1,163 @@
+"""
+Run the stages of a unit of work as a small dependency graph.
+
+Stages whose requirements are met run concurrently on a shared thread pool.
+Each stage may have a timeout, counted from when the stage starts running
+(not from when it was queued), and a fallback; when a stage times out or
+raises, its fallback result is used instead (or the error propagates when
+there is none). A timed-out stage cannot be interrupted, so blocking calls
+inside a stage should be bounded by ``remaining_time()``.
+ The report separates wall time, total work (the sum of
+stage durations) and the critical path (the slowest dependency chain).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_REQUIRED = object()
+# Seconds between checks while stages with a timeout are still queued
+_QUEUED_POLL_SECONDS = 0.05
+
+_local = threading.local()
+
+
+class StageTimeout(Exception):
+    pass
+
+
+def remaining_time():
+    """Seconds left before the current stage times out; None outside a stage or without a timeout"""
+    deadline = getattr(_local, 'deadline', None)
+    return None if deadline is None else deadline - time.perf_counter()
+
+
+def get_executor(max_workers):
+    """Process-wide pool; abandoned (timed-out) stages finish in the background on it"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage')
+        return _executor
+
+
+class Stage:
+    def __init__(self, name, func, requires=(), timeout=None, fallback=_REQUIRED):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.timeout = timeout
+        self.fallback = fallback
+
+
+class StageGraph:
+    def __init__(self, executor, context=None):
+        """``context`` is a zero-argument callable returning a context manager entered around every stage"""
+        self.executor = executor
+        self.context = context
+        self.stages = {}
+
+    def add(self, name, func, requires=(), timeout=None, fallback=_REQUIRED):
+        """
+        ``func(results)`` receives the results of the stages it requires.
+        ``fallback`` is a value or a ``callable(results)`` used on timeout or error.
+        """
+        missing = [r for r in requires if r not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name} requires unknown stages: {missing}")
+        self.stages[name] = Stage(name, func, requires, timeout, fallback)
+        return self
+
+    def run(self):
+        """Run every stage; returns (results, report)"""
+        started = time.perf_counter()
+        results = {}
+        spans = {}
+        failed = []
+        pending = dict(self.stages)
+        running = {}
+        # stage name -> when a pool thread picked it up (set by _call)
+        begun = {}
+
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(r in results for r in stage.requires):
+                    inputs = {r: results[r] for r in stage.requires}
+                    future = self.executor.submit(self._call, stage, inputs, begun)
+                    running[future] = (stage, time.perf_counter(), inputs)
+                    del pending[name]
+
+            now = time.perf_counter()
+            timed = [stage for stage, _, _ in running.values() if stage.timeout]
+            deadlines = [begun[stage.name] + stage.timeout for stage in timed if stage.name in begun]
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+            if len(deadlines) < len(timed):
+                # A queued stage's clock starts when it does
+                wait_for = min(wait_for, _QUEUED_POLL_SECONDS) if wait_for is not None else _QUEUED_POLL_SECONDS
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            now = time.perf_counter()
+            for future, (stage, s_started, inputs) in list(running.items()):
+                if future in done:
+                    try:
+                        results[stage.name] = future.result()
+                    except Exception as e:
+                        results[stage.name] = self._fallback(stage, inputs, e)
+                        failed.append(stage.name)
+                elif stage.timeout and stage.name in begun and now - begun[stage.name] >= stage.timeout:
+                    # The thread cannot be interrupted; its result is simply ignored
+                    results[stage.name] = self._fallback(
+                        stage, inputs, StageTimeout(f"Stage {stage.name} exceeded {stage.timeout}s"))
+                    failed.append(stage.name)
+                else:
+                    continue
+                spans[stage.name] = (begun.get(stage.name, s_started) - started, now - started)
+                del running[future]
+
+        return results, self._report(spans, failed, time.perf_counter() - started)
+
+    def _call(self, stage, inputs, begun):
+        begun[stage.name] = now = time.perf_counter()
+        _local.deadline = now + stage.timeout if stage.timeout else None
+        try:
+            if self.context is None:
+                return stage.func(inputs)
+            with self.context():
+                return stage.func(inputs)
+        finally:
+            _local.deadline = None
+
+    def _fallback(self, stage, inputs, error):
+        if stage.fallback is _REQUIRED:
+            raise error
+        print(f"Stage {stage.name} fell back: {error}")
+        return stage.fallback(inputs) if callable(stage.fallback) else stage.fallback
+
+    def _report(self, spans, failed, wall):
+        durations = {name: end - start for name, (start, end) in spans.items()}
+
+        # Longest chain through the dependency graph, by stage duration
+        chain_cost = {}
+        chain_prev = {}
+        for name in self.stages:  # insertion order is a topological order (add() checks requirements)
+            deps = self.stages[name].requires
+            prev = max(deps, key=lambda d: chain_cost[d], default=None)
+            chain_prev[name] = prev
+            chain_cost[name] = durations.get(name, 0.0) + (chain_cost[prev] if prev else 0.0)
+
+        tail = max(chain_cost, key=chain_cost.get, default=None)
+        path = []
+        while tail:
+            path.append(tail)
+            tail = chain_prev[tail]
+
+        return {
+            'stages_ms': {name: round(d * 1000, 2) for name, d in durations.items()},
+            'wall_ms': round(wall * 1000, 2),
+            'work_ms': round(sum(durations.values()) * 1000, 2),
+            'critical_path': path[::-1],
+            'critical_path_ms': round(max(chain_cost.values(), default=0.0) * 1000, 2),
+            'fallbacks': failed
+        }
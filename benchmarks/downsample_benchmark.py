@@ -0,0 +1,66 @@
+"""
+Benchmark chart downsampling on a synthetic long history.
+
+    python benchmarks/downsample_benchmark.py [--points 1000000] [--target 500]
+
+Generates one score pair per point at irregular intervals (a few dozen a
+day, so decades of history at 1M points), then times day and week
+bucketing, LTTB alone, and day bucketing followed by LTTB.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.utils.downsample import bucket, downsample, lttb  # noqa: E402
+
+
+def synthetic_series(n, seed=7):
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(scale=15 * 60, size=n).astype(np.int64) + 60
+    timestamps = np.datetime64('2020-01-01T00:00:00') + np.cumsum(gaps).astype('timedelta64[s]')
+    drift = np.cumsum(rng.normal(0, 0.05, size=(n, 2)), axis=0)
+    scores = np.clip(6 + np.sin(np.arange(n)[:, None] / 500) + drift % 3 + rng.normal(0, 0.5, (n, 2)), 0, 10)
+    return timestamps, scores
+
+
+def timed(label, func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {best * 1000:>9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--target', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    timestamps, scores = synthetic_series(args.points)
+    span = (timestamps[-1] - timestamps[0]).astype('timedelta64[D]')
+    print(f"{args.points:,} points over {span}, target {args.target}\n")
+
+    x = timestamps.astype(np.int64)
+    days = timed('bucket by day', lambda: bucket(timestamps, scores, 'day'), args.repeat)
+    weeks = timed('bucket by week', lambda: bucket(timestamps, scores, 'week'), args.repeat)
+    keep = timed('lttb', lambda: lttb(x, scores, args.target), args.repeat)
+    reduced = timed('bucket by day + lttb', lambda: downsample(timestamps, scores, args.target, 'day'), args.repeat)
+
+    print()
+    print(f"day buckets:  {len(days[0]):,}")
+    print(f"week buckets: {len(weeks[0]):,}")
+    print(f"lttb points:  {len(keep):,}")
+    print(f"day + lttb:   {len(reduced[0]):,}")
+
+
+if __name__ == '__main__':
+    main()
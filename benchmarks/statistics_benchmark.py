@@ -0,0 +1,153 @@
+"""
+Benchmark the cross-session statistics engine on a synthetic heavy user.
+
+    python benchmarks/statistics_benchmark.py [--frames 1000000] [--frames-per-session 150] [--database-url URL]
+
+Writes a synthetic user (a few years of sessions with their frames) to a
+database (a temporary SQLite file unless --database-url is given) and times
+a cold request: loading the user's columns with UserSeries.load, then the
+first computation on them. Then times each section and the full response on
+the loaded columns: the work done per request while the user stays cached.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def synthetic_user(frames, frames_per_session, seed=7):
+    """Column arrays of the sessions and frames, plus the session index of every frame"""
+    rng = np.random.default_rng(seed)
+    sessions = max(frames // frames_per_session, 1)
+    now = int(np.datetime64('2026-01-01T00:00:00', 's').astype(np.int64))
+    # Sessions spread over the last three years, skipping some days
+    session_ts = np.sort(now - rng.integers(0, 3 * 365 * 86400, size=sessions))
+    duration = rng.integers(600, 7200, size=sessions).astype(np.float64)
+    wellness = np.clip(rng.normal(6.5, 1.5, sessions), 0, 10)
+    wellness[rng.random(sessions) < 0.02] = np.nan
+    productivity = np.clip(rng.normal(6, 2, sessions), 0, 10)
+
+    owner = np.sort(rng.integers(0, sessions, size=frames))
+    frame_ts = session_ts[owner] + (rng.random(frames) * duration[owner]).astype(np.int64)
+    sentiment = rng.uniform(-1, 1, frames)
+    sentiment[rng.random(frames) < 0.05] = np.nan
+    impact = rng.integers(-1, 3, size=frames).astype(np.int8)
+    return {
+        'session_ts': session_ts, 'wellness': wellness, 'productivity': productivity, 'duration': duration,
+        'frame_ts': frame_ts, 'sentiment': sentiment, 'impact': impact, 'owner': owner, 'now': now
+    }
+
+
+def store_user(data, chunk_rows=50_000):
+    """Insert the synthetic user's rows; returns the user id"""
+    import sqlalchemy as sa
+    from app import db
+    from app.models import User, ScreenSession, FrameAnalysis
+    from app.services.statistics import IMPACTS
+
+    def datetimes(ts):
+        return ts.astype('datetime64[s]').astype(object)
+
+    def nullable(values):
+        return [None if np.isnan(v) else float(v) for v in values]
+
+    user = User(email=f'benchmark-{time.time_ns()}@example.com', password_hash='x', name='Benchmark')
+    db.session.add(user)
+    db.session.commit()
+
+    with db.engine.begin() as connection:
+        first_id = (connection.execute(sa.select(sa.func.max(ScreenSession.id))).scalar() or 0) + 1
+        session_ids = np.arange(first_id, first_id + data['session_ts'].size)
+        connection.execute(sa.insert(ScreenSession), [{
+            'id': int(session_id), 'user_id': user.id, 'status': 'completed', 'created_at': created_at,
+            'wellness_score': wellness, 'productivity_score': productivity, 'duration_seconds': int(duration)
+        } for session_id, created_at, wellness, productivity, duration in zip(
+            session_ids, datetimes(data['session_ts']), nullable(data['wellness']), nullable(data['productivity']),
+            data['duration'])])
+
+        labels = [None if code < 0 else IMPACTS[code] for code in range(-1, len(IMPACTS))]
+        for start in range(0, data['frame_ts'].size, chunk_rows):
+            part = slice(start, start + chunk_rows)
+            connection.execute(sa.insert(FrameAnalysis), [{
+                'session_id': int(session_id), 'user_id': user.id, 'frame_number': start + i,
+                'timestamp': float(offset), 'created_at': created_at, 'sentiment_score': sentiment,
+                'wellness_impact': labels[code + 1]
+            } for i, (session_id, offset, created_at, sentiment, code) in enumerate(zip(
+                session_ids[data['owner'][part]], data['frame_ts'][part] - data['session_ts'][data['owner'][part]],
+                datetimes(data['frame_ts'][part]), nullable(data['sentiment'][part]), data['impact'][part]))])
+    return user.id
+
+
+def timed(label, func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {best * 1000:>9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=1_000_000)
+    parser.add_argument('--frames-per-session', type=int, default=150)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', help='Database to write the synthetic user to (default: temporary SQLite)')
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        os.environ['DATABASE_URL'] = f'sqlite:///{scratch.name}'
+    # Only the database is needed; keep the app's background jobs off
+    for flag in ('POPULATION_STATS_WORKER_ENABLED', 'FRAME_SWEEPER_ENABLED', 'AUDIT_MAINTENANCE_ENABLED'):
+        os.environ[flag] = 'False'
+
+    from app import app
+    from app.services.statistics import (
+        SECTIONS, UserSeries, StatisticsService, compute_sections, rolling_averages, percentiles, streaks,
+        distributions, week_over_week, _snapshots
+    )
+
+    data = synthetic_user(args.frames, args.frames_per_session)
+    now = data['now']
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            user_id = store_user(data)
+            print(f"{data['frame_ts'].size:,} frames, {data['session_ts'].size:,} sessions "
+                  f"(written in {time.perf_counter() - started:.1f} s)\n")
+
+            # A cold request: the user's columns are not cached in this process
+            series = timed('load columns', lambda: UserSeries.load(user_id), args.repeat)
+            # The first computation on a snapshot also derives its sorted columns and weekday/hour slots
+            timed('first computation', lambda: compute_sections(series, SECTIONS, args.days, now), 1)
+
+            def cold_request():
+                _snapshots.clear()
+                return StatisticsService().get_statistics(user_id, days=args.days, now=now)
+            timed('cold request (end to end)', cold_request, args.repeat)
+            print()
+
+            timed('rolling 7/30 days', lambda: rolling_averages(series, args.days, now), args.repeat)
+            timed('percentiles', lambda: percentiles(series), args.repeat)
+            timed('streaks', lambda: streaks(series, now), args.repeat)
+            timed('weekday/hour distributions', lambda: distributions(series), args.repeat)
+            timed('week over week', lambda: week_over_week(series, now), args.repeat)
+            timed('all sections', lambda: compute_sections(series, SECTIONS, args.days, now), args.repeat)
+    finally:
+        if scratch is not None:
+            os.remove(scratch.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -30,10 +30,75 @@ class Config:
     UPLOAD_FOLDER = BASE_DIR / 'data' / 'uploads'
     FRAMES_FOLDER = BASE_DIR / 'data' / 'frames'
     KNOWLEDGE_GRAPH_FOLDER = BASE_DIR / 'data' / 'knowledge_graphs'
+    EXPORT_FOLDER = BASE_DIR / 'data' / 'exports'
+
+    # Bearer token required by the /metrics endpoint (disabled when unset)
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
 
     FRAME_EXTRACTION_RATE = 2
     MAX_FRAMES_PER_SESSION = 300
 
+    # Adaptive capture and load shedding (limits are per worker process)
+    MODEL_CALL_BUDGET_PER_MINUTE = int(os.getenv('MODEL_CALL_BUDGET_PER_MINUTE', 240))
+    MODEL_CALLS_PER_FRAME = 2               # Vision + sentiment
+    CAPTURE_MAX_INFLIGHT_PER_USER = 2       # 429 beyond this
+    CAPTURE_MAX_INFLIGHT_GLOBAL = 16        # 503 beyond this
+    CAPTURE_BUDGET_LOW_WATER = 0.2          # Below this budget fraction only every Nth frame is analyzed
+    CAPTURE_SAMPLE_EVERY = 3
+    CAPTURE_DUPLICATE_SIMILARITY = 0.97     # Perceptual-hash similarity treated as "screen unchanged"
+    CAPTURE_MIN_INTERVAL_MS = 1000
+    CAPTURE_MAX_INTERVAL_MS = 15000
+    CAPTURE_MAX_WIDTH = 1920
+    CAPTURE_REDUCED_WIDTH = 1280
+    CAPTURE_QUALITY = 0.8
+    CAPTURE_REDUCED_QUALITY = 0.6
+
+    # Temporal propagation: reuse analysis across a stable run of frames
+    TEMPORAL_ANALYSIS_ENABLED = os.getenv('TEMPORAL_ANALYSIS_ENABLED', 'True').lower() == 'true'
+    TEMPORAL_STABLE_FRAMES = 3              # K frames agreeing on app + content type start a run
+    TEMPORAL_ANALYZE_EVERY = 5              # Inside a run only every Nth frame is fully analyzed
+    TEMPORAL_CHANGE_SIMILARITY = 0.85       # Below this perceptual similarity a frame is always analyzed
+
+    # Batched sentiment scoring
+    SENTIMENT_BATCHING_ENABLED = os.getenv('SENTIMENT_BATCHING_ENABLED', 'True').lower() == 'true'
+    SENTIMENT_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', 20))
+    SENTIMENT_BATCH_MAX_WAIT_SECONDS = int(os.getenv('SENTIMENT_BATCH_MAX_WAIT_SECONDS', 30))
+    SENTIMENT_LATENCY_BUDGET_SECONDS = float(os.getenv('SENTIMENT_LATENCY_BUDGET_SECONDS', 15))
+    SENTIMENT_CLAIM_TTL_SECONDS = 300       # A batch claimed by a worker that died is scored again after this
+
+    # Per-frame analysis stages (run concurrently where independent)
+    ANALYSIS_STAGE_WORKERS = int(os.getenv('ANALYSIS_STAGE_WORKERS', 8))  # Shared by all requests of a worker
+    VISION_STAGE_TIMEOUT_SECONDS = float(os.getenv('VISION_STAGE_TIMEOUT_SECONDS', 60))
+    ANALYSIS_STAGE_TIMEOUT_SECONDS = float(os.getenv('ANALYSIS_STAGE_TIMEOUT_SECONDS', 20))  # Audio, translation, sentiment
+
+    # Apply pending schema migrations (app/migrations/versions.py) when the app starts
+    AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'True').lower() == 'true'
+
+    # Offline Parquet export (python run.py --export-parquet)
+    PARQUET_EXPORT_CHUNK_SESSIONS = 500     # Sessions read per batch
+    PARQUET_EXPORT_CHUNK_ROWS = 50000       # Frame rows per write; bounds memory
+    PARQUET_EXPORT_MAX_OPEN_FILES = 32      # Partition files kept open at once
+    PARQUET_EXPORT_ABANDONED_HOURS = 24     # Sessions processing longer than this no longer hold back the watermark
+
+    # Dashboard response cache (shared by all workers through the database)
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 86400))
+    RESPONSE_CACHE_RELATIVE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_RELATIVE_TTL_SECONDS', 300))  # Responses relative to now
+
+    # Population percentile histograms (rebuilt periodically, updated as sessions complete)
+    POPULATION_STATS_WORKER_ENABLED = os.getenv('POPULATION_STATS_WORKER_ENABLED', 'True').lower() == 'true'
+    POPULATION_STATS_INTERVAL_SECONDS = int(os.getenv('POPULATION_STATS_INTERVAL_SECONDS', 3600))
+    POPULATION_STATS_INITIAL_DELAY_SECONDS = 60
+    POPULATION_REBUILD_LEASE_SECONDS = 900  # Lease after which a crashed worker's rebuild is retaken
+    POPULATION_MIN_SEGMENT_USERS = int(os.getenv('POPULATION_MIN_SEGMENT_USERS', 20))  # Smaller segments are not compared against
+
+    # Cross-session statistics: users whose loaded columns stay in memory per worker
+    STATISTICS_CACHE_USERS = int(os.getenv('STATISTICS_CACHE_USERS', 16))
+
+    # Translation of on-screen text
+    TRANSLATION_MIN_LETTERS = int(os.getenv('TRANSLATION_MIN_LETTERS', 12))  # Shorter text is never translated
+    TRANSLATION_BATCH_SIZE = int(os.getenv('TRANSLATION_BATCH_SIZE', 20))
+
     SUPPORTED_VIDEO_FORMATS = {'.mp4', '.webm', '.mov', '.avi', '.mkv'}
 
     SESSION_COOKIE_SECURE = True
@@ -42,9 +107,54 @@ class Config:
     PERMANENT_SESSION_LIFETIME = 3600
 
     ENCRYPT_FRAMES = True
+    # 'archive' packs each session's frames into one append-only file; 'files' keeps one file per frame
+    FRAME_STORAGE_BACKEND = os.getenv('FRAME_STORAGE_BACKEND', 'archive')
+    # 'video' backend: frames are re-encoded into OpenCV video segments when a session completes
+    FRAME_VIDEO_FOURCC = os.getenv('FRAME_VIDEO_FOURCC', 'mp4v')
+    FRAME_VIDEO_EXTENSION = '.mp4'
+    FRAME_VIDEO_SEGMENT_FRAMES = 150
     ENCRYPT_ANALYSIS_DATA = True
     AUTO_DELETE_FRAMES_AFTER_DAYS = 30
 
+    # Background frame retention reaper
+    RETENTION_WORKER_ENABLED = os.getenv('RETENTION_WORKER_ENABLED', 'False').lower() == 'true'
+    RETENTION_INTERVAL_SECONDS = int(os.getenv('RETENTION_INTERVAL_SECONDS', 3600))
+    RETENTION_BATCH_SIZE = 50               # Sessions claimed per batch
+    RETENTION_MAX_FILES_PER_SECOND = 200    # Unlink rate limit
+    RETENTION_CLAIM_TTL_SECONDS = 900       # Lease after which a crashed worker's claim is retaken
+
+    # Background jobs (privacy exports and other long user-initiated tasks)
+    BACKGROUND_JOB_WORKERS = int(os.getenv('BACKGROUND_JOB_WORKERS', 2))
+    BACKGROUND_JOB_FOLDER = BASE_DIR / 'data' / 'jobs'
+    BACKGROUND_JOB_TTL_HOURS = int(os.getenv('BACKGROUND_JOB_TTL_HOURS', 24))  # Finished jobs and their files are kept this long
+    BACKGROUND_JOB_STALE_SECONDS = 600      # A running job without a heartbeat this long is reported failed
+
+    # Privacy data export
+    PRIVACY_EXPORT_INLINE_MAX_FRAMES = int(os.getenv('PRIVACY_EXPORT_INLINE_MAX_FRAMES', 20000))  # Larger exports run as a job
+    PRIVACY_EXPORT_CHUNK_ROWS = 1000        # Rows read per batch
+
+    # Account and session deletion
+    PURGE_BATCH_ROWS = int(os.getenv('PURGE_BATCH_ROWS', 5000))  # Rows per DELETE statement and transaction
+
+    # Per-session frame keys (crypto-shredding) and the sweeper that reclaims files of shredded sessions
+    DATA_KEY_CACHE_SIZE = 1024              # Unwrapped keys kept per worker
+    DATA_KEY_CACHE_SECONDS = 300            # How long a worker may keep using a key destroyed by another worker
+    FRAME_SWEEPER_ENABLED = os.getenv('FRAME_SWEEPER_ENABLED', 'True').lower() == 'true'
+    FRAME_SWEEP_INTERVAL_SECONDS = int(os.getenv('FRAME_SWEEP_INTERVAL_SECONDS', 21600))
+    FRAME_SWEEP_INITIAL_DELAY_SECONDS = 300
+    FRAME_SWEEP_GRACE_SECONDS = 3600        # Stores touched more recently are left alone
+    FRAME_SWEEP_MAX_SESSIONS_PER_SECOND = 10
+
+    # Audit log writer (buffered, bulk-inserted on its own connection)
+    AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv('AUDIT_FLUSH_INTERVAL_SECONDS', 1.0))
+    AUDIT_BATCH_SIZE = 500                  # Buffered events that trigger an early flush
+    AUDIT_SPILL_FOLDER = BASE_DIR / 'data' / 'audit_spill'  # Events kept here while the database is unreachable
+    # Monthly audit_logs partitions (tables on SQLite); older ones are dropped whole
+    AUDIT_RETENTION_MONTHS = int(os.getenv('AUDIT_RETENTION_MONTHS', 13))
+    AUDIT_PARTITIONS_AHEAD = 2              # PostgreSQL partitions created in advance
+    AUDIT_MAINTENANCE_ENABLED = os.getenv('AUDIT_MAINTENANCE_ENABLED', 'True').lower() == 'true'
+    AUDIT_MAINTENANCE_INTERVAL_SECONDS = 3600
+
     PRIVACY_POLICY_VERSION = '1.0'
     TERMS_VERSION = '1.0'
 
@@ -5,10 +5,8 @@ from app.utils.demo_data import initialize_demo_data
 
 app = create_app()
 
-# Initialize database and demo data on startup
+# Tables and migrations are applied by create_app; initialize demo data on startup
 with app.app_context():
-    db.create_all()
-
     # Auto-initialize demo data for production
     if os.environ.get('INIT_DEMO_DATA', 'false').lower() == 'true':
         print('Initializing demo data...')
@@ -27,6 +25,96 @@ if __name__ == '__main__':
             else:
                 print('Failed to create demo data.')
 
+    # Apply pending schema migrations (also done at startup unless AUTO_MIGRATE=false)
+    if '--migrate' in sys.argv:
+        from app.migrations import run_migrations, pending_migrations
+        with app.app_context():
+            applied = run_migrations(verbose=True)
+            print(f"Applied {len(applied)} migration(s); {len(pending_migrations())} pending")
+        sys.exit(0)
+
+    # EXPLAIN the hot dashboard and assessment queries on a seeded scratch database
+    if '--check-query-plans' in sys.argv:
+        from app.migrations.plan_check import run_plan_check
+        results = run_plan_check()
+        failures = [r for r in results if r['full_scans']]
+        for result in results:
+            status = 'FULL SCAN ' + ', '.join(result['full_scans']) if result['full_scans'] else 'ok'
+            print(f"[{status}] {result['statement'][:160]}")
+            for line in result['plan']:
+                print(f"    {line}")
+        print(f"{len(results)} queries checked, {len(failures)} with full scans of hot tables")
+        sys.exit(1 if failures else 0)
+
+    # Append sessions and frames completed since the last export to the Parquet dataset
+    if '--export-parquet' in sys.argv:
+        from app.services.parquet_export import ParquetExportService
+        with app.app_context():
+            service = ParquetExportService(include_text='--include-text' in sys.argv)
+            report = service.export(full='--full' in sys.argv)
+            print(f"Parquet export {report['run_id']}: {report['sessions']} sessions, {report['frames']} frames "
+                  f"in {report['files']} files under {service.root} (watermark: session {report['watermark']})")
+        sys.exit(0)
+
+    # One-off frame retention pass (AUTO_DELETE_FRAMES_AFTER_DAYS)
+    if '--reap-frames' in sys.argv:
+        from app.services.retention import reap_expired_frames
+        with app.app_context():
+            report = reap_expired_frames()
+            print(f"Retention report: {report}")
+        sys.exit(0)
+
+    # One-off sweep of frame files left behind by deleted sessions
+    if '--sweep-frames' in sys.argv:
+        from app.services.purge import sweep_orphaned_frames
+        with app.app_context():
+            report = sweep_orphaned_frames()
+            print(f"Sweep report: {report}")
+        sys.exit(0)
+
+    # Create or rotate audit log partitions and drop those past AUDIT_RETENTION_MONTHS
+    if '--audit-maintenance' in sys.argv:
+        from app.services.audit_log import run_audit_maintenance
+        with app.app_context():
+            report = run_audit_maintenance()
+            print(f"Audit maintenance report: {report}")
+        sys.exit(0)
+
+    # Build user_daily_rollups for sessions completed before rollups existed
+    if '--backfill-rollups' in sys.argv:
+        from app.services.rollups import RollupService
+        with app.app_context():
+            report = RollupService().backfill()
+            print(f"Rollup backfill: {report['days']} days for {report['users']} users")
+        sys.exit(0)
+
+    # Build usage heatmaps for sessions completed before heatmaps existed
+    if '--backfill-heatmaps' in sys.argv:
+        from app.services.heatmap import HeatmapService
+        with app.app_context():
+            report = HeatmapService().backfill()
+            print(f"Heatmap backfill: {report['frames']} frames for {report['users']} users")
+        sys.exit(0)
+
+    # Rebuild the population percentile histograms now instead of waiting for the periodic job
+    if '--rebuild-population-stats' in sys.argv:
+        from app.services.population import rebuild_population_stats
+        with app.app_context():
+            rebuild_population_stats(force=True)
+        sys.exit(0)
+
+    # Resolve frames recorded before the apps table existed, then rebuild rollups under canonical names
+    if '--backfill-apps' in sys.argv:
+        from app.services.app_catalog import AppCatalogService
+        from app.services.rollups import RollupService
+        with app.app_context():
+            report = AppCatalogService().backfill()
+            print(f"App backfill: {report['apps_seeded']} known apps seeded, "
+                  f"{report['frames']} frames and {report['sessions']} sessions updated")
+            report = RollupService().backfill()
+            print(f"Rollup backfill: {report['days']} days for {report['users']} users")
+        sys.exit(0)
+
     # Get port from environment (Render sets this)
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'